@@ -0,0 +1,87 @@
+"""
+Benchmarks of the event list implementations.
+
+Times pushing a batch of events into an empty list, popping every event of
+a full list, and rescheduling random events of a full list, for every event
+list implementation and list size.
+"""
+
+from random import randrange, choice
+from typing import Iterator
+
+from harness import Case
+from thread_timeline import (Event, EventList, KeyedEventList,
+                             CalendarEventList, IndexedEventList)
+
+SUITE = "eventlist"
+
+EVENT_LISTS = {
+    "heap": EventList,
+    "keyed": KeyedEventList,
+    "calendar": CalendarEventList,
+    "indexed": IndexedEventList,
+}
+
+# Number of reschedules timed per trial
+UPDATES = 200
+
+
+def _events(size: int):
+    return [Event(randrange(size * 10), None) for _ in range(size)]
+
+
+def _filled(event_list_type, size: int):
+    events = _events(size)
+    event_list = event_list_type()
+    for event in events:
+        event_list.push(event)
+    return event_list, events
+
+
+def _push(state) -> int:
+    event_list_type, events = state
+    event_list = event_list_type()
+    for event in events:
+        event_list.push(event)
+    return len(events)
+
+
+def _pop(state) -> int:
+    event_list, events = state
+    while len(event_list):
+        event_list.pop()
+    return len(events)
+
+
+def _update(state) -> int:
+    event_list, targets, times = state
+    for event, time in zip(targets, times):
+        event_list.update_event_time(event, time)
+    return len(targets)
+
+
+def _update_setup(event_list_type, size: int):
+    event_list, events = _filled(event_list_type, size)
+    targets = [choice(events) for _ in range(UPDATES)]
+    times = [randrange(size * 10) for _ in range(UPDATES)]
+    return event_list, targets, times
+
+
+def cases(quick: bool) -> Iterator[Case]:
+    """
+    Yields the benchmarks of the suite.
+
+    Args:
+        quick (bool): use small sizes for a fast smoke run.
+    """
+
+    sizes = (1000, 10000) if quick else (1000, 100000)
+    for name, event_list_type in EVENT_LISTS.items():
+        for size in sizes:
+            params = {"event_list": name, "size": size}
+            yield Case("push", params, _push,
+                       lambda t=event_list_type, n=size: (t, _events(n)))
+            yield Case("pop", params, _pop,
+                       lambda t=event_list_type, n=size: _filled(t, n))
+            yield Case("update", params, _update,
+                       lambda t=event_list_type, n=size: _update_setup(t, n))
@@ -0,0 +1,83 @@
+"""
+Benchmarks of the ThreadedTimeline synchronization exchange.
+
+Two ThreadedTimelines in two threads of this process repeatedly serialize
+an event buffer of a given size, swap it through a SharedMemoryTransport and
+deserialize the buffer received, exactly as at every synchronization window.
+The reported operations are exchange rounds, so the inverse of the
+throughput is the latency of one exchange at that batch size.
+"""
+
+from threading import Thread
+from typing import Iterator, List
+
+from harness import Case
+from thread_timeline import (Event, Process, ThreadedTimeline, TholdNode,
+                             SharedMemoryTransport, BatchCodec, PickleCodec,
+                             new_session)
+
+SUITE = "exchange"
+
+CODECS = {
+    "batch": BatchCodec,
+    "pickle": PickleCodec,
+}
+
+def _rounds(timeline: ThreadedTimeline, rounds: int) -> None:
+    for _ in range(rounds):
+        timeline.decode_payloads(timeline.transport.exchange(
+            timeline.encode_buffers(0)))
+
+
+def _setup(codec: str, batch: int, rounds: int) -> List[ThreadedTimeline]:
+    session = new_session("bench-exchange")
+    timelines = []
+    for rank in range(2):
+        timeline = ThreadedTimeline(
+            1, transport=SharedMemoryTransport(rank, 2, session),
+            codec=CODECS[codec]())
+        TholdNode(str(rank), timeline, 0, 1, ["0", "1"])
+        timeline.add_foreign_entity(str(1 - rank), 1 - rank)
+        timeline.event_buffer[1 - rank] = [
+            Event(i, Process(str(1 - rank), "get", [])) for i in range(batch)]
+        timelines.append(timeline)
+
+    # Negotiation is itself an exchange, so both sides must run it
+    peer = Thread(target=timelines[1].codec.negotiate, args=(timelines[1],))
+    peer.start()
+    timelines[0].codec.negotiate(timelines[0])
+    peer.join()
+    return timelines
+
+
+def _run(timelines: List[ThreadedTimeline], rounds: int) -> int:
+    peer = Thread(target=_rounds, args=(timelines[1], rounds))
+    peer.start()
+    _rounds(timelines[0], rounds)
+    peer.join()
+    return rounds
+
+
+def _teardown(timelines: List[ThreadedTimeline]) -> None:
+    for timeline in timelines:
+        timeline.transport.close()
+
+
+def cases(quick: bool) -> Iterator[Case]:
+    """
+    Yields the benchmarks of the suite.
+
+    Args:
+        quick (bool): use fewer batch sizes and rounds for a fast smoke run.
+    """
+
+    batches = (0, 100, 10000) if quick else (0, 10, 100, 1000, 10000)
+    for codec in CODECS:
+        for batch in batches:
+            rounds = max(10, min(1000, 100000 // max(batch, 1)))
+            if quick:
+                rounds = max(5, rounds // 10)
+            params = {"codec": codec, "batch": batch, "rounds": rounds}
+            yield Case("round", params,
+                       lambda state, n=rounds: _run(state, n),
+                       lambda p=params: _setup(**p), _teardown)
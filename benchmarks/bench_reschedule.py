@@ -0,0 +1,79 @@
+"""
+Micro-benchmark of rescheduling cost against event list size.
+
+Fills each event list implementation with `size` events, then times random
+calls to `update_event_time`, alternating earlier and later times. With the
+indexed event list the cost per reschedule should stay flat as the list
+grows; with the heap and keyed lists it grows linearly.
+
+Usage:
+    python benchmarks/bench_reschedule.py [--sizes 1000 10000 100000]
+"""
+
+from random import Random
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from thread_timeline import (Event, EventList, KeyedEventList,
+                             IndexedEventList, CalendarEventList)
+
+
+EVENT_LISTS = {
+    "heap": EventList,
+    "keyed": KeyedEventList,
+    "calendar": CalendarEventList,
+    "indexed": IndexedEventList,
+}
+
+
+def bench(event_list_type, size: int, ops: int, seed: int) -> float:
+    """
+    Returns the mean time in microseconds of one reschedule.
+
+    Args:
+        event_list_type (type): event list class to benchmark.
+        size (int): number of events in the list.
+        ops (int): number of reschedules to time.
+        seed (int): random seed.
+    """
+
+    rng = Random(seed)
+    events = [Event(rng.randrange(size * 10), None) for _ in range(size)]
+    event_list = event_list_type()
+    for event in events:
+        event_list.push(event)
+    targets = [rng.choice(events) for _ in range(ops)]
+    shifts = [rng.randrange(1, size) * (1 if i % 2 else -1)
+              for i in range(ops)]
+
+    start = time.perf_counter()
+    for event, shift in zip(targets, shifts):
+        event_list.update_event_time(event, max(0, event.time + shift))
+    return (time.perf_counter() - start) / ops * 1e6
+
+
+def main(args):
+    print(f"{'size':>10}" + "".join(f"{name:>12}" for name in args.lists))
+    for size in args.sizes:
+        row = [bench(EVENT_LISTS[name], size, args.ops, args.seed)
+               for name in args.lists]
+        print(f"{size:>10}" + "".join(f"{us:>10.2f}us" for us in row))
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[1000, 10000, 100000])
+    parser.add_argument('--ops', type=int, default=1000)
+    parser.add_argument('--lists', nargs='+', default=list(EVENT_LISTS),
+                        choices=list(EVENT_LISTS))
+    parser.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args()
+
+    main(args)
@@ -0,0 +1,166 @@
+"""
+End-to-end THOLD benchmarks of the threaded engine.
+
+Runs the THOLD model on ThreadedTimelines, one thread per timeline, and
+reports executed events per second. Node count, lookahead and number of
+timelines are each swept around a common baseline while the other two are
+held fixed.
+
+Timelines are connected by a SharedMemoryTransport with the BatchCodec,
+which serializes events as between sub-interpreters, and for every number
+of timelines also by a QueueTransport with the ReferenceCodec, which passes
+events by reference. Where sub-interpreters are available, the same
+timelines also run in a warm InterpreterPool, one per interpreter, and the
+speedup of both thread backends over it is reported. Those runs include
+building and initializing the timelines in the interpreters, which the
+thread runs do before timing.
+
+Threads share one GIL on a default build of CPython, so the sweep over
+timelines measures synchronization overhead rather than parallel speedup,
+which needs a free-threaded build. Every result records whether the GIL
+was disabled, so the two are never compared. The "coordinated" benchmarks
+run the same timelines as tasks of one asyncio event loop instead of
+threads.
+"""
+
+from functools import partial
+from random import getrandbits
+from threading import Thread
+from typing import Dict, Iterator, List, Tuple
+import asyncio
+
+from harness import Case
+from thread_timeline import (ThreadedTimeline, TholdNode, InterpreterPool,
+                             SharedMemoryTransport, QueueHub, QueueTransport,
+                             run_timelines, new_session, gil_disabled)
+from thread_timeline._compat import interpreters
+
+SUITE = "thold"
+
+# Transports between timelines
+SHARED_MEMORY = "shared_memory"
+QUEUE = "queue"
+# Shared memory between the interpreters of an InterpreterPool
+INTERPRETERS = "interpreters"
+
+BASELINE = {"nodes": 16, "lookahead": 100, "timelines": 2,
+            "init_work": 4000, "stop_time": 5000, "transport": SHARED_MEMORY}
+
+# The thread backends are compared with timelines in sub-interpreters
+REFERENCE = ("transport", INTERPRETERS)
+
+
+def _build(nodes: int, lookahead: int, init_work: int, stop_time: int,
+           seed: int, channel) -> ThreadedTimeline:
+    """Builds the timeline of one rank; importable by sub-interpreters."""
+
+    timelines = channel.size
+    timeline = ThreadedTimeline(lookahead, stop_time, transport=channel)
+    timeline.seed(seed)
+    neighbors = [str(i) for i in range(nodes)]
+    for i, name in enumerate(neighbors):
+        owner = i * timelines // nodes
+        if owner == channel.rank:
+            TholdNode(name, timeline, init_work // nodes, lookahead,
+                      neighbors)
+        else:
+            timeline.add_foreign_entity(name, owner)
+    return timeline
+
+
+def _setup(nodes: int, lookahead: int, timelines: int, init_work: int,
+           stop_time: int, transport: str) -> List[ThreadedTimeline]:
+    session = new_session("bench-thold")
+    hub = QueueHub(timelines)
+    # Seeded from `random`, which the harness seeds before every trial
+    seed = getrandbits(64)
+    built = []
+    for rank in range(timelines):
+        if transport == QUEUE:
+            channel = QueueTransport(rank, hub)
+        else:
+            channel = SharedMemoryTransport(rank, timelines, session)
+        timeline = _build(nodes, lookahead, init_work, stop_time, seed,
+                          channel)
+        timeline.init()
+        built.append(timeline)
+    return built
+
+
+def _setup_pool(nodes: int, lookahead: int, timelines: int, init_work: int,
+                stop_time: int, transport: str) \
+        -> Tuple[InterpreterPool, partial]:
+    pool = InterpreterPool(timelines)
+    # Same seed, hence same workload, as `_setup` in the same trial
+    seed = getrandbits(64)
+    return pool, partial(_build, nodes, lookahead, init_work, stop_time, seed)
+
+
+def _run_pool(state: Tuple[InterpreterPool, partial]) -> int:
+    pool, build = state
+    return sum(result["run_counter"] for result in pool.run(build))
+
+
+def _teardown_pool(state: Tuple[InterpreterPool, partial]) -> None:
+    state[0].close()
+
+
+def _run(timelines: List[ThreadedTimeline]) -> int:
+    threads = [Thread(target=timeline.run) for timeline in timelines[1:]]
+    for thread in threads:
+        thread.start()
+    timelines[0].run()
+    for thread in threads:
+        thread.join()
+    return sum(timeline.run_counter for timeline in timelines)
+
+
+def _run_coordinated(timelines: List[ThreadedTimeline]) -> int:
+    asyncio.run(run_timelines(timelines))
+    return sum(timeline.run_counter for timeline in timelines)
+
+
+def _teardown(timelines: List[ThreadedTimeline]) -> None:
+    for timeline in timelines:
+        timeline.transport.close()
+
+
+def _sweep(quick: bool) -> Iterator[Dict[str, int]]:
+    baseline = dict(BASELINE)
+    if quick:
+        baseline["stop_time"] = 1000
+    yield baseline
+    for nodes in (8, 32):
+        yield dict(baseline, nodes=nodes)
+    for lookahead in (50, 200):
+        yield dict(baseline, lookahead=lookahead)
+    for timelines in (1, 4):
+        yield dict(baseline, timelines=timelines)
+    for timelines in (1, 2, 4):
+        yield dict(baseline, timelines=timelines, transport=QUEUE)
+        if interpreters is not None:
+            yield dict(baseline, timelines=timelines, transport=INTERPRETERS)
+
+
+def cases(quick: bool) -> Iterator[Case]:
+    """
+    Yields the benchmarks of the suite.
+
+    Args:
+        quick (bool): use a short simulation for a fast smoke run.
+    """
+
+    # Results with and without the GIL must never be compared
+    gil = {"gil_disabled": gil_disabled()}
+    for params in _sweep(quick):
+        if params["transport"] == INTERPRETERS:
+            yield Case("run", dict(params, **gil), _run_pool,
+                       lambda p=params: _setup_pool(**p), _teardown_pool)
+        else:
+            yield Case("run", dict(params, **gil), _run,
+                       lambda p=params: _setup(**p), _teardown)
+    baseline = next(_sweep(quick))
+    for timelines in (2, 4):
+        params = dict(baseline, timelines=timelines)
+        yield Case("coordinated", dict(params, **gil), _run_coordinated,
+                   lambda p=params: _setup(**p), _teardown)
@@ -0,0 +1,50 @@
+"""
+Benchmarks of the sequential simulation kernel.
+
+Times `Timeline.run` on a single-timeline THOLD model for every event list
+implementation and reports executed events per second.
+"""
+
+from random import getrandbits
+from typing import Iterator
+
+from harness import Case
+from thread_timeline import (Timeline, TholdNode, HEAP_EVENT_LIST,
+                             KEYED_EVENT_LIST, CALENDAR_EVENT_LIST,
+                             INDEXED_EVENT_LIST)
+
+SUITE = "timeline"
+
+
+def _setup(event_list: str, nodes: int, init_work: int, lookahead: int,
+           stop_time: int) -> Timeline:
+    timeline = Timeline(stop_time, event_list)
+    # Seeded from `random`, which the harness seeds before every trial
+    timeline.seed(getrandbits(64))
+    neighbors = [str(i) for i in range(nodes)]
+    for name in neighbors:
+        TholdNode(name, timeline, init_work // nodes, lookahead, neighbors)
+    timeline.init()
+    return timeline
+
+
+def _run(timeline: Timeline) -> int:
+    timeline.run()
+    return timeline.run_counter
+
+
+def cases(quick: bool) -> Iterator[Case]:
+    """
+    Yields the benchmarks of the suite.
+
+    Args:
+        quick (bool): use a short simulation for a fast smoke run.
+    """
+
+    params = {"nodes": 16, "init_work": 32000, "lookahead": 100,
+              "stop_time": 500 if quick else 2000}
+    for event_list in (HEAP_EVENT_LIST, KEYED_EVENT_LIST,
+                       CALENDAR_EVENT_LIST, INDEXED_EVENT_LIST):
+        case_params = dict(params, event_list=event_list)
+        yield Case("run", case_params, _run,
+                   lambda p=case_params: _setup(**p))
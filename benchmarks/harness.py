@@ -0,0 +1,209 @@
+"""
+Shared harness of the benchmark suite.
+
+Every benchmark is a `Case`: a name, the parameters it was run with, and
+`setup`, `run` and `teardown` callables. `measure` seeds the random number
+generator, builds fresh state with `setup` before every trial, discards the
+warmup trials and times `run` only. `run` returns the number of operations
+it performed, so results can be reported as throughput.
+
+Results are saved as JSON together with the interpreter, platform and git
+commit they were measured on, and two result files can be compared to catch
+regressions between commits. Within one run, benchmarks that only differ in
+one parameter can be compared to get the speedup of each of its values.
+"""
+
+from statistics import mean, median, stdev
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+
+class Case(NamedTuple):
+    """
+    A single benchmark.
+
+    Attributes:
+        name (str): name of the benchmark within its suite.
+        params (Dict[str, Any]): parameters the benchmark is run with.
+        run (Callable[[Any], int]): timed function; takes the state built by
+            `setup` and returns the number of operations performed.
+        setup (Callable[[], Any]): untimed function building the state of
+            one trial (default None).
+        teardown (Callable[[Any], None]): untimed function releasing the
+            state of one trial (default None).
+    """
+
+    name: str
+    params: Dict[str, Any]
+    run: Callable[[Any], int]
+    setup: Optional[Callable[[], Any]] = None
+    teardown: Optional[Callable[[Any], None]] = None
+
+
+def measure(case: Case, warmup: int = 1, trials: int = 5,
+            seed: int = 0) -> Dict[str, Any]:
+    """
+    Function to time the trials of one benchmark.
+
+    Args:
+        case (Case): benchmark to run.
+        warmup (int): number of untimed trials run first (default 1).
+        trials (int): number of timed trials (default 5).
+        seed (int): seed of `random` before every trial (default 0).
+
+    Returns:
+        Dict[str, Any]: trial times in seconds and their summary statistics.
+    """
+
+    times = []
+    ops = 0
+    for trial in range(warmup + trials):
+        random.seed(seed)
+        state = case.setup() if case.setup is not None else None
+        try:
+            tick = time.perf_counter()
+            ops = case.run(state)
+            elapsed = time.perf_counter() - tick
+        finally:
+            if case.teardown is not None:
+                case.teardown(state)
+        if trial >= warmup:
+            times.append(elapsed)
+
+    best = median(times)
+    return {
+        "times": times,
+        "min": min(times),
+        "median": best,
+        "mean": mean(times),
+        "stdev": stdev(times) if len(times) > 1 else 0.0,
+        "ops": ops,
+        "ops_per_second": ops / best if best > 0 else 0.0,
+    }
+
+
+def git_commit() -> Optional[str]:
+    """Returns the commit of the working tree, or None outside git."""
+
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata() -> Dict[str, Any]:
+    """Returns a description of the machine and tree being measured."""
+
+    return {
+        "python": sys.version,
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def save(path: str, results: List[Dict[str, Any]],
+         settings: Dict[str, Any]) -> None:
+    """
+    Function to write benchmark results to a JSON file.
+
+    Args:
+        path (str): path of the file to write.
+        results (List[Dict[str, Any]]): results of all benchmarks run.
+        settings (Dict[str, Any]): warmup, trials and seed used.
+    """
+
+    with open(path, "w") as file:
+        json.dump({"metadata": metadata(), "settings": settings,
+                   "results": results}, file, indent=1)
+
+
+def load(path: str) -> Dict[str, Any]:
+    """Returns the contents of a JSON file written by `save`."""
+
+    with open(path) as file:
+        return json.load(file)
+
+
+def _key(result: Dict[str, Any]) -> Tuple[str, str, str]:
+    return (result["suite"], result["name"],
+            json.dumps(result["params"], sort_keys=True))
+
+
+def compare(base: Dict[str, Any], new: Dict[str, Any],
+            threshold: float = 0.1) -> List[Dict[str, Any]]:
+    """
+    Function to compare the median times of two result files.
+
+    Only benchmarks present in both files with the same parameters are
+    compared.
+
+    Args:
+        base (Dict[str, Any]): results of the reference commit.
+        new (Dict[str, Any]): results of the commit under test.
+        threshold (float): relative slowdown of the median above which a
+            benchmark counts as regressed (default 0.1).
+
+    Returns:
+        List[Dict[str, Any]]: one entry per benchmark with both medians,
+            their ratio and whether it regressed.
+    """
+
+    reference = {_key(result): result for result in base["results"]}
+    rows = []
+    for result in new["results"]:
+        old = reference.get(_key(result))
+        if old is None:
+            continue
+        ratio = result["stats"]["median"] / old["stats"]["median"]
+        rows.append({"suite": result["suite"], "name": result["name"],
+                     "params": result["params"],
+                     "base": old["stats"]["median"],
+                     "new": result["stats"]["median"],
+                     "ratio": ratio,
+                     "regressed": ratio > 1 + threshold})
+    return rows
+
+
+def speedups(results: List[Dict[str, Any]], param: str,
+             reference: Any) -> List[Dict[str, Any]]:
+    """
+    Function to compare benchmarks against the same ones with a reference
+    value of one parameter.
+
+    Args:
+        results (List[Dict[str, Any]]): results of all benchmarks run.
+        param (str): name of the compared parameter.
+        reference (Any): value of `param` the others are compared with.
+
+    Returns:
+        List[Dict[str, Any]]: one entry per benchmark with another value of
+            `param` and a matching reference benchmark, with the ratio of
+            the reference median to its median.
+    """
+
+    medians = {_key(result): result["stats"]["median"] for result in results}
+    rows = []
+    for result in results:
+        value = result["params"].get(param, reference)
+        if value == reference:
+            continue
+        base = medians.get(_key(dict(result, params=dict(
+            result["params"], **{param: reference}))))
+        if base is None:
+            continue
+        rows.append({"suite": result["suite"], "name": result["name"],
+                     "params": result["params"],
+                     "speedup": base / result["stats"]["median"]})
+    return rows
@@ -0,0 +1,99 @@
+"""
+Runs the benchmark suite and compares results across commits.
+
+Usage:
+    python benchmarks/run.py [--suites eventlist timeline exchange thold]
+                             [--quick] [--output results.json]
+    python benchmarks/run.py --compare base.json new.json [--threshold 0.1]
+
+Every benchmark is run with a fixed seed, after untimed warmup trials, and
+its median time over the timed trials is reported. With --compare, the
+medians of two result files are compared and the exit status is 1 if any
+benchmark slowed down by more than the threshold. Suites with a REFERENCE
+parameter value also report the speedup of their other values over it.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import harness
+import bench_eventlist
+import bench_exchange
+import bench_thold
+import bench_timeline
+
+SUITES = {module.SUITE: module for module in (bench_eventlist,
+                                              bench_timeline,
+                                              bench_exchange,
+                                              bench_thold)}
+
+
+def run(args) -> None:
+    results = []
+    for suite in args.suites:
+        for case in SUITES[suite].cases(args.quick):
+            stats = harness.measure(case, args.warmup, args.trials,
+                                    args.seed)
+            results.append({"suite": suite, "name": case.name,
+                            "params": case.params, "stats": stats})
+            print(f"{suite:>10} {case.name:<8} {json.dumps(case.params):<72}"
+                  f"{stats['median'] * 1e3:>10.2f}ms"
+                  f"{stats['ops_per_second']:>14.0f} ops/s")
+
+    for suite in args.suites:
+        reference = getattr(SUITES[suite], "REFERENCE", None)
+        if reference is None:
+            continue
+        param, value = reference
+        for row in harness.speedups(results, *reference):
+            print(f"{suite:>10} {row['name']:<8} "
+                  f"{json.dumps(row['params']):<72}"
+                  f"{row['speedup']:>10.2f}x over {param} {value}")
+
+    if args.output is not None:
+        harness.save(args.output, results, {"warmup": args.warmup,
+                                            "trials": args.trials,
+                                            "seed": args.seed,
+                                            "quick": args.quick})
+
+
+def compare(args) -> int:
+    rows = harness.compare(harness.load(args.compare[0]),
+                           harness.load(args.compare[1]), args.threshold)
+    regressed = 0
+    for row in rows:
+        flag = "REGRESSED" if row["regressed"] else ""
+        regressed += row["regressed"]
+        print(f"{row['suite']:>10} {row['name']:<8} "
+              f"{json.dumps(row['params']):<72}{row['base'] * 1e3:>10.2f}ms"
+              f"{row['new'] * 1e3:>10.2f}ms{row['ratio']:>7.2f}x {flag}")
+    print(f"{regressed} of {len(rows)} benchmarks regressed by more than "
+          f"{args.threshold:.0%}")
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--suites', nargs='+', default=list(SUITES),
+                        choices=list(SUITES))
+    parser.add_argument('--quick', action='store_true',
+                        help="use small sizes for a fast smoke run")
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--trials', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write results to this JSON file")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'),
+                        help="compare two result files instead of running")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="relative slowdown counted as a regression")
+
+    args = parser.parse_args()
+
+    if args.compare is not None:
+        sys.exit(compare(args))
+    run(args)
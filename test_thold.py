@@ -1,149 +1,228 @@
-from test.support import interpreters
-from textwrap import dedent
-from threading import Thread, Lock
+from functools import partial
 import os
 import argparse
 import time
 
-from thread_timeline import ThreadedTimeline, TholdNode
+# Sub-interpreters only exist on some builds; --processes, --threads,
+# --coordinated and --rendezvous work without them
+from thread_timeline._compat import interpreters
+
+from thread_timeline import (ThreadedTimeline, OptimisticTimeline, TholdNode,
+                             InteractionRecorder, partition, apply_partition,
+                             run_processes, run_threads, gil_disabled,
+                             SocketTransport, run_coordinated,
+                             InterpreterPool,
+                             HEAP_EVENT_LIST,
+                             KEYED_EVENT_LIST, CALENDAR_EVENT_LIST,
+                             INDEXED_EVENT_LIST, FULL_ACCOUNTING,
+                             SAMPLED_ACCOUNTING, BARRIER_SYNC,
+                             NULL_MESSAGE_SYNC)
     
 
-def cleanup_interpreters():
+def build_timeline(args, transport=None):
     """
-    Close all sub-interpreters to prevent fatal Python error on program exit.
+    Creates the timeline of the current interpreter or process and adds its
+    share of the THOLD nodes.
+
+    Args:
+        args (Namespace): command line arguments.
+        transport (Transport): transport of the timeline (default the
+            shared-memory transport of the current interpreter).
 
-    Raises:
-        RuntimeError: Thrown when an interpreter cannot be properly closed.
+    Returns:
+        ThreadedTimeline: the timeline, ready to be initialized.
     """
 
-    for i in interpreters.list_all():
-        if i.id == 0:
-            continue
-        try:
-            print(f"Cleaning up interpreter: {i}")
-            i.close()
-        except RuntimeError:
-            pass
+    # Create Threaded Timeline instance for current interpreter. All
+    # interpreters attach to the same shared-memory ring buffers, unless
+    # the transport is given.
+    if args.optimistic:
+        timeline = OptimisticTimeline(args.lookahead, args.stop_time,
+                                      transport, optimism=args.optimism,
+                                      event_list=args.event_list,
+                                      accounting=args.accounting)
+    else:
+        timeline = ThreadedTimeline(args.lookahead, args.stop_time,
+                                    transport, event_list=args.event_list,
+                                    profile=args.profile is not None,
+                                    accounting=args.accounting,
+                                    adaptive=args.adaptive,
+                                    synchronization=args.synchronization,
+                                    rebalance_interval=args.rebalance)
+    if args.seed is not None:
+        timeline.seed(args.seed)
+    neighbors = list(range(args.total_node))
+    neighbors = list(map(str, neighbors))
+    size = timeline.transport.size
+    if args.partition is not None:
+        # Learn the interaction graph from a short sequential run. Every
+        # interpreter profiles the same seeded model, so all of them compute
+        # the same assignment.
+        recorder = InteractionRecorder(args.partition)
+        recorder.seed(0 if args.seed is None else args.seed)
+        for name in neighbors:
+            TholdNode(name, recorder, args.init_work // args.total_node,
+                      args.lookahead, neighbors)
+        recorder.init()
+        recorder.run()
+        assignment = partition(recorder.graph, size)
+        print(f"Partition cuts {recorder.graph.cut_weight(assignment):.0f} "
+              f"of {recorder.graph.total_weight():.0f} profiled interactions")
+    else:
+        # Divide nodes evenly between timelines
+        assignment = {str(i): i * size // args.total_node
+                      for i in range(args.total_node)}
+    # Add the nodes of the current timeline, and the others to its foreign
+    # entity list
+    for name in apply_partition(timeline, assignment):
+        node = TholdNode(name, timeline, args.init_work //
+                         args.total_node, args.lookahead, neighbors)
 
+    return timeline
 
-def main(args):
 
-    # Get current interpreter
-    cur = interpreters.get_current()
-    main_interp = interpreters.get_main()
+def report(args, timeline):
+    """
+    Prints simulation results:
+     - Interpreter (or Timeline) ID
+     - Timeline's current time (or time at which sim stops)
+     - Time at which the top-most event occurs
+     - Synchronization counter
+     - Timeline run counter
+     - Not sure what this one is, lol
+     - Number of events in the timeline
+     - Total number of times a timeline reads data from another timeline
+     - Total number of times a timeline writes data to another timeline
+    """
+    print(timeline.id, timeline.now(), timeline.events.top().time, 
+          timeline.sync_counter, timeline.run_counter,
+          sum([len(buf) for buf in timeline.event_buffer]), 
+          len(timeline.events), timeline.read_ops, timeline.write_ops)
+    
+    widths = timeline.window_widths
+    print(f"Windows: {len(widths)}, mean width "
+          f"{sum(widths) / max(len(widths), 1):.1f}, "
+          f"min {min(widths, default=0):.1f}, max {max(widths, default=0):.1f}")
 
-    # Create mutex for locking files for reading/writing between interpreters
-    mutex = Lock()
+    if args.rebalance:
+        print(f"Migrated {timeline.migrations} nodes away, finished with "
+              f"{len(timeline.entities)} nodes")
 
-    # Establish paths for file queues for reading/writing between interpreters
-    current_directory = os.getcwd()
-    sub_queue_path = os.path.join(current_directory, 'sub-queue.pkl')
-    main_queue_path = os.path.join(current_directory, 'main-queue.pkl')
-    signal_file = os.path.join(current_directory, 'signal.txt')
+    # Print how much optimistic execution was undone
+    if args.optimistic:
+        print(f"Rollbacks: {timeline.rollbacks}, events rolled back "
+              f"{timeline.rolled_back} of {timeline.executed} executed "
+              f"(efficiency {timeline.efficiency:.1%}), anti-messages "
+              f"{timeline.anti_messages}")
 
-    # Create queue files:
-    for path in [main_queue_path, sub_queue_path]:
-        with open(path, 'w') as file:
-            pass
+    # Write the per-window statistics of this timeline
+    if args.profile is not None and not args.optimistic:
+        os.makedirs(args.profile, exist_ok=True)
+        timeline.profiler.to_csv(
+            os.path.join(args.profile, f"profile-{timeline.id}.csv"))
 
-    # MAIN THREAD ONLY
-    if(main_interp.id == cur.id):
+    # Print where the execution time of this timeline went
+    if args.accounting is not None:
+        print(timeline.cost_profiler.report())
 
-        # Remove signal file if previous sim run closed prematurely
-        if os.path.exists(signal_file):
-            os.remove(signal_file)
 
-        # Set proper queues to read/write from in main interpreter
-        recv_file = main_queue_path
-        send_file = sub_queue_path
+def main_processes(args):
+    """
+    Runs one timeline per worker process instead of per interpreter.
 
-        # Create subinterpreter for the second thread
-        interp = interpreters.create()
-        print(f"Sub-interpreter ID: {interp}")
+    Args:
+        args (Namespace): command line arguments.
+    """
 
-        # Load current script so it can be ran from subinterpreter
-        file_path = os.path.join(current_directory, 'test_thold.py')
-        with open(file_path, 'r') as file:
-            file_contents = file.read()
+    print(f"Running {args.processes} timelines in worker processes...")
+    start_time = time.time()
+    run_processes(partial(build_timeline, args), args.processes,
+                  summary=partial(report, args))
+    print(f"Simulation ran in {time.time() - start_time} sec")
 
-        # Format code with appropriate whitespace
-        code = dedent(file_contents)
 
-        # Create new thread to run subinterpreter on
-        t = Thread(target=interp.run, args=(code,))
+def main_threads(args):
+    """
+    Runs one timeline per thread, passing events between them by reference.
 
-        # This next line takes this entire script and runs it using the newly-
-        # spawned sub-interpreter.
-        # Eveything under "MAIN THREAD ONLY" will run in the main interpreter
-        # and everything under "SUBINTERPRETER ONLY" will run in the
-        # subinterpreter. Everything else runs in both.
-        t.start()
+    Args:
+        args (Namespace): command line arguments.
+    """
 
-    # SUBINTERPRETER ONLY
-    else:
-        # Set proper queues to read/write from in sub-interpreter
-        recv_file = sub_queue_path
-        send_file = main_queue_path
+    mode = "in parallel" if gil_disabled() else "sharing the GIL"
+    print(f"Running {args.threads} timelines in threads {mode}...")
+    start_time = time.time()
+    run_threads(partial(build_timeline, args), args.threads,
+                summary=partial(report, args))
+    print(f"Simulation ran in {time.time() - start_time} sec")
 
-    size = len(interpreters.list_all())
 
-    # Calculate total num nodes per interpreter
-    node_num = args.total_node // size
-    # Create Threaded Timeline instance for current interpreter
-    timeline = ThreadedTimeline(recv_file, send_file, mutex, args.lookahead, 
-                                args.stop_time)
-    neighbors = list(range(args.total_node))
-    neighbors = list(map(str, neighbors))
-    # Divide nodes between timelines, either adding to current timeline or to
-    # current timeline's foreign entity list
-    for i in range(args.total_node):
-        if i // node_num == cur.id:
-            node = TholdNode(str(i), timeline, args.init_work // 
-                             args.total_node, args.lookahead, neighbors)
-        else:
-            timeline.foreign_entities[str(i)] = i // node_num
-
-    # Initialize and run simulation
-    print(f"Initializing timelines from interpreter: {cur.id}...")
-    timeline.init()
-    print("Running timelines...")
+def main_coordinated(args):
+    """
+    Runs all timelines as tasks of one asyncio event loop on this thread.
+
+    Args:
+        args (Namespace): command line arguments.
+    """
+
+    print(f"Running {args.coordinated} timelines in one event loop...")
     start_time = time.time()
-    timeline.run()
+    run_coordinated(partial(build_timeline, args), args.coordinated,
+                    summary=partial(report, args))
     print(f"Simulation ran in {time.time() - start_time} sec")
 
 
+def main_socket(args):
     """
-    Prints simulation results:
-     - Interpreter (or Timeline) ID
-     - Timeline's current time (or time at which sim stops)
-     - Time at which the top-most event occurs
-     - Synchronization counter
-     - Timeline run counter
-     - Not sure what this one is, lol
-     - Number of events in the timeline
-     - Total number of times a timeline reads data from another timeline
-     - Total number of times a timeline writes data to another timeline
+    Runs the timeline of one rank, connected to the others over sockets.
+
+    Every rank is started separately, on this host or another, with the
+    same arguments except --rank, and the same THREAD_TIMELINE_AUTHKEY.
+
+    Args:
+        args (Namespace): command line arguments.
     """
-    print(timeline.id, timeline.now(), timeline.events.top().time, 
-          timeline.sync_counter, timeline.run_counter,
-          sum([len(buf) for buf in timeline.event_buffer]), 
-          len(timeline.events), timeline.read_ops, timeline.write_ops)
-    
-    # Sleep for a moment to ensure other interpreter is done processing data
-    time.sleep(1)
 
-    # Signals other interpreter to quit if hung up
-    with open(signal_file, "w") as file:
-        pass
-    
-    if(main_interp.id == cur.id):
-        # Clean up interpreters
-        time.sleep(1)
-        cleanup_interpreters()
-        # Clean up files
-        for file in [main_queue_path, sub_queue_path, signal_file]:
-            if os.path.exists(file):
-                os.remove(file)
+    print(f"Connecting timeline {args.rank} of {args.size} through "
+          f"{args.rendezvous}...")
+    transport = SocketTransport(args.rank, args.size, args.rendezvous)
+    try:
+        timeline = build_timeline(args, transport)
+        timeline.init()
+        start_time = time.time()
+        timeline.run()
+        elapsed = time.time() - start_time
+        report(args, timeline)
+    finally:
+        transport.close()
+    print(f"Simulation ran in {elapsed} sec")
+
+
+def main(args):
+    """
+    Runs one timeline per sub-interpreter of a warm interpreter pool.
+
+    The interpreters are created and import the kernel once, then run the
+    simulation --runs times. Sub-interpreters cannot see the `__main__`
+    module of the main interpreter, so the timeline builder is taken from
+    this file imported as a module.
+
+    Args:
+        args (Namespace): command line arguments.
+    """
+
+    import test_thold
+
+    print(f"Starting {args.interpreters} interpreters...")
+    start_time = time.time()
+    with InterpreterPool(args.interpreters) as pool:
+        print(f"Interpreters ready in {time.time() - start_time} sec")
+        for _ in range(args.runs):
+            print("Running timelines...")
+            start_time = time.time()
+            pool.run(partial(test_thold.build_timeline, args),
+                     summary=partial(test_thold.report, args))
+            print(f"Simulation ran in {time.time() - start_time} sec")
 
 
 if __name__ == "__main__":
@@ -153,7 +232,77 @@ if __name__ == "__main__":
     parser.add_argument('init_work', type=int)
     parser.add_argument('lookahead', type=int)
     parser.add_argument('stop_time', type=int)
+    parser.add_argument('--interpreters', type=int, default=2,
+                        help="number of interpreters (timelines) to run")
+    parser.add_argument('--runs', type=int, default=1,
+                        help="number of times the simulation is run on the "
+                             "same interpreters")
+    parser.add_argument('--processes', type=int, metavar='N',
+                        help="run N timelines in worker processes instead of "
+                             "sub-interpreters")
+    parser.add_argument('--threads', type=int, metavar='N',
+                        help="run N timelines in threads of this process, "
+                             "exchanging events by reference")
+    parser.add_argument('--coordinated', type=int, metavar='N',
+                        help="run N timelines as tasks of one asyncio event "
+                             "loop, awaiting their exchanges")
+    parser.add_argument('--rendezvous', metavar='ADDRESS',
+                        help="run the timeline of --rank in this process, "
+                             "connected to the others over sockets; rank 0 "
+                             "listens on ADDRESS (host:port, :port for "
+                             "loopback, or unix:path). Peers unpickle each "
+                             "other's data, so only processes holding the "
+                             "secret in $THREAD_TIMELINE_AUTHKEY (required "
+                             "for TCP) may connect; traffic is not "
+                             "encrypted")
+    parser.add_argument('--rank', type=int, default=0,
+                        help="rank of the timeline run with --rendezvous")
+    parser.add_argument('--size', type=int, default=2,
+                        help="number of timelines run with --rendezvous")
+    parser.add_argument('--event_list', default=HEAP_EVENT_LIST,
+                        choices=[HEAP_EVENT_LIST, KEYED_EVENT_LIST,
+                                 CALENDAR_EVENT_LIST, INDEXED_EVENT_LIST],
+                        help="event list implementation of each timeline")
+    parser.add_argument('--profile', metavar='DIR',
+                        help="write per-window statistics of each timeline "
+                             "to DIR/profile-<id>.csv")
+    parser.add_argument('--synchronization', default=BARRIER_SYNC,
+                        choices=[BARRIER_SYNC, NULL_MESSAGE_SYNC],
+                        help="synchronization protocol between timelines")
+    parser.add_argument('--adaptive', action='store_true',
+                        help="size windows from the safe horizon of each "
+                             "timeline instead of the fixed lookahead")
+    parser.add_argument('--optimistic', action='store_true',
+                        help="execute optimistically with Time Warp "
+                             "rollbacks instead of conservative windows")
+    parser.add_argument('--optimism', type=float,
+                        help="how far past the GVT optimistic timelines "
+                             "execute (default ten times the lookahead)")
+    parser.add_argument('--partition', type=float, metavar='TIME',
+                        help="assign nodes to timelines from the interaction "
+                             "graph of a sequential run until TIME")
+    parser.add_argument('--rebalance', type=int, default=0, metavar='N',
+                        help="migrate nodes off the busiest timeline every N "
+                             "windows (0 disables)")
+    parser.add_argument('--seed', type=int,
+                        help="root seed of the random streams of all nodes")
+    parser.add_argument('--accounting',
+                        choices=[FULL_ACCOUNTING, SAMPLED_ACCOUNTING],
+                        help="account execution time per entity type and "
+                             "method")
 
     args = parser.parse_args()
 
-    main(args)
+    if args.processes is not None:
+        main_processes(args)
+    elif args.threads is not None:
+        main_threads(args)
+    elif args.coordinated is not None:
+        main_coordinated(args)
+    elif args.rendezvous is not None:
+        main_socket(args)
+    elif interpreters is None:
+        parser.error("sub-interpreters are not available, use --processes, "
+                     "--threads, --coordinated or --rendezvous")
+    else:
+        main(args)
@@ -0,0 +1,36 @@
+"""
+Models shared by the tests of the parallel timelines.
+
+The builders are module-level so that they can be pickled for processes and
+sub-interpreters.
+"""
+
+from thread_timeline.partition import apply_partition
+from thread_timeline.t_timeline import ThreadedTimeline
+from thread_timeline.thold import TholdNode
+
+
+def build_thold(transport, timeline_class=ThreadedTimeline, nodes=8,
+                **options):
+    """
+    Function to build the seeded THOLD partition of `transport.rank`.
+
+    Args:
+        transport (Transport): transport of the timeline.
+        timeline_class (type): class of the timeline (default
+            ThreadedTimeline).
+        nodes (int): number of THOLD nodes over all timelines (default 8).
+        **options: keyword arguments passed on to `timeline_class`.
+
+    Returns:
+        ThreadedTimeline: timeline with its share of the nodes.
+    """
+
+    timeline = timeline_class(100, 5000, transport, **options)
+    timeline.seed(1)
+    neighbors = [str(i) for i in range(nodes)]
+    assignment = {name: i * transport.size // nodes
+                  for i, name in enumerate(neighbors)}
+    for name in apply_partition(timeline, assignment):
+        TholdNode(name, timeline, 100, 100, neighbors)
+    return timeline
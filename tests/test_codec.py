@@ -0,0 +1,147 @@
+"""
+Tests of the event batch codecs.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from thread_timeline.codec import (BatchCodec, PickleCodec, _HEADER,
+                                   pack_scalars, unpack_scalars)
+from thread_timeline.event import Event
+from thread_timeline.process import Process
+
+
+def _negotiate(codecs, entities):
+    """Runs the negotiation of codecs as if each had its own timeline."""
+
+    size = len(codecs)
+    exchanges = [codec.negotiation(SimpleNamespace(
+                     id=rank, entities=dict.fromkeys(entities[rank]),
+                     transport=SimpleNamespace(size=size)))
+                 for rank, codec in enumerate(codecs)]
+    sent = [next(exchange) for exchange in exchanges]
+    for rank, exchange in enumerate(exchanges):
+        with pytest.raises(StopIteration):
+            exchange.send({src: payloads[rank]
+                           for src, payloads in enumerate(sent)
+                           if src != rank})
+
+
+def _fields(event):
+    process = event.process
+    return (event.time, type(event.time), event.priority,
+            type(event.priority), process.owner, process.activation,
+            list(process.act_params), dict(process.act_kwargs))
+
+
+def test_negotiation_agrees_on_ids():
+    codecs = [BatchCodec(['get']), BatchCodec(['put', 'get'])]
+    _negotiate(codecs, [['b', 'a'], ['c']])
+    for codec in codecs:
+        assert codec.owners == ['a', 'b', 'c']
+        assert codec.methods == ['get', 'put']
+        assert codec.owner_ids == {'a': 0, 'b': 1, 'c': 2}
+
+
+@pytest.mark.parametrize("priorities", [[0, 0, 0], [3, 1, 2.5]])
+def test_batch_round_trip(priorities):
+    sender, receiver = BatchCodec(['get', 'put']), BatchCodec(['get'])
+    _negotiate([sender, receiver], [['a', 'b'], ['c']])
+    events = [Event(100 + 7 * i, Process(owner, method, []), priority)
+              for i, (owner, method, priority) in enumerate(
+                  zip('abc', ['get', 'put', 'get'], priorities))]
+    decoded, min_time = receiver.decode(sender.encode(events, 42))
+    assert min_time == 42
+    assert [_fields(e) for e in decoded] == [_fields(e) for e in events]
+
+
+def test_batch_tail_holds_what_columns_cannot():
+    sender, receiver = BatchCodec(), BatchCodec()
+    _negotiate([sender, receiver], [['a'], ['b']])
+    columns = [Event(10, Process('a', 'get', []), 0)]
+    tail = [Event(11, Process('a', 'get', [1, 'x']), 0),
+            Event(12, Process('b', 'get', [], {'key': 2}), 0),
+            Event(13, Process('unknown', 'get', []), 0),
+            Event(14, Process('a', 'other', []), 0),
+            Event(15.5, Process('b', 'get', []), 0)]
+    payload = sender.encode(columns + tail, 0)
+    _, count, tail_len, _ = _HEADER.unpack_from(payload)
+    assert count == 1 and tail_len > 0
+    decoded, _ = receiver.decode(payload)
+    assert [_fields(e) for e in decoded] == \
+        [_fields(e) for e in columns + tail]
+
+
+def test_batch_skips_removed_events():
+    sender, receiver = BatchCodec(), BatchCodec()
+    _negotiate([sender, receiver], [['a'], []])
+    removed = Event(5, Process('a', 'get', []), 0)
+    removed.set_invalid()
+    kept = Event(6, Process('a', 'get', [2]), 0)
+    dropped = Event(7, Process('a', 'get', [3]), 0)
+    dropped.set_invalid()
+    decoded, _ = receiver.decode(sender.encode([removed, kept, dropped], 0))
+    assert [_fields(e) for e in decoded] == [_fields(kept)]
+
+
+def test_batch_widens_columns():
+    names = [f"n{i}" for i in range(70000)]
+    sender, receiver = BatchCodec(), BatchCodec()
+    _negotiate([sender, receiver], [names, []])
+    owners = sorted(names)
+    events = [Event(t, Process(owners[o], 'get', []), 1)
+              for t, o in [(0, 0), (1 << 40, 69999), (1 << 16, 256)]]
+    payload = sender.encode(events, 0)
+    codes = _HEADER.unpack_from(payload)[3].decode()
+    assert codes == 'QIBq'
+    decoded, _ = receiver.decode(payload)
+    assert [_fields(e) for e in decoded] == [_fields(e) for e in events]
+
+
+@pytest.mark.parametrize("priorities", [[3, 3], [3, -(1 << 62)],
+                                        [0.5, 0.5], [0.5, 1.5]])
+def test_batch_keeps_priority_types(priorities):
+    sender, receiver = BatchCodec(), BatchCodec()
+    _negotiate([sender, receiver], [['a'], []])
+    events = [Event(i, Process('a', 'get', []), priority)
+              for i, priority in enumerate(priorities)]
+    payload = sender.encode(events, 0)
+    assert _HEADER.unpack_from(payload)[2] == 0   # No tail
+    decoded, _ = receiver.decode(payload)
+    assert [_fields(e) for e in decoded] == [_fields(e) for e in events]
+
+
+def test_batch_min_time_is_exact():
+    sender, receiver = BatchCodec(), BatchCodec()
+    _negotiate([sender, receiver], [['a'], []])
+    for min_time in (2 ** 53 + 1, (1 << 63) - 1, float('inf'), 0.25):
+        _, decoded = receiver.decode(sender.encode([], min_time))
+        assert (decoded, type(decoded)) == (min_time, type(min_time))
+
+
+def test_scalars_round_trip():
+    values = [2 ** 53 + 1, -5, float('inf'), 1.5, None, 1 << 70]
+    packed = pack_scalars(values)
+    decoded, end = unpack_scalars(memoryview(b'xx' + packed), 2,
+                                  len(values))
+    assert end == 2 + len(packed)
+    assert decoded[:5] == values[:5]
+    assert [type(value) for value in decoded[:5]] == \
+        [int, int, float, float, type(None)]
+    # Integers beyond 64 bits fall back to doubles
+    assert decoded[5] == float(1 << 70)
+
+
+def test_empty_batch():
+    sender, receiver = BatchCodec(), BatchCodec()
+    _negotiate([sender, receiver], [['a'], []])
+    assert receiver.decode(sender.encode([], 9)) == ([], 9)
+
+
+def test_pickle_round_trip():
+    codec = PickleCodec()
+    events = [Event(1.5, Process('a', 'get', [1], {'x': 2}), 3)]
+    decoded, min_time = codec.decode(codec.encode(events, 1))
+    assert min_time == 1
+    assert [_fields(e) for e in decoded] == [_fields(e) for e in events]
@@ -0,0 +1,93 @@
+"""
+Tests of asynchronous exchanges and the asyncio coordinator.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from glob import glob
+import asyncio
+import os
+
+import pytest
+
+from thread_timeline.coordinator import run_coordinated
+from thread_timeline.ring_buffer import (SharedMemoryTransport,
+                                         default_directory, new_session)
+from thread_timeline.socket_transport import SocketTransport
+from thread_timeline.t_timeline import NULL_MESSAGE_SYNC
+from thread_timeline.thread_pool import run_threads
+from thread_timeline.transport import QueueHub, QueueTransport
+
+from helpers import build_thold
+
+
+def _exchange_all(transports, size):
+    """Runs one exchange of every transport in a single event loop."""
+
+    payloads = {rank: os.urandom(size + rank)
+                for rank in range(len(transports))}
+
+    async def exchange_all():
+        return await asyncio.gather(*(
+            transport.exchange_async({peer: payloads[transport.rank]
+                                      for peer in range(transport.size)
+                                      if peer != transport.rank})
+            for transport in transports))
+
+    results = asyncio.run(exchange_all())
+    for rank, received in enumerate(results):
+        assert received == {peer: payloads[peer]
+                            for peer in range(len(transports))
+                            if peer != rank}
+
+
+@pytest.mark.parametrize("pipes", [False, True], ids=["rings", "pipes"])
+def test_shared_memory_exchange_async(tmp_path, pipes):
+    transports = [SharedMemoryTransport(rank, 3, "test", 4096,
+                                        directory=str(tmp_path),
+                                        pipes=pipes)
+                  for rank in range(3)]
+    try:
+        # Larger than a channel, so every exchange waits on its peers
+        _exchange_all(transports, 100000)
+        _exchange_all(transports, 10)
+    finally:
+        for transport in transports:
+            transport.close()
+
+
+def test_socket_exchange_async(tmp_path):
+    address = f"unix:{tmp_path / 'rendezvous'}"
+    with ThreadPoolExecutor(3) as pool:
+        transports = list(pool.map(
+            lambda rank: SocketTransport(rank, 3, address, 10.0),
+            range(3)))
+    try:
+        _exchange_all(transports, 100000)
+    finally:
+        # Together, since each waits for its peers to close too
+        with ThreadPoolExecutor(3) as pool:
+            list(pool.map(lambda transport: transport.close(), transports))
+
+
+def test_queue_transport_is_blocking_only():
+    transport = QueueTransport(0, QueueHub(2))
+    with pytest.raises(NotImplementedError):
+        asyncio.run(transport.exchange_async({1: b""}))
+
+
+def test_run_coordinated_matches_threads():
+    session = new_session("thread-timeline-test")
+    results = run_coordinated(build_thold, 3, session=session)
+    assert [result["run_counter"] for result in results] == \
+        [result["run_counter"] for result in run_threads(build_thold, 3)]
+    assert glob(os.path.join(default_directory(), f"{session}-*")) == []
+
+
+def test_run_coordinated_requires_barrier():
+    session = new_session("thread-timeline-test")
+    with pytest.raises(ValueError):
+        run_coordinated(partial(build_thold,
+                                synchronization=NULL_MESSAGE_SYNC), 2,
+                        session=session)
+    assert glob(os.path.join(default_directory(), f"{session}-*")) == []
@@ -0,0 +1,244 @@
+"""
+Differential tests of the event list implementations.
+
+Every implementation runs the same random sequence of pushes, batch pushes,
+pops, removals and reschedules as a sorted reference list, and must pop the
+same events in the same order.
+"""
+
+from math import inf, nan
+from random import Random
+
+import pytest
+
+from thread_timeline.calendar_eventlist import CalendarEventList
+from thread_timeline.event import Event
+from thread_timeline.eventlist import (EventList, KeyedEventList,
+                                      IndexedEventList)
+
+# Lists that break ties between equal keys in insertion order
+FIFO_EVENT_LISTS = {
+    "keyed": KeyedEventList,
+    "calendar": CalendarEventList,
+    "indexed": IndexedEventList,
+}
+EVENT_LISTS = dict(FIFO_EVENT_LISTS, heap=EventList)
+
+
+def _replay(event_list, seed: int, steps: int):
+    """
+    Runs random operations on an event list and a sorted reference.
+
+    Returns the (key, time, priority) of every event popped from the list,
+    and of the earliest event of the reference at the time.
+    """
+
+    rng = Random(seed)
+    events = {}
+    keys = {}
+    reference = {}
+    order = 0
+    now = 0
+    popped = []
+    expected = []
+
+    def add(key, time, priority):
+        nonlocal order
+        events[key] = Event(time, None, priority)
+        keys[id(events[key])] = key
+        reference[key] = (time, priority, order)
+        order += 1
+
+    serial = 0
+    for _ in range(steps):
+        roll = rng.random()
+        if roll < 0.35 or not reference:
+            add(serial, now + rng.randrange(50), rng.randrange(3))
+            event_list.push(events[serial])
+            serial += 1
+        elif roll < 0.4:
+            batch = []
+            for _ in range(rng.randrange(1, 30)):
+                add(serial, now + rng.randrange(50), rng.randrange(3))
+                batch.append(events[serial])
+                serial += 1
+            event_list.push_many(batch)
+        elif roll < 0.7:
+            key = min(reference, key=reference.get)
+            expected.append((key,) + reference[key][:2])
+            while True:
+                event = event_list.pop()
+                if not event.is_invalid():
+                    break
+            popped.append((keys[id(event)], event.time, event.priority))
+            # Follow the list, which may break ties in another order
+            now = reference.pop(keys[id(event)])[0]
+        elif roll < 0.85:
+            key = rng.choice(list(reference))
+            del reference[key]
+            event_list.remove(events[key])
+        else:
+            key = rng.choice(list(reference))
+            time = now + rng.randrange(60)
+            reference[key] = (time,) + reference[key][1:]
+            event_list.update_event_time(events[key], time)
+    return popped, expected
+
+
+@pytest.mark.parametrize("name", sorted(EVENT_LISTS))
+@pytest.mark.parametrize("seed", range(10))
+def test_pops_in_order(name, seed):
+    popped, expected = _replay(EVENT_LISTS[name](), seed, 2000)
+    assert [entry[1:] for entry in popped] == \
+        [entry[1:] for entry in expected]
+
+
+@pytest.mark.parametrize("name", sorted(FIFO_EVENT_LISTS))
+@pytest.mark.parametrize("seed", range(10))
+def test_ties_pop_in_insertion_order(name, seed):
+    popped, expected = _replay(FIFO_EVENT_LISTS[name](), seed, 2000)
+    assert popped == expected
+
+
+# Lists that leave removed events in place as tombstones
+LAZY_EVENT_LISTS = {
+    "heap": EventList,
+    "keyed": KeyedEventList,
+    "calendar": CalendarEventList,
+}
+
+
+def _held_tombstones(event_list) -> int:
+    return sum(event.is_invalid() for event in event_list)
+
+
+@pytest.mark.parametrize("name", sorted(LAZY_EVENT_LISTS))
+def test_tombstones_only_count_held_events(name):
+    event_list = LAZY_EVENT_LISTS[name](compaction_threshold=None)
+    events = [Event(t, None, 0) for t in range(15)]
+    event_list.push_many(events)
+    popped = [event_list.pop() for _ in range(10)]
+    for event in popped:
+        event_list.remove(event)
+    event_list.remove(Event(99, None, 0))
+    assert event_list.tombstones == 0
+    event_list.remove(events[12])
+    event_list.remove(events[12])
+    assert event_list.tombstones == _held_tombstones(event_list) == 1
+
+
+@pytest.mark.parametrize("name", sorted(LAZY_EVENT_LISTS))
+def test_tombstone_survives_being_pushed_back(name):
+    """Timeline.run pushes back the event it popped past the stop time."""
+
+    event_list = LAZY_EVENT_LISTS[name](compaction_threshold=None)
+    events = [Event(t, None, 0) for t in range(4)]
+    event_list.push_many(events)
+    event_list.remove(events[0])
+    event = event_list.pop()
+    assert event.is_invalid() and event_list.tombstones == 0
+    event_list.push(event)
+    assert event_list.tombstones == _held_tombstones(event_list) == 1
+    assert event_list.pop() is event
+    assert event_list.tombstones == 0
+
+
+@pytest.mark.parametrize("name", sorted(LAZY_EVENT_LISTS))
+@pytest.mark.parametrize("seed", range(5))
+def test_tombstones_match_held_events(name, seed):
+    event_list = LAZY_EVENT_LISTS[name](compaction_threshold=None)
+    _replay(event_list, seed, 1000)
+    assert event_list.tombstones == _held_tombstones(event_list)
+
+
+@pytest.mark.parametrize("name", sorted(LAZY_EVENT_LISTS))
+def test_compaction_drops_tombstones(name):
+    event_list = LAZY_EVENT_LISTS[name]()
+    events = [Event(t, None, 0) for t in range(10)]
+    event_list.push_many(events)
+    for event in events[:6]:
+        event_list.remove(event)
+    assert event_list.compactions == 1
+    assert event_list.tombstones == 0 and len(event_list) == 4
+    # Compacted events are no longer held, so leave no tombstone either
+    event_list.remove(events[0])
+    assert event_list.tombstones == 0
+    assert [event_list.pop() for _ in range(4)] == events[6:]
+
+
+@pytest.mark.parametrize("name", sorted(EVENT_LISTS))
+def test_empty_after_popping_everything(name):
+    event_list = EVENT_LISTS[name]()
+    event_list.push_many([Event(t, None, 0) for t in (3, 1, 2)])
+    assert [event_list.pop().time for _ in range(3)] == [1, 2, 3]
+    assert event_list.isempty()
+
+
+def test_calendar_resizes_and_jumps_ahead():
+    event_list = CalendarEventList()
+    times = [t * 7919 % 10007 for t in range(1000)] + [10 ** 9]
+    event_list.push_many([Event(t, None, 0) for t in times[:500]])
+    for t in times[500:]:
+        event_list.push(Event(t, None, 0))
+    assert event_list.resizes > 0
+    assert [event_list.pop().time for _ in times] == sorted(times)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_indexed_positions_track_heap(seed):
+    event_list = IndexedEventList()
+    _replay(event_list, seed, 500)
+    assert all(event._index == i for i, event in enumerate(event_list.data))
+    keys = event_list.keys
+    assert all(not keys[i] < keys[(i - 1) // 2] for i in range(1, len(keys)))
+
+
+def test_indexed_ignores_events_it_does_not_hold():
+    event_list = IndexedEventList()
+    held, popped = Event(1, None, 0), Event(0, None, 0)
+    event_list.push_many([held, popped])
+    assert event_list.pop() is popped
+    event_list.update_event_time(popped, 5)
+    event_list.remove(popped)
+    assert len(event_list) == 1 and event_list.top() is held
+
+
+@pytest.mark.parametrize("name", sorted(EVENT_LISTS))
+def test_infinite_times_pop_last(name):
+    event_list = EVENT_LISTS[name]()
+    never = [Event(inf, None, priority) for priority in (2, 1)]
+    events = [Event(t, None, 0) for t in (5, 3, 40)]
+    event_list.push(never[0])
+    # Enough events for the calendar to resize around the infinite ones
+    event_list.push_many(events + [Event(t, None, 1) for t in range(10)]
+                         + [never[1]])
+    assert len(event_list) == 15
+    event_list.update_event_time(events[0], inf)
+    event_list.update_event_time(never[0], 7)
+    event_list.remove(events[1])
+    times = []
+    while not event_list.isempty():
+        event = event_list.pop()
+        if not event.is_invalid():
+            times.append((event.time, event.priority))
+    assert times == sorted([(t, 1) for t in range(10)]
+                           + [(7, 2), (40, 0), (inf, 0), (inf, 1)])
+
+
+def test_calendar_keeps_infinite_times_apart():
+    event_list = CalendarEventList()
+    never = Event(inf, None, 0)
+    event_list.push(never)
+    assert event_list.top() is never
+    event_list.push(Event(1, None, 0))
+    assert event_list.top().time == 1
+    assert list(event_list) == [event_list.top(), never]
+    event_list.remove(never)
+    event_list.compact()
+    assert len(event_list) == 1 and list(event_list)[0].time == 1
+    for time in (-inf, nan):
+        with pytest.raises(ValueError):
+            event_list.push(Event(time, None, 0))
+    with pytest.raises(ValueError):
+        event_list.update_event_time(list(event_list)[0], nan)
+    assert event_list.pop().time == 1
@@ -0,0 +1,76 @@
+"""
+Tests of the pool of warm sub-interpreters.
+"""
+
+from glob import glob
+import os
+import time
+
+import pytest
+
+# The module is public from Python 3.14 and a test module before
+try:
+    pytest.importorskip("concurrent.interpreters")
+except pytest.skip.Exception:
+    pytest.importorskip("test.support.interpreters")
+
+from thread_timeline.interpreter_pool import InterpreterPool
+from thread_timeline.thread_pool import run_threads
+
+from helpers import build_thold
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with InterpreterPool(2) as pool:
+        yield pool
+
+
+def test_map_returns_results_in_order(pool):
+    assert pool.map(pow, [(2, 10), (3, 2)]) == [1024, 9]
+    assert pool.map(len, [("abc",)]) == [3]
+
+
+def test_failed_job_leaves_no_result_files(pool):
+    with pytest.raises(RuntimeError):
+        pool.map(int, [("not a number",)])
+    assert not pool.broken
+    assert glob(f"{pool._prefix}-*") == []
+    assert pool.map(int, [("7",)]) == [7]
+
+
+def _wait_for(path):
+    while not os.path.exists(path):
+        time.sleep(0.01)
+    return path
+
+
+def test_broken_pool_removes_late_results(tmp_path):
+    flag = str(tmp_path / "flag")
+    broken = InterpreterPool(2)
+    # The first job fails at once, the second runs until the flag is set
+    with pytest.raises(RuntimeError):
+        broken.map(_wait_for, [(None,), (flag,)])
+    assert broken.broken
+    open(flag, 'w').close()
+    while not glob(f"{broken._prefix}-*"):
+        time.sleep(0.01)
+    broken.close()
+    assert glob(f"{broken._prefix}-*") == []
+    # The second job has finished, so its interpreter can be closed
+    for interpreter in broken.interpreters:
+        interpreter.close()
+
+
+def test_too_many_jobs(pool):
+    with pytest.raises(ValueError):
+        pool.map(abs, [(-1,)] * (pool.size + 1))
+
+
+def test_run_matches_threads(pool):
+    expected = run_threads(build_thold, 2)
+    for _ in range(2):
+        # The interpreters are reused by successive runs
+        results = pool.run(build_thold)
+        assert [result["run_counter"] for result in results] == \
+            [result["run_counter"] for result in expected]
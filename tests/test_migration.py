@@ -0,0 +1,114 @@
+"""
+Tests of load balancing by migrating entities between timelines.
+"""
+
+from threading import Thread
+
+from thread_timeline.entity import Entity
+from thread_timeline.event import Event
+from thread_timeline.process import Process
+from thread_timeline.t_timeline import ThreadedTimeline
+from thread_timeline.transport import QueueHub, QueueTransport
+
+
+class Node(Entity):
+    """Entity that records the times of its events."""
+
+    def __init__(self, name, timeline):
+        super().__init__(name, timeline)
+        self.times = []
+
+    def init(self):
+        pass
+
+    def get(self):
+        self.times.append(self.timeline.now())
+
+
+def _planner(threshold=0.1):
+    return ThreadedTimeline(10, 1000, QueueTransport(0, QueueHub(3)),
+                            rebalance_threshold=threshold)
+
+
+def test_plan_moves_largest_entities_that_fit():
+    times = [3.0, 1.0, 2.0]
+    loads = [{"a": 2, "b": 1, "c": 1}, {"d": 1}, {"e": 1}]
+    # One event costs 0.75 s and half the gap to rank 1 is 1 s, so "a"
+    # does not fit, "b" does and "c" no longer does
+    assert _planner().plan_migrations(times, loads) == {"b": 1}
+
+
+def test_plan_breaks_ties_by_name_and_rank():
+    loads = [{"y": 1, "x": 1}, {}]
+    assert _planner().plan_migrations([4.0, 0.0], loads) == {"x": 1}
+    # Equal times: the busiest and least busy timelines are both rank 0
+    assert _planner().plan_migrations([1.0, 1.0], loads) == {}
+
+
+def test_plan_keeps_balanced_timelines():
+    loads = [{"a": 5}, {"b": 5}, {"c": 5}]
+    assert _planner().plan_migrations([2.1, 2.0, 1.9], loads) == {}
+    # Without a threshold, moving any entity would overshoot the mean
+    assert _planner(0).plan_migrations([2.1, 2.0, 1.9], loads) == {}
+    # Nothing is pending on the busiest timeline
+    assert _planner().plan_migrations([9.0, 0.0, 0.0],
+                                      [{"a": 0}, {}, {}]) == {}
+
+
+def _pair():
+    hub = QueueHub(2)
+    first, second = [ThreadedTimeline(10, 1000, QueueTransport(rank, hub))
+                     for rank in range(2)]
+    Node("a", first)
+    Node("b", first)
+    Node("c", second)
+    first.add_foreign_entity("c", 1)
+    second.add_foreign_entity("a", 0)
+    second.add_foreign_entity("b", 0)
+    return first, second
+
+
+def _migrate(timelines, plan):
+    threads = [Thread(target=timeline.migrate, args=(plan,))
+               for timeline in timelines]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_migrate_moves_entity_and_events():
+    first, second = _pair()
+    for t in (30, 10):
+        first.schedule(Event(t, Process("a", "get", []), 1))
+    first.schedule(Event(20, Process("b", "get", [])))
+    removed = Event(25, Process("a", "get", []))
+    first.schedule(removed)
+    first.remove_event(removed)
+    # Buffered events: one still bound for "c", one already bound for "a"
+    first.schedule(Event(15, Process("c", "get", [])))
+    second.schedule(Event(12, Process("a", "get", [])))
+
+    _migrate([first, second], {"a": 1})
+
+    assert first.migrations == 1 and second.migrations == 0
+    assert "a" not in first.entities and "a" in second.entities
+    assert first.foreign_entities == {"c": 1, "a": 1}
+    assert second.foreign_entities == {"b": 0}
+    node = second.entities["a"]
+    assert node.timeline is second
+    assert [event.time for event in first.event_buffer[1]] == [15]
+    assert second.event_buffer == [[], []]
+    # Pending events keep their priority, the removed one is left behind
+    pending = sorted((event.time, event.priority, event.process.owner)
+                     for event in second.events if not event.is_invalid())
+    assert pending == [(10, 1, node), (12, float("inf"), node),
+                       (30, 1, node)]
+    assert [event.process.owner.name for event in first.events
+            if not event.is_invalid()] == ["b"]
+
+    while len(second.events) > 0:
+        event = second.events.pop()
+        second.time = event.time
+        event.process.run()
+    assert node.times == [10, 12, 30]
@@ -0,0 +1,83 @@
+"""
+Tests that every execution mode runs the same seeded THOLD simulation.
+"""
+
+from functools import partial
+
+import pytest
+
+from thread_timeline.coordinator import run_coordinated
+from thread_timeline.optimistic import OptimisticTimeline
+from thread_timeline.process_pool import run_processes
+from thread_timeline.t_timeline import NULL_MESSAGE_SYNC, ThreadedTimeline
+from thread_timeline.thread_pool import run_threads
+from thread_timeline.transport import QueueHub, QueueTransport
+
+from helpers import build_thold
+
+# Timelines and THOLD nodes of the simulation
+SIZE = 3
+NODES = 24
+
+
+def _summary(timeline):
+    return {"run_counter": timeline.run_counter,
+            "null_messages": timeline.null_messages,
+            "migrations": timeline.migrations}
+
+
+def _run(runner=run_threads, **options):
+    return runner(partial(build_thold, nodes=NODES, **options), SIZE,
+                  _summary)
+
+
+# Runner and timeline options of every mode
+MODES = {
+    "barrier": (run_threads, {}),
+    "null_message": (run_threads, {"synchronization": NULL_MESSAGE_SYNC}),
+    "rebalance": (run_threads, {"rebalance_interval": 1,
+                                "rebalance_threshold": 0}),
+    "process": (run_processes, {}),
+    "coordinated": (run_coordinated, {}),
+    "optimistic": (run_threads, {"timeline_class": OptimisticTimeline}),
+}
+
+
+@pytest.fixture(scope="module")
+def expected():
+    results = _run()
+    assert sum(result["run_counter"] for result in results) > 0
+    return results
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_mode_matches_barrier(mode, expected):
+    runner, options = MODES[mode]
+    results = _run(runner, **options)
+    assert sum(result["run_counter"] for result in results) == \
+        sum(result["run_counter"] for result in expected)
+
+
+def test_null_messages_advance_idle_peers(expected):
+    results = _run(synchronization=NULL_MESSAGE_SYNC)
+    # Timelines do not move entities, so each executes the same events
+    assert [result["run_counter"] for result in results] == \
+        [result["run_counter"] for result in expected]
+    assert sum(result["null_messages"] for result in results) > 0
+    assert all(result["null_messages"] == 0 for result in expected)
+
+
+def test_rebalance_migrates_entities():
+    # Timelines never compute for exactly the same time, so without a
+    # threshold every round moves what fits
+    results = _run(rebalance_interval=1, rebalance_threshold=0)
+    assert sum(result["migrations"] for result in results) > 0
+
+
+def test_null_messages_require_finite_stop_time():
+    transport = QueueTransport(0, QueueHub(2))
+    with pytest.raises(ValueError):
+        ThreadedTimeline(100, transport=transport,
+                         synchronization=NULL_MESSAGE_SYNC)
+    with pytest.raises(ValueError):
+        ThreadedTimeline(100, 5000, transport, synchronization="eventually")
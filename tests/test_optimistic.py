@@ -0,0 +1,115 @@
+"""
+Tests of optimistic (Time Warp) execution.
+"""
+
+from functools import partial
+
+from thread_timeline.entity import Entity
+from thread_timeline.event import Event
+from thread_timeline.optimistic import OptimisticTimeline
+from thread_timeline.process import Process
+from thread_timeline.thread_pool import run_threads
+from thread_timeline.transport import QueueHub, QueueTransport
+
+from helpers import build_thold
+
+
+class Node(Entity):
+    """Entity that counts its events and forwards each one to a peer."""
+
+    def __init__(self, name, timeline, peer=None):
+        super().__init__(name, timeline)
+        self.peer = peer
+        self.count = 0
+
+    def init(self):
+        pass
+
+    def get(self):
+        self.count += 1
+        now = self.timeline.now()
+        if self.peer is not None:
+            self.timeline.schedule(Event(now + 5, Process(self.peer, "get",
+                                                          [])))
+        # Local child, which a rollback of this event must remove
+        self.timeline.schedule(Event(now + 100, Process(self.name, "noop",
+                                                        [])))
+
+    def noop(self):
+        pass
+
+
+def _pair():
+    hub = QueueHub(2)
+    first, second = [OptimisticTimeline(5, 1000, QueueTransport(rank, hub))
+                     for rank in range(2)]
+    a = Node("a", first, peer="b")
+    first.add_foreign_entity("b", 1)
+    b = Node("b", second)
+    second.add_foreign_entity("a", 0)
+    return first, second, a, b
+
+
+def _live_times(timeline, name):
+    return sorted(event.time for event in timeline.events
+                  if not event.is_invalid()
+                  and event.process.owner.name == name
+                  and event.process.activation == "get")
+
+
+def test_straggler_rolls_back_and_cancels_sent_events():
+    first, second, a, b = _pair()
+    for t in (10, 20, 30):
+        first.schedule(Event(t, Process("a", "get", [])))
+    assert first.execute(35, 10) == 3
+    first.send_messages()
+
+    second.receive_messages()
+    assert _live_times(second, "b") == [15, 25, 35]
+    assert second.execute(30, 10) == 2
+    assert b.count == 2
+
+    # Straggler for "a", earlier than the events it executed at 20 and 30
+    second.schedule(Event(12, Process("a", "get", [])))
+    second.send_messages()
+    first.receive_messages()
+    assert (first.rollbacks, first.rolled_back) == (1, 2)
+    assert a.count == 1 and first.now() == 10
+    assert first.anti_messages == 2
+    # Only the child of the event at 10 is left
+    assert sorted(event.time for event in first.events
+                  if not event.is_invalid()) == [12, 20, 30, 110]
+
+    # The anti-messages annihilate an executed and a pending event
+    first.send_messages()
+    second.receive_messages()
+    assert second.annihilated == 2 and second.rollbacks == 1
+    assert b.count == 1
+    assert _live_times(second, "b") == []
+
+    assert first.execute(35, 10) == 3
+    assert a.count == 4
+    first.send_messages()
+    second.receive_messages()
+    assert _live_times(second, "b") == [17, 25, 35]
+
+
+def test_rollback_drops_unsent_messages():
+    first, second, a, b = _pair()
+    for t in (10, 20):
+        first.schedule(Event(t, Process("a", "get", [])))
+    first.execute(25, 10)
+    first.rollback(20)
+    assert first.rolled_back == 1 and first.anti_messages == 0
+    first.send_messages()
+    second.receive_messages()
+    assert _live_times(second, "b") == [15]
+
+
+def test_optimistic_run_matches_conservative_run():
+    conservative = run_threads(build_thold, 2)
+    optimistic = run_threads(partial(build_thold,
+                                     timeline_class=OptimisticTimeline), 2)
+    executed = sum(result["run_counter"] for result in conservative)
+    assert executed > 0
+    assert sum(result["run_counter"] for result in optimistic) == executed
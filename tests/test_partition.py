@@ -0,0 +1,75 @@
+"""
+Tests of the partitioning of entities across timelines.
+"""
+
+from random import Random
+
+import pytest
+
+from thread_timeline.partition import InteractionGraph, partition, _refine
+
+
+def _clusters(parts: int, size: int, seed: int) -> InteractionGraph:
+    """Returns a graph of dense clusters sparsely linked to each other."""
+
+    rng = Random(seed)
+    graph = InteractionGraph()
+    names = [f"{c}-{i}" for c in range(parts) for i in range(size)]
+    for name in names:
+        graph.add_entity(name, 10)
+    for c in range(parts):
+        for i in range(size):
+            for j in range(i + 1, size):
+                graph.add_interaction(f"{c}-{i}", f"{c}-{j}",
+                                      rng.randrange(5, 10))
+    for _ in range(parts * size):
+        source, target = rng.sample(names, 2)
+        graph.add_interaction(source, target, 1)
+    return graph
+
+
+def _planted(parts: int, size: int):
+    return {f"{c}-{i}": c for c in range(parts) for i in range(size)}
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_refinement_reduces_cut(seed):
+    graph = _clusters(4, 8, seed)
+    weights = graph.weights
+    # Interleaved clusters: almost every heavy edge is cut
+    assignment = {name: i % 4 for i, name in enumerate(sorted(weights))}
+    # Single moves need room for one entity above the mean load
+    capacity = sum(weights.values()) / 4 + max(weights.values())
+    before = graph.cut_weight(assignment)
+    assert _refine(graph, weights, assignment, 4, capacity)
+    after = graph.cut_weight(assignment)
+    assert after < before
+    assert max(graph.loads(assignment, 4)) <= capacity
+    # Further passes never make the cut worse
+    while _refine(graph, weights, assignment, 4, capacity):
+        assert graph.cut_weight(assignment) < after
+        after = graph.cut_weight(assignment)
+
+
+@pytest.mark.parametrize("parts", [2, 4])
+@pytest.mark.parametrize("seed", range(5))
+def test_partition_finds_clusters(parts, seed):
+    graph = _clusters(parts, 8, seed)
+    assignment = partition(graph, parts)
+    assert graph.cut_weight(assignment) <= \
+        graph.cut_weight(_planted(parts, 8))
+    loads = graph.loads(assignment, parts)
+    assert max(loads) <= 1.05 * sum(loads) / parts
+
+
+def test_refinement_keeps_a_minimal_cut():
+    graph = _clusters(2, 6, 0)
+    assignment = _planted(2, 6)
+    before = dict(assignment)
+    assert not _refine(graph, graph.weights, assignment, 2, 60)
+    assert assignment == before
+
+
+def test_partition_is_deterministic():
+    graph = _clusters(3, 7, 1)
+    assert partition(graph, 3) == partition(_clusters(3, 7, 1), 3)
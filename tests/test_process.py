@@ -0,0 +1,64 @@
+"""
+Tests of processes and the cache of their bound method.
+"""
+
+import pickle
+
+import pytest
+
+from thread_timeline.process import Process
+
+
+class Counter:
+    def __init__(self):
+        self.calls = []
+
+    def add(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+        return len(self.calls)
+
+
+def test_bind_caches_method():
+    counter = Counter()
+    process = Process("counter", "add", [1], {"step": 2})
+    process.bind(counter)
+    assert process.owner is counter
+    assert process._method == counter.add
+    assert process.run() == 1
+    assert counter.calls == [((1,), {"step": 2})]
+
+
+def test_bind_none_fails_when_run():
+    process = Process("missing", "add", [])
+    process.bind(None)
+    assert process.owner is None and process._method is None
+    with pytest.raises(AttributeError):
+        process.run()
+
+
+def test_pickle_drops_cached_method():
+    process = Process("counter", "add", [1, 2])
+    process.bind(Counter())
+    process.run()
+    state = process.__getstate__()
+    assert "_method" not in state
+
+    # Sent by name, as timelines send events to their peers
+    process.owner = "counter"
+    copy = pickle.loads(pickle.dumps(process))
+    assert (copy.owner, copy.activation, copy.act_params, copy.act_kwargs) \
+        == ("counter", "add", [1, 2], {})
+    assert copy._method is None
+
+    counter = Counter()
+    copy.bind(counter)
+    assert copy.run() == 1
+    assert counter.calls == [((1, 2), {})]
+
+
+def test_run_resolves_method_without_bind():
+    counter = Counter()
+    process = pickle.loads(pickle.dumps(Process(counter, "add", [])))
+    assert process._method is None
+    assert process.run() == 1
+    assert process._method is not None
@@ -0,0 +1,60 @@
+"""
+Tests of the process backend.
+"""
+
+from glob import glob
+import os
+
+import pytest
+
+from thread_timeline.process_pool import run_processes
+from thread_timeline.ring_buffer import default_directory, new_session
+from thread_timeline.thread_pool import run_threads
+
+from helpers import build_thold
+
+
+def _fail_rank_1(transport):
+    # The other ranks wait for rank 1 at their first exchange
+    if transport.rank == 1:
+        raise ValueError("rank 1 is broken")
+    return build_thold(transport)
+
+
+def _exit_rank_1(transport):
+    if transport.rank == 1:
+        os._exit(3)
+    return build_thold(transport)
+
+
+def _files(session):
+    return glob(os.path.join(default_directory(), f"{session}-*"))
+
+
+def test_processes_match_threads():
+    session = new_session("thread-timeline-test")
+    results = run_processes(build_thold, 2, session=session)
+    assert [result["run_counter"] for result in results] == \
+        [result["run_counter"] for result in run_threads(build_thold, 2)]
+    assert [result["id"] for result in results] == [0, 1]
+    assert _files(session) == []
+
+
+def test_failed_worker_terminates_others():
+    session = new_session("thread-timeline-test")
+    with pytest.raises(RuntimeError, match="timeline 1 failed") as error:
+        run_processes(_fail_rank_1, 3, session=session)
+    assert "rank 1 is broken" in str(error.value)
+    assert _files(session) == []
+
+
+def test_dead_worker_terminates_others():
+    session = new_session("thread-timeline-test")
+    with pytest.raises(RuntimeError, match="timeline 1 exited with code 3"):
+        run_processes(_exit_rank_1, 3, session=session)
+    assert _files(session) == []
+
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        run_processes(build_thold, 0)
@@ -0,0 +1,154 @@
+"""
+Tests of the window and cost profilers.
+"""
+
+from random import Random
+import csv
+import json
+
+import pytest
+
+from thread_timeline import profiler
+from thread_timeline.profiler import (COLUMNS, CostProfiler, FULL_ACCOUNTING,
+                                      SAMPLED_ACCOUNTING, WindowProfiler)
+
+
+class Clock:
+    """Fake perf_counter, advanced by the processes it times."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Fast:
+    pass
+
+
+class Slow:
+    pass
+
+
+class Work:
+    """Process that takes `cost` seconds of the fake clock to run."""
+
+    def __init__(self, owner, activation, cost, clock):
+        self.owner = owner
+        self.activation = activation
+        self.cost = cost
+        self.clock = clock
+
+    def run(self):
+        self.clock.now += self.cost
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(profiler, "perf_counter", clock)
+    return clock
+
+
+def _sampled(seed=1):
+    costs = CostProfiler(SAMPLED_ACCOUNTING, 64)
+    costs._random = Random(seed)
+    costs._countdown = costs._draw()
+    return costs
+
+
+def test_full_accounting_times_every_call(clock):
+    costs = CostProfiler(FULL_ACCOUNTING)
+    for _ in range(10):
+        costs.run(Work(Fast(), "get", 1.0, clock))
+    costs.run(Work(Slow(), "put", 5.0, clock))
+    assert costs.summary() == [("Fast", "get", 10, 10.0),
+                               ("Slow", "put", 1, 5.0)]
+    assert costs.costs[("Fast", "get")] == [10, 10, 10.0]
+
+
+def test_sampling_counts_every_call_and_finds_rare_methods(clock):
+    costs = _sampled()
+    for _ in range(1000):
+        costs.run(Work(Fast(), "get", 1.0, clock))
+    costs.run(Work(Slow(), "rare", 500.0, clock))
+    summary = {(owner, method): (calls, seconds)
+               for owner, method, calls, seconds in costs.summary()}
+    assert summary == {("Fast", "get"): (1000, 1000.0),
+                       ("Slow", "rare"): (1, 500.0)}
+    assert costs.costs[("Fast", "get")][1] < 100
+    assert "Slow" in costs.report()
+
+
+def test_sampling_does_not_alias_with_periodic_events(clock):
+    costs = _sampled()
+    # One slow event in every 64, the mean sampling interval
+    for _ in range(1000):
+        for _ in range(63):
+            costs.run(Work(Fast(), "get", 1.0, clock))
+        costs.run(Work(Slow(), "put", 100.0, clock))
+    fast_timed = costs.costs[("Fast", "get")][1]
+    slow_timed = costs.costs[("Slow", "put")][1]
+    # A fixed stride would time only one of the two methods
+    assert 500 < fast_timed < 1500
+    assert 3 < slow_timed < 40
+
+
+def test_invalid_sampling():
+    with pytest.raises(ValueError):
+        CostProfiler(SAMPLED_ACCOUNTING, 0)
+    with pytest.raises(ValueError):
+        CostProfiler("sometimes")
+
+
+def _windows(count, capacity=2):
+    """Returns a profiler of 3 timelines with `count` recorded windows."""
+
+    windows = WindowProfiler(1, 3, capacity)
+    for i in range(count):
+        windows.record(10.0 * i, 10.0, i, 2 * i, 0.5, 0.25, 0.125, 0.0625,
+                       1.5, [i, 0, 2 * i], [0, i + 1, 3])
+    return windows
+
+
+def _expected(i):
+    return {'rank': 1, 'window': i, 'start': 10.0 * i, 'width': 10.0,
+            'executed': i, 'queue_depth': 2 * i, 'encode_time': 0.5,
+            'transport_time': 0.25, 'wait_time': 0.125,
+            'decode_time': 0.0625, 'compute_time': 1.5, 'sent_0': i,
+            'sent_1': 0, 'sent_2': 2 * i, 'received_0': 0,
+            'received_1': i + 1, 'received_2': 3}
+
+
+def test_windows_grow_past_capacity():
+    windows = _windows(5)
+    assert windows.windows == 5
+    assert windows._capacity == 8
+    assert all(len(column) == 8 for column in windows.columns.values())
+    assert len(windows.sent) == len(windows.received) == 8 * 3
+    # Rows recorded before growing are kept
+    assert windows.rows() == [_expected(i) for i in range(5)]
+
+
+def test_windows_to_csv(tmp_path):
+    path = tmp_path / "windows.csv"
+    _windows(5).to_csv(path)
+    with open(path, newline='') as file:
+        reader = csv.DictReader(file)
+        assert reader.fieldnames == _windows(0).fieldnames()
+        rows = list(reader)
+    assert len(rows) == 5
+    for i, row in enumerate(rows):
+        assert {name: float(value) for name, value in row.items()} == \
+            _expected(i)
+
+
+def test_windows_to_json(tmp_path):
+    path = tmp_path / "windows.json"
+    _windows(5).to_json(path)
+    with open(path) as file:
+        exported = json.load(file)
+    assert exported == {'rank': 1, 'size': 3,
+                        'windows': [_expected(i) for i in range(5)]}
+    assert set(exported['windows'][0]) >= {name for name, _ in COLUMNS}
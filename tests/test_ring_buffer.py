@@ -0,0 +1,213 @@
+"""
+Tests of the RingBuffer and SharedMemoryTransport classes.
+"""
+
+from threading import Thread
+from time import sleep
+import os
+import resource
+
+import pytest
+
+from thread_timeline import ring_buffer
+from thread_timeline.ring_buffer import (RingBuffer, PipeBuffer,
+                                        SharedMemoryTransport,
+                                        DEFAULT_BUDGET, DEFAULT_CAPACITY,
+                                        MIN_CAPACITY, default_capacity,
+                                        new_session)
+
+
+def test_ring_wraps_around(tmp_path):
+    ring = RingBuffer(str(tmp_path / "ring"), capacity=16)
+    out = bytearray(16)
+    written = b""
+    read = b""
+    for i in range(20):
+        chunk = bytes(range(i, i + 7))
+        assert ring.write_some(memoryview(chunk)) == 7
+        written += chunk
+        n = ring.read_some(memoryview(out)[:7])
+        read += out[:n]
+    assert read == written
+    assert ring.readable() == 0
+    assert ring.writable() == 16
+    ring.close(unlink=True)
+
+
+def test_ring_writes_only_what_fits(tmp_path):
+    ring = RingBuffer(str(tmp_path / "ring"), capacity=16)
+    assert ring.write_some(memoryview(bytes(10))) == 10
+    assert ring.write_some(memoryview(b"x" * 10)) == 6
+    assert ring.write_some(memoryview(b"y")) == 0
+    out = bytearray(32)
+    assert ring.read_some(memoryview(out)) == 16
+    assert ring.read_some(memoryview(out)) == 0
+    ring.close(unlink=True)
+
+
+def test_ring_attaches_by_path(tmp_path):
+    path = str(tmp_path / "ring")
+    producer = RingBuffer(path, capacity=32)
+    consumer = RingBuffer(path, capacity=32)
+    producer.write_some(memoryview(b"hello"))
+    out = bytearray(5)
+    assert consumer.read_some(memoryview(out)) == 5
+    assert out == b"hello"
+    assert producer.writable() == 32
+    producer.close()
+    consumer.close(unlink=True)
+    assert not os.path.exists(path)
+
+
+def test_ring_requires_total_store_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(ring_buffer.platform, "machine", lambda: "aarch64")
+    assert not ring_buffer.total_store_order()
+    with pytest.raises(RuntimeError):
+        RingBuffer(str(tmp_path / "ring"), capacity=16)
+    transport = SharedMemoryTransport(0, 2, "test", 4096,
+                                      directory=str(tmp_path))
+    assert transport.pipes
+    assert all(isinstance(pipe, PipeBuffer)
+               for pipe in transport.send_rings.values())
+    transport.close()
+
+
+def test_pipe_writes_only_what_fits(tmp_path):
+    path = str(tmp_path / "pipe")
+    producer = PipeBuffer(path, capacity=4096)
+    consumer = PipeBuffer(path, capacity=4096)
+    data = os.urandom(3 * producer.capacity)
+    written = producer.write_some(memoryview(data))
+    assert 0 < written <= producer.capacity
+    assert producer.write_some(memoryview(data[written:])) == 0
+    assert producer.writable() == 0
+    assert consumer.readable() == written
+    out = bytearray(len(data))
+    assert consumer.read_some(memoryview(out)) == written
+    assert out[:written] == data[:written]
+    assert consumer.read_some(memoryview(out)) == 0
+    assert producer.writable() > 0
+    producer.close()
+    consumer.close(unlink=True)
+    assert os.listdir(tmp_path) == []
+
+
+def _transports(tmp_path, size, capacity, pipes=False):
+    return [SharedMemoryTransport(rank, size, "test", capacity,
+                                  directory=str(tmp_path), spin=0,
+                                  pipes=pipes)
+            for rank in range(size)]
+
+
+def test_pipes_stream_large_payloads(tmp_path):
+    transports = _transports(tmp_path, 3, capacity=4096, pipes=True)
+    payloads = {rank: os.urandom(100000 + rank) for rank in range(3)}
+    results = [None] * 3
+
+    def exchange(rank):
+        results[rank] = transports[rank].exchange(
+            {peer: payloads[rank] for peer in range(3) if peer != rank})
+
+    threads = [Thread(target=exchange, args=(rank,)) for rank in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for rank, received in enumerate(results):
+        assert received == {peer: payloads[peer] for peer in range(3)
+                            if peer != rank}
+    for transport in transports:
+        transport.close()
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.parametrize("pipes", [False, True])
+def test_partial_frames_resume(tmp_path, pipes):
+    sender, receiver = _transports(tmp_path, 2, capacity=64, pipes=pipes)
+    capacity = sender.send_rings[1].capacity
+    payloads = [os.urandom(n) for n in (0, 1, capacity - 1, capacity,
+                                        capacity + 1, 16 * capacity)]
+    for payload in payloads:
+        sender.post(1, payload)
+    received = []
+    attempts = 0
+    while len(received) < len(payloads):
+        payload = receiver.try_recv(0)
+        if payload is None:
+            # Lets the sender write what its outbox still holds
+            sender.try_recv(1)
+            attempts += 1
+        else:
+            received.append(bytes(payload))
+    assert received == payloads
+    # Frames larger than the ring cannot arrive in one read
+    assert attempts > 0
+    for transport in (sender, receiver):
+        transport.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_default_capacity_fits_budget():
+    assert default_capacity(2) == DEFAULT_CAPACITY
+    for size in (9, 16, 32, 64, 90):
+        capacity = default_capacity(size)
+        assert MIN_CAPACITY <= capacity < DEFAULT_CAPACITY
+        assert size * (size - 1) * capacity <= DEFAULT_BUDGET
+    assert default_capacity(128) == MIN_CAPACITY
+
+
+def test_transport_uses_default_capacity(tmp_path):
+    transports = _transports(tmp_path, 3, capacity=None)
+    assert all(transport.capacity == default_capacity(3)
+               for transport in transports)
+    for transport in transports:
+        transport.close()
+
+
+def test_new_sessions_differ():
+    assert new_session() != new_session()
+
+
+def test_many_ranks_block_beyond_select_limit(tmp_path):
+    """Doorbells numbered above FD_SETSIZE (1024) must still be waited on."""
+
+    size = 20
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    needed = 4 * size * (size - 1) + 256
+    if soft < needed:
+        if hard != resource.RLIM_INFINITY and hard < needed:
+            pytest.skip("not enough file descriptors")
+        resource.setrlimit(resource.RLIMIT_NOFILE, (needed, hard))
+    transports = _transports(tmp_path, size, capacity=4096)
+    try:
+        assert max(ring.data_bell for ring in
+                   transports[-1].recv_rings.values()) > 1024
+        results = [None] * size
+        errors = []
+
+        def exchange(rank):
+            if rank == 0:
+                # Slow rank: every other one blocks on its doorbells
+                sleep(0.2)
+            try:
+                results[rank] = transports[rank].exchange(
+                    {peer: bytes([rank]) for peer in range(size)
+                     if peer != rank})
+            except BaseException as error:
+                errors.append(error)
+
+        threads = [Thread(target=exchange, args=(rank,))
+                   for rank in range(size)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        for rank, received in enumerate(results):
+            assert received == {peer: bytes([peer]) for peer in range(size)
+                                if peer != rank}
+        assert transports[-1].blocks > 0
+    finally:
+        for transport in transports:
+            transport.close()
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
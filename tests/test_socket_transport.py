@@ -0,0 +1,87 @@
+"""
+Tests of the socket transport and its authentication.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import socket
+
+import pytest
+
+from thread_timeline.socket_transport import (AUTHKEY_VARIABLE,
+                                              LOOPBACK_HOST, SocketTransport,
+                                              parse_address)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind((LOOPBACK_HOST, 0))
+        return sock.getsockname()[1]
+
+
+def _connect(address, authkeys, timeout=10.0):
+    """Returns the outcome of creating the transport of every rank."""
+
+    def create(rank):
+        try:
+            return SocketTransport(rank, len(authkeys), address, timeout,
+                                   authkeys[rank])
+        except Exception as error:
+            return error
+
+    with ThreadPoolExecutor(len(authkeys)) as pool:
+        return list(pool.map(create, range(len(authkeys))))
+
+
+def _exchange(transports):
+    def exchange(transport):
+        try:
+            return transport.exchange({peer: bytes([transport.rank]) * 3
+                                       for peer in range(transport.size)
+                                       if peer != transport.rank})
+        finally:
+            # Together, since each waits for its peers to close too
+            transport.close()
+
+    with ThreadPoolExecutor(len(transports)) as pool:
+        return list(pool.map(exchange, transports))
+
+
+def test_addresses_without_host_are_loopback():
+    assert parse_address(":5000") == (socket.AF_INET, (LOOPBACK_HOST, 5000))
+    assert parse_address("[::1]:5000") == (socket.AF_INET6, ("::1", 5000))
+    with pytest.raises(ValueError):
+        parse_address("5000")
+
+
+def test_tcp_exchange_with_authkey():
+    transports = _connect(f":{_free_port()}", [b"secret"] * 3)
+    assert all(isinstance(t, SocketTransport) for t in transports)
+    results = _exchange(transports)
+    for rank, received in enumerate(results):
+        assert received == {peer: bytes([peer]) * 3
+                            for peer in range(3) if peer != rank}
+
+
+def test_unix_exchange_without_authkey(tmp_path):
+    transports = _connect(f"unix:{tmp_path / 'rendezvous'}", [None, None])
+    assert _exchange(transports) == [{1: b'\x01' * 3}, {0: b'\x00' * 3}]
+
+
+def test_authkey_from_environment(monkeypatch):
+    monkeypatch.setenv(AUTHKEY_VARIABLE, "secret")
+    transports = _connect(f":{_free_port()}", [None, b"secret"])
+    assert _exchange(transports) == [{1: b'\x01' * 3}, {0: b'\x00' * 3}]
+
+
+def test_tcp_requires_authkey(monkeypatch):
+    monkeypatch.delenv(AUTHKEY_VARIABLE, raising=False)
+    with pytest.raises(ValueError):
+        SocketTransport(0, 2, f":{_free_port()}")
+
+
+def test_wrong_authkey_is_rejected():
+    root, stranger = _connect(f":{_free_port()}", [b"secret", b"guess"],
+                              timeout=1.0)
+    assert isinstance(stranger, ConnectionError)
+    # The root ignores the stranger and keeps waiting for a real peer
+    assert isinstance(root, TimeoutError)
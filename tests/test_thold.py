@@ -0,0 +1,54 @@
+"""
+Tests of the THOLD node and its random draw backends.
+"""
+
+import pytest
+
+from thread_timeline import thold
+from thread_timeline.thold import NUMPY_BACKEND, PYTHON_BACKEND, TholdNode
+from thread_timeline.timeline import Timeline
+
+
+def _node(backend, block_size=8):
+    timeline = Timeline(1000)
+    timeline.seed(1)
+    neighbors = [str(i) for i in range(4)]
+    node = TholdNode("0", timeline, 20, 100, neighbors, backend=backend,
+                     block_size=block_size)
+    node.init()
+    return node
+
+
+def _draws(node, count):
+    return [(event.time, event.process.owner)
+            for event in (node.generate_event() for _ in range(count))]
+
+
+def _check_rollback(node):
+    # Far enough to draw several blocks past the saved one
+    _draws(node, 3)
+    state = node.save_state()
+    expected = _draws(node, 30)
+    node.restore_state(state)
+    assert _draws(node, 30) == expected
+
+
+def test_python_backend_is_default():
+    timeline = Timeline(1000)
+    node = TholdNode("0", timeline, 20, 100, ["0", "1"])
+    assert node.backend == PYTHON_BACKEND
+    with pytest.raises(ValueError):
+        TholdNode("1", timeline, 20, 100, ["0", "1"], backend="fortran")
+
+
+def test_python_backend_restores_state():
+    _check_rollback(_node(PYTHON_BACKEND))
+
+
+def test_numpy_backend():
+    numpy = pytest.importorskip("numpy")
+    generator = numpy.random.default_rng(1)
+    indices, delays = thold._draw_numpy(generator, 4, 100, 1000)
+    assert all(type(index) is int and 0 <= index < 4 for index in indices)
+    assert all(type(delay) is int and delay >= 100 for delay in delays)
+    _check_rollback(_node(NUMPY_BACKEND))
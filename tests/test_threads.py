@@ -0,0 +1,21 @@
+"""
+Tests of the thread backend, which passes events by reference.
+"""
+
+from functools import partial
+
+from thread_timeline.codec import ReferenceCodec
+from thread_timeline.thread_pool import run_threads
+
+from helpers import build_thold
+
+
+def _summary(timeline):
+    return isinstance(timeline.codec, ReferenceCodec), timeline.run_counter
+
+
+def test_adaptive_windows_by_reference():
+    fixed = run_threads(build_thold, 3, _summary)
+    adaptive = run_threads(partial(build_thold, adaptive=True), 3, _summary)
+    assert all(by_reference for by_reference, _ in fixed + adaptive)
+    assert adaptive == fixed
@@ -0,0 +1,95 @@
+"""
+Tests of scheduling on the sequential and threaded timelines.
+"""
+
+from math import inf
+
+from thread_timeline.entity import Entity
+from thread_timeline.event import Event
+from thread_timeline.process import Process
+from thread_timeline.t_timeline import ThreadedTimeline
+from thread_timeline.timeline import Timeline
+from thread_timeline.transport import QueueHub, QueueTransport
+
+
+class Node(Entity):
+    def init(self):
+        pass
+
+    def get(self):
+        pass
+
+
+def _events(owners):
+    return [Event(time, Process(owner, "get", []), priority)
+            for time, priority, owner in owners]
+
+
+def _threaded():
+    timeline = ThreadedTimeline(10, 1000, QueueTransport(0, QueueHub(3)))
+    node = Node("a", timeline)
+    timeline.add_foreign_entity("b", 1)
+    timeline.add_foreign_entity("c", 2)
+    return timeline, node
+
+
+def _drain(timeline):
+    events = []
+    while len(timeline.events) > 0:
+        event = timeline.events.pop()
+        events.append((event.time, event.priority, event.process.owner))
+    return events
+
+
+OWNERS = [(30, 0, "a"), (12, 1, "b"), (20, 2, "a"), (25, 0, "c"),
+          (8, 5, "b"), (20, 1, "a")]
+
+
+def test_schedule_many_matches_schedule():
+    batched, one_by_one = Timeline(), Timeline()
+    nodes = [Node("a", batched), Node("a", one_by_one)]
+    # Names without an entity are bound to None, as `schedule` does
+    owners = [(3, 0, "a"), (1, 0, "a"), (2, 0, "missing"), (1, 1, "a")]
+    batched.schedule_many(iter(_events(owners)))
+    for event in _events(owners):
+        one_by_one.schedule(event)
+    assert batched.schedule_counter == one_by_one.schedule_counter == 4
+    assert _drain(batched) == [(1, 0, nodes[0]), (1, 1, nodes[0]),
+                               (2, 0, None), (3, 0, nodes[0])]
+    assert _drain(one_by_one) == [(1, 0, nodes[1]), (1, 1, nodes[1]),
+                                  (2, 0, None), (3, 0, nodes[1])]
+
+
+def test_threaded_schedule_many_splits_foreign_events():
+    timeline, node = _threaded()
+    assert timeline.buffer_min_ts == inf
+    timeline.schedule_many(iter(_events(OWNERS)))
+
+    assert timeline.schedule_counter == len(OWNERS)
+    assert timeline.buffer_min_ts == 8
+    assert timeline.event_buffer[0] == []
+    assert [(event.time, event.process.owner)
+            for event in timeline.event_buffer[1]] == [(12, "b"), (8, "b")]
+    assert [(event.time, event.process.owner)
+            for event in timeline.event_buffer[2]] == [(25, "c")]
+    assert _drain(timeline) == [(20, 1, node), (20, 2, node), (30, 0, node)]
+
+
+def test_threaded_schedule_many_matches_schedule():
+    batched, _ = _threaded()
+    one_by_one, _ = _threaded()
+    batched.schedule(Event(5, Process("c", "get", [])))
+    one_by_one.schedule(Event(5, Process("c", "get", [])))
+    batched.schedule_many(_events(OWNERS))
+    for event in _events(OWNERS):
+        one_by_one.schedule(event)
+
+    # The buffer minimum covers events scheduled before the batch too
+    assert batched.buffer_min_ts == one_by_one.buffer_min_ts == 5
+    assert batched.schedule_counter == one_by_one.schedule_counter
+    for batched_buffer, buffer in zip(batched.event_buffer,
+                                      one_by_one.event_buffer):
+        assert [event.time for event in batched_buffer] == \
+            [event.time for event in buffer]
+    assert [time for time, _, _ in _drain(batched)] == \
+        [time for time, _, _ in _drain(one_by_one)]
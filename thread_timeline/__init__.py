@@ -3,10 +3,29 @@
 
 #__all__ = ["entity", "event", "eventlist", "process", "t_timeline", "thold", "timeline"]
 
+from .calendar_eventlist import CalendarEventList
+from .codec import BatchCodec, PickleCodec, ReferenceCodec
+from .coordinator import run_timelines, run_coordinated
 from .entity import Entity
 from .event import Event
-from .eventlist import EventList
+from .interpreter_pool import InterpreterPool, KERNEL_MODULES
+from .eventlist import (EventList, KeyedEventList, IndexedEventList,
+                        HEAP_EVENT_LIST, KEYED_EVENT_LIST, CALENDAR_EVENT_LIST,
+                        INDEXED_EVENT_LIST)
+from .optimistic import OptimisticTimeline
+from .partition import (InteractionGraph, InteractionRecorder, partition,
+                        apply_partition)
 from .process import Process
-from .t_timeline import ThreadedTimeline
-from .thold import TholdNode
-from .timeline import Timeline
\ No newline at end of file
+from .process_pool import run_processes, default_summary
+from .profiler import (WindowProfiler, CostProfiler, FULL_ACCOUNTING,
+                       SAMPLED_ACCOUNTING)
+from .ring_buffer import (RingBuffer, PipeBuffer, SharedMemoryTransport,
+                          remove_session, default_capacity, new_session,
+                          process_session, total_store_order)
+from .socket_transport import SocketTransport, parse_address
+from .t_timeline import ThreadedTimeline, BARRIER_SYNC, NULL_MESSAGE_SYNC
+from .thold import TholdNode, NUMPY_BACKEND, PYTHON_BACKEND
+from .thread_pool import run_threads, run_parallel, gil_disabled
+from .timeline import Timeline
+from .transport import (Transport, FileTransport, QueueHub,
+                        QueueTransport)
\ No newline at end of file
@@ -0,0 +1,16 @@
+"""
+Imports that differ between versions of Python.
+
+The interpreters module is public from Python 3.14 and a test module
+before; `interpreters` is None where neither exists, so the kernel also
+works on interpreters without sub-interpreters when it is not asked to
+create them.
+"""
+
+try:
+    from concurrent import interpreters
+except ImportError:
+    try:
+        from test.support import interpreters
+    except ImportError:
+        interpreters = None
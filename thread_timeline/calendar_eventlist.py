@@ -0,0 +1,323 @@
+"""
+Definition of CalendarEventList class.
+
+This module defines the CalendarEventList class, an alternative to the heap
+based EventList. It implements the calendar queue of R. Brown ("Calendar
+Queues: A Fast O(1) Priority Queue Implementation for the Simulation Event
+Set Problem", 1988), which has O(1) amortized push and pop when event times
+are spread over a bounded window ahead of the current time, as in THOLD.
+"""
+
+from bisect import insort
+from heapq import nsmallest
+from itertools import count
+from math import inf
+from sys import getsizeof
+from typing import TYPE_CHECKING, Iterable, Optional
+
+from .eventlist import COMPACTION_THRESHOLD
+
+if TYPE_CHECKING:
+    from .event import Event
+
+# Number of earliest events sampled to estimate a new bucket width
+WIDTH_SAMPLE_SIZE = 25
+
+
+class CalendarEventList:
+    """
+    Class of calendar queue event list.
+
+    Time is divided into "days" of `width` time units, and day `d` is stored
+    in bucket `d % len(buckets)`, like the days of a year on a desk calendar.
+    Each bucket is a sorted list of `(time, priority, seq, event)` entries.
+    Popping scans forward from the current day for the first bucket whose
+    earliest entry falls on or before the day being scanned; if a whole year
+    is scanned without a hit, the earliest entry is searched for directly.
+
+    The number of buckets doubles when the list holds more than twice as
+    many events as buckets and halves when it holds fewer than half, and
+    the bucket width is re-estimated from the spacing of the earliest events
+    on every resize. Events at an infinite time fall on no day, so they are
+    kept in a sorted overflow list that is only popped once the buckets are
+    empty.
+
+    Removed events stay in their bucket as tombstones until popped, or until
+    they exceed `compaction_threshold` of the events held and the calendar
+    is rebuilt without them. As in the heap event lists, `Event._index` is
+    0 while the calendar holds an event, so only those are counted.
+
+    Attributes:
+        resizes (int): number of times the calendar has been rebuilt.
+        compaction_threshold (float): fraction of removed events that
+            triggers a compaction, or None to never compact.
+        tombstones (int): number of removed events still in the calendar.
+        compactions (int): number of compactions performed.
+        bytes_reclaimed (int): estimated bytes released by compactions.
+    """
+
+    def __init__(self, buckets: int = 2, width: float = 1.0,
+                 compaction_threshold: Optional[float] =
+                 COMPACTION_THRESHOLD):
+        """
+        Constructor for CalendarEventList class.
+
+        Args:
+            buckets (int): initial number of buckets (default 2).
+            width (float): initial bucket width (default 1.0).
+            compaction_threshold (float): fraction of removed events that
+                triggers a compaction, or None to never compact (default
+                0.5).
+        """
+
+        self._seq = count()
+        self._size = 0
+        self.resizes = 0
+        self.compaction_threshold = compaction_threshold
+        self.tombstones = 0
+        self.compactions = 0
+        self.bytes_reclaimed = 0
+        self._rebuild(buckets, width, [])
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        for bucket in (*self._buckets, self._overflow):
+            for entry in bucket:
+                yield entry[3]
+
+    def _entries(self) -> list:
+        """Returns the entries of all buckets and of the overflow list."""
+
+        return [entry for bucket in (*self._buckets, self._overflow)
+                for entry in bucket]
+
+    @staticmethod
+    def _overflows(time) -> bool:
+        """
+        Method to check whether a time belongs in the overflow list.
+
+        Raises:
+            ValueError: the time falls on no day and is not infinity.
+        """
+
+        if time == inf:
+            return True
+        if time != time or time == -inf:
+            raise ValueError(f"Invalid event time {time}")
+        return False
+
+    def _rebuild(self, buckets: int, width: float, entries) -> None:
+        """Method to redistribute entries over a new set of buckets."""
+
+        overflows = self._overflows
+        self._overflow = sorted(entry for entry in entries
+                                if overflows(entry[0]))
+        entries = [entry for entry in entries if entry[0] != inf]
+        self._buckets = [[] for _ in range(buckets)]
+        self._width = width
+        self._grow_at = 2 * buckets
+        self._shrink_at = buckets // 2 - 2
+        self._day = 0
+        self._last = 0
+        if entries:
+            first = min(entries)
+            self._day = int(first[0] // width)
+            self._last = self._day % buckets
+            for entry in entries:
+                insort(self._buckets[int(entry[0] // width) % buckets], entry)
+
+    def _resize(self, buckets: int) -> None:
+        """Method to change the number of buckets and re-estimate width."""
+
+        entries = self._entries()
+        self.resizes += 1
+        self._rebuild(buckets, self._estimate_width(entries), entries)
+
+    def _estimate_width(self, entries) -> float:
+        """
+        Method to estimate the bucket width from the earliest events.
+
+        Uses three times the average separation of the earliest events,
+        ignoring separations more than twice the average.
+        """
+
+        times = [entry[0] for entry in nsmallest(WIDTH_SAMPLE_SIZE, entries)
+                 if entry[0] != inf]
+        gaps = [b - a for a, b in zip(times, times[1:])]
+        if not gaps:
+            return self._width
+        average = sum(gaps) / len(gaps)
+        kept = [gap for gap in gaps if gap <= 2 * average]
+        width = 3 * sum(kept) / len(kept)
+        return width if width > 0 else self._width
+
+    def _locate(self):
+        """Method to find (and move to) the bucket holding the next event."""
+
+        buckets = self._buckets
+        n = len(buckets)
+        width = self._width
+        i = self._last
+        day = self._day
+        for _ in range(n):
+            bucket = buckets[i]
+            if bucket and bucket[0][0] // width <= day:
+                self._last = i
+                self._day = day
+                return bucket
+            day += 1
+            i += 1
+            if i == n:
+                i = 0
+
+        # No event within a year: jump straight to the earliest one
+        bucket = min((b for b in buckets if b), key=lambda b: b[0],
+                     default=None)
+        if bucket is None:
+            # Only events at an infinite time are left
+            return self._overflow
+        self._day = int(bucket[0][0] // width)
+        self._last = self._day % n
+        return bucket
+
+    def _insert(self, entry) -> None:
+        try:
+            day = int(entry[0] // self._width)
+        except (OverflowError, ValueError):
+            if not self._overflows(entry[0]):
+                raise
+            insort(self._overflow, entry)
+            return
+        if day < self._day:
+            # Event is earlier than the current day; restart scan from it
+            self._day = day
+            self._last = day % len(self._buckets)
+        insort(self._buckets[day % len(self._buckets)], entry)
+
+    # Add event to its bucket
+    def push(self, event: "Event") -> "None":
+        event._index = 0
+        if event._is_removed:
+            self.tombstones += 1
+        self._insert((event.time, event.priority, next(self._seq), event))
+        self._size += 1
+        if self._size > self._grow_at:
+            self._resize(2 * len(self._buckets))
+
+    def push_many(self, events: "Iterable[Event]") -> None:
+        """
+        Method to add a batch of events to the calendar.
+
+        The calendar is resized at most once for the whole batch, straight
+        to the number of buckets the new size calls for.
+        """
+
+        seq = self._seq
+        entries = [(event.time, event.priority, next(seq), event)
+                   for event in events]
+        for entry in entries:
+            entry[3]._index = 0
+            if entry[3]._is_removed:
+                self.tombstones += 1
+        self._size += len(entries)
+        buckets = len(self._buckets)
+        while self._size > 2 * buckets:
+            buckets *= 2
+        if buckets == len(self._buckets):
+            for entry in entries:
+                self._insert(entry)
+            return
+
+        entries.extend(self._entries())
+        self.resizes += 1
+        self._rebuild(buckets, self._estimate_width(entries), entries)
+
+    # Pops and returns event with lowest time and priority
+    def pop(self) -> "Event":
+        if self._size == 0:
+            raise IndexError("pop from empty event list")
+        event = self._locate().pop(0)[3]
+        self._size -= 1
+        event._index = -1
+        if event._is_removed:
+            self.tombstones -= 1
+        if self._size < self._shrink_at:
+            self._resize(len(self._buckets) // 2)
+        return event
+
+    # Returns data from event with the lowest time and priority
+    def top(self) -> "Event":
+        if self._size == 0:
+            raise IndexError("top of empty event list")
+        return self._locate()[0][3]
+
+    def isempty(self) -> bool:
+        return self._size == 0
+
+    def remove(self, event: "Event") -> None:
+        """
+        Method to remove events from calendar.
+
+        The event is set as the invalid state to save the time of removing
+        event from calendar. The calendar is compacted once too many removed
+        events accumulate.
+        """
+
+        if event.is_invalid():
+            return
+        event.set_invalid()
+        # Events already popped, or never pushed, leave no tombstone
+        if event._index < 0:
+            return
+        self.tombstones += 1
+        if self.compaction_threshold is not None and \
+                self.tombstones > self.compaction_threshold * self._size:
+            self.compact()
+
+    def compact(self) -> None:
+        """Method to rebuild the calendar from the events still valid."""
+
+        entries = []
+        reclaimed = 0
+        for bucket in (*self._buckets, self._overflow):
+            reclaimed += getsizeof(bucket)
+            for entry in bucket:
+                if entry[3]._is_removed:
+                    reclaimed += getsizeof(entry) + getsizeof(entry[3])
+                    entry[3]._index = -1
+                else:
+                    entries.append(entry)
+        self._rebuild(len(self._buckets), self._width, entries)
+        reclaimed -= sum(getsizeof(bucket)
+                         for bucket in (*self._buckets, self._overflow))
+        self.bytes_reclaimed += reclaimed
+        self._size = len(entries)
+        self.tombstones = 0
+        self.compactions += 1
+
+    def update_event_time(self, event: "Event", time: int):
+        """
+        Method to update the timestamp of event.
+
+        Only the bucket of the event's current day, or the overflow list
+        for an infinite time, is searched, so the cost does not depend on
+        the number of events in the calendar.
+        """
+        if time == event.time:
+            return
+        # Checked before the entry is taken out of its bucket
+        self._overflows(time)
+
+        if event.time == inf:
+            bucket = self._overflow
+        else:
+            bucket = self._buckets[int(event.time // self._width)
+                                   % len(self._buckets)]
+        for i, entry in enumerate(bucket):
+            if entry[3] is event:
+                del bucket[i]
+                event.time = time
+                self._insert((time, event.priority, entry[2], event))
+                break
@@ -0,0 +1,433 @@
+"""
+Definition of the event batch codecs.
+
+This module defines the codecs used by the ThreadedTimeline to turn the list
+of events bound for another timeline into bytes for the transport. The
+PickleCodec pickles the events as they are; the BatchCodec packs them into
+typed columns using owner and method tables agreed on by all timelines. The
+ReferenceCodec does not serialize at all, for timelines that share one
+address space.
+"""
+
+from array import array
+from numbers import Integral
+from struct import Struct
+from typing import TYPE_CHECKING, Generator, Iterable, List, Tuple
+import pickle
+import sys
+
+from .event import Event
+from .process import Process
+
+if TYPE_CHECKING:
+    from .t_timeline import ThreadedTimeline
+
+# Batch header: base_time, event count, tail length, and the typecodes of
+# the time offset, owner id, method id and priority columns. It is followed
+# by the scalars min_time and shared priority (None if the priority column
+# is present).
+_HEADER = Struct('<qII4s')
+
+_SWAP = sys.byteorder != 'little'
+
+# Scalars: a kind byte each, then an 8-byte slot each
+_INT = Struct('<q')
+_FLOAT = Struct('<d')
+_INT_KIND = 0
+_FLOAT_KIND = 1
+_NONE_KIND = 2
+_INT_MIN = -1 << 63
+_INT_MAX = (1 << 63) - 1
+# Priority column typecode by priority type
+_PRIORITY_CODES = {int: 'q', float: 'd'}
+
+
+def _typecode(max_value: int) -> str:
+    """Returns the narrowest unsigned array typecode that holds max_value."""
+
+    for code in 'BHI':
+        if max_value < 1 << (8 * array(code).itemsize):
+            return code
+    return 'Q'
+
+
+def scalars_size(count: int) -> int:
+    """Returns the number of bytes of `count` scalars packed together."""
+
+    return count * (1 + _INT.size)
+
+
+def pack_scalars(values: Iterable) -> bytes:
+    """
+    Function to pack times or priorities exactly.
+
+    Integers that fit in 64 bits are packed as integers, None as absent,
+    and other values as doubles, so integer times stay exact beyond 2**53
+    and keep their type, and infinities are kept.
+
+    Args:
+        values (Iterable): numbers or None.
+
+    Returns:
+        bytes: kind of every value, followed by an 8-byte slot per value.
+    """
+
+    kinds = bytearray()
+    slots = []
+    for value in values:
+        if value is None:
+            kinds.append(_NONE_KIND)
+            slots.append(bytes(_INT.size))
+        elif isinstance(value, Integral) and _INT_MIN <= value <= _INT_MAX:
+            kinds.append(_INT_KIND)
+            slots.append(_INT.pack(int(value)))
+        else:
+            kinds.append(_FLOAT_KIND)
+            slots.append(_FLOAT.pack(value))
+    return bytes(kinds) + b''.join(slots)
+
+
+def unpack_scalars(view: memoryview, offset: int, count: int) \
+        -> Tuple[list, int]:
+    """
+    Function to unpack scalars packed by `pack_scalars`.
+
+    Args:
+        view (memoryview): bytes holding the scalars.
+        offset (int): position of the scalars in `view`.
+        count (int): number of scalars.
+
+    Returns:
+        Tuple[list, int]: values, and the position after them.
+    """
+
+    kinds = bytes(view[offset:offset + count])
+    offset += count
+    values = []
+    for kind in kinds:
+        if kind == _INT_KIND:
+            values.append(_INT.unpack_from(view, offset)[0])
+        elif kind == _FLOAT_KIND:
+            values.append(_FLOAT.unpack_from(view, offset)[0])
+        else:
+            values.append(None)
+        offset += _INT.size
+    return values, offset
+
+
+def _pack(code: str, values: Iterable) -> bytes:
+    column = array(code, values)
+    if _SWAP:
+        column.byteswap()
+    return column.tobytes()
+
+
+def _unpack(code: str, view: memoryview, offset: int, count: int):
+    column = array(code)
+    end = offset + count * column.itemsize
+    column.frombytes(view[offset:end])
+    if _SWAP:
+        column.byteswap()
+    return column, end
+
+
+class PickleCodec:
+    """
+    Class of codec that pickles event batches.
+
+    Every event is serialized with its full Process, so any owner, method and
+    arguments can be transported. No negotiation is needed.
+    """
+
+    def negotiate(self, timeline: "ThreadedTimeline") -> None:
+        """Method to agree on codec state with other timelines (no-op)."""
+
+        pass
+
+    def negotiation(self, timeline: "ThreadedTimeline") -> Generator:
+        """Generator of the exchanges of `negotiate` (none)."""
+
+        yield from ()
+
+    def encode(self, events: List[Event], min_time: float) -> bytes:
+        """
+        Method to serialize a batch of events.
+
+        Args:
+            events (List[Event]): events bound for another timeline.
+            min_time (float): minimum timestamp of the sending timeline.
+
+        Returns:
+            bytes: serialized batch.
+        """
+
+        return pickle.dumps((events, min_time))
+
+    def decode(self, payload: bytes) -> Tuple[List[Event], float]:
+        """
+        Method to deserialize a batch of events.
+
+        Args:
+            payload (bytes): serialized batch.
+
+        Returns:
+            Tuple[List[Event], float]: events and minimum timestamp of the
+                sending timeline.
+        """
+
+        return pickle.loads(payload)
+
+
+class BatchCodec:
+    """
+    Class of codec that packs event batches into typed columns.
+
+    Each event whose owner and activation method are in the interned tables,
+    whose time is an integer and whose process has no arguments is stored as
+    a time offset, an owner id and a method id, using the narrowest integer
+    type for each column. Priorities are stored once per batch when they are
+    all equal, and otherwise in a column of 64-bit integers or doubles, of
+    the type of the first priority. All other events, including those whose
+    priority does not fit the column exactly, are pickled into a tail after
+    the columns. The minimum timestamp and shared priority keep their type,
+    so integer times are exact beyond 2**53.
+
+    The owner table holds the names of all entities of all timelines and the
+    method table the union of the methods given to every timeline's codec.
+    Both are built by `negotiate` before the first exchange.
+
+    Attributes:
+        methods (List[str]): activation methods to intern.
+        owners (List[str]): interned owner names, indexed by owner id.
+        owner_ids (Dict[str, int]): mapping of owner name to owner id.
+        method_ids (Dict[str, int]): mapping of method name to method id.
+    """
+
+    def __init__(self, methods: Iterable[str] = ('get',)):
+        """
+        Constructor for BatchCodec class.
+
+        Args:
+            methods (Iterable[str]): activation methods to intern (default
+                ('get',)).
+        """
+
+        self.methods = sorted(methods)
+        self.owners = []
+        self.owner_ids = {}
+        self.method_ids = {}
+
+    def negotiate(self, timeline: "ThreadedTimeline") -> None:
+        """
+        Method to build the interned tables shared by all timelines.
+
+        Every timeline sends the names of its entities and its methods to all
+        others. Since every timeline sorts the same union, all of them assign
+        the same ids.
+
+        Args:
+            timeline (ThreadedTimeline): timeline that owns the codec.
+        """
+
+        timeline.transport.run_exchanges(self.negotiation(timeline))
+
+    def negotiation(self, timeline: "ThreadedTimeline") -> Generator:
+        """
+        Generator of the exchanges of `negotiate`.
+
+        Args:
+            timeline (ThreadedTimeline): timeline that owns the codec.
+        """
+
+        local = (sorted(timeline.entities), self.methods)
+        peers = [peer for peer in range(timeline.transport.size)
+                 if peer != timeline.id]
+        payloads = yield {peer: pickle.dumps(local) for peer in peers}
+
+        owners = set(local[0])
+        methods = set(local[1])
+        for payload in payloads.values():
+            if payload is None:
+                continue
+            peer_owners, peer_methods = pickle.loads(payload)
+            owners.update(peer_owners)
+            methods.update(peer_methods)
+
+        self.owners = sorted(owners)
+        self.methods = sorted(methods)
+        self.owner_ids = {name: i for i, name in enumerate(self.owners)}
+        self.method_ids = {name: i for i, name in enumerate(self.methods)}
+
+    def encode(self, events: List[Event], min_time: float) -> bytes:
+        """
+        Method to serialize a batch of events.
+
+        Args:
+            events (List[Event]): events bound for another timeline.
+            min_time (float): minimum timestamp of the sending timeline.
+
+        Returns:
+            bytes: serialized batch.
+        """
+
+        owner_ids = self.owner_ids
+        method_ids = self.method_ids
+        times = []
+        priorities = []
+        owners = []
+        methods = []
+        tail = []
+        priority_code = None
+        for event in events:
+            if event.is_invalid():
+                continue
+            process = event.process
+            owner = owner_ids.get(process.owner)
+            method = method_ids.get(process.activation)
+            if owner is None or method is None or process.act_params \
+                    or process.act_kwargs or type(event.time) is not int:
+                tail.append(event)
+                continue
+            code = _PRIORITY_CODES.get(type(event.priority))
+            if priority_code is None:
+                priority_code = code
+            if code is None or code != priority_code or (
+                    code == 'q'
+                    and not _INT_MIN <= event.priority <= _INT_MAX):
+                tail.append(event)
+                continue
+            times.append(event.time)
+            priorities.append(event.priority)
+            owners.append(owner)
+            methods.append(method)
+
+        base = min(times) if times else 0
+        offsets = [t - base for t in times]
+        time_code = _typecode(max(offsets, default=0))
+        owner_code = _typecode(len(self.owners))
+        method_code = _typecode(len(self.methods))
+
+        # Most batches share one priority; only ship the column if not
+        shared = priorities[0] if priorities else None
+        if any(p != shared for p in priorities):
+            shared = None
+        priority_code = priority_code or 'd'
+
+        tail_bytes = pickle.dumps(tail) if tail else b''
+        parts = [_HEADER.pack(base, len(times), len(tail_bytes),
+                              (time_code + owner_code + method_code +
+                               priority_code).encode()),
+                 pack_scalars((min_time, shared)),
+                 _pack(time_code, offsets),
+                 _pack(owner_code, owners),
+                 _pack(method_code, methods)]
+        if shared is None:
+            parts.append(_pack(priority_code, priorities))
+        parts.append(tail_bytes)
+        return b''.join(parts)
+
+    def decode(self, payload: bytes) -> Tuple[List[Event], float]:
+        """
+        Method to deserialize a batch of events.
+
+        Args:
+            payload (bytes): serialized batch.
+
+        Returns:
+            Tuple[List[Event], float]: events and minimum timestamp of the
+                sending timeline.
+        """
+
+        view = memoryview(payload)
+        base, count, tail_len, codes = _HEADER.unpack_from(view)
+        time_code, owner_code, method_code, priority_code = codes.decode()
+        (min_time, shared), offset = unpack_scalars(view, _HEADER.size, 2)
+        offsets, offset = _unpack(time_code, view, offset, count)
+        owner_col, offset = _unpack(owner_code, view, offset, count)
+        method_col, offset = _unpack(method_code, view, offset, count)
+
+        owners = self.owners
+        methods = self.methods
+        if shared is None:
+            priorities, offset = _unpack(priority_code, view, offset, count)
+            events = [Event(base + t, Process(owners[o], methods[m], []), p)
+                      for t, o, m, p in zip(offsets, owner_col, method_col,
+                                            priorities)]
+        else:
+            events = [Event(base + t, Process(owners[o], methods[m], []),
+                            shared)
+                      for t, o, m in zip(offsets, owner_col, method_col)]
+
+        if tail_len:
+            events.extend(pickle.loads(view[offset:offset + tail_len]))
+        return events, min_time
+
+
+class _Reference:
+    """
+    Batch of events handed to another timeline without serialization.
+
+    With adaptive windows, the sending timeline sets `trailer` to the values
+    it appends to serialized payloads.
+    """
+
+    __slots__ = ('events', 'min_time', 'trailer')
+
+    def __init__(self, events: List[Event], min_time: float):
+        self.events = events
+        self.min_time = min_time
+        self.trailer = None
+
+    def __len__(self) -> int:
+        # Counted in bytes_sent and bytes_received: nothing is serialized
+        return 0
+
+
+class ReferenceCodec:
+    """
+    Class of codec that passes event batches by reference.
+
+    Only usable with transports whose timelines share one address space,
+    such as the QueueTransport. The events are handed to the receiving
+    timeline as they are, which then owns them, so a batch costs one list
+    copy whatever the events hold, and payloads count as zero bytes.
+    """
+
+    def negotiate(self, timeline: "ThreadedTimeline") -> None:
+        """Method to agree on codec state with other timelines (no-op)."""
+
+        pass
+
+    def negotiation(self, timeline: "ThreadedTimeline") -> Generator:
+        """Generator of the exchanges of `negotiate` (none)."""
+
+        yield from ()
+
+    def encode(self, events: List[Event], min_time: float) -> _Reference:
+        """
+        Method to wrap a batch of events.
+
+        Args:
+            events (List[Event]): events bound for another timeline; the
+                list is copied, since the caller reuses it.
+            min_time (float): minimum timestamp of the sending timeline.
+
+        Returns:
+            _Reference: batch holding the events themselves.
+        """
+
+        return _Reference(list(events), min_time)
+
+    def decode(self, payload: _Reference) -> Tuple[List[Event], float]:
+        """
+        Method to unwrap a batch of events.
+
+        Args:
+            payload (_Reference): batch made by `encode`.
+
+        Returns:
+            Tuple[List[Event], float]: events and minimum timestamp of the
+                sending timeline.
+        """
+
+        return payload.events, payload.min_time
@@ -0,0 +1,89 @@
+"""
+asyncio coordinator of threaded timelines.
+
+This module drives the timelines of one process from a single asyncio event
+loop on one thread. Every timeline runs as a task whose exchanges with its
+peers are awaited: while one timeline waits for a peer, the others execute
+their windows, and the sends and receives of all timelines progress
+together, without a thread per timeline or per peer. Transports must
+implement `exchange_async`, as the SharedMemoryTransport and the
+SocketTransport do.
+"""
+
+from typing import TYPE_CHECKING, Any, Callable, Iterable, List, Optional
+import asyncio
+
+from .process_pool import default_summary
+from .ring_buffer import SharedMemoryTransport, new_session
+
+if TYPE_CHECKING:
+    from .t_timeline import ThreadedTimeline
+    from .transport import Transport
+
+
+async def run_timelines(timelines: "Iterable[ThreadedTimeline]") -> None:
+    """
+    Coroutine running initialized timelines until their stop time.
+
+    Args:
+        timelines (Iterable[ThreadedTimeline]): timelines to run, e.g. all
+            timelines of a simulation, or those of this process when the
+            others run elsewhere.
+
+    Raises:
+        Exception: the first exception raised by a timeline; the others are
+            cancelled.
+    """
+
+    tasks = [asyncio.ensure_future(timeline.run_async())
+             for timeline in timelines]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def run_coordinated(setup: Callable[["Transport"], "ThreadedTimeline"],
+                    size: int,
+                    summary: Callable[["ThreadedTimeline"], Any] =
+                    default_summary,
+                    session: Optional[str] = None,
+                    capacity: Optional[int] = None) -> List[Any]:
+    """
+    Function to run a simulation with all timelines in one event loop.
+
+    The timeline of every rank is built by `setup` from its
+    SharedMemoryTransport, as in `run_processes`, then all timelines are
+    initialized and run by `run_timelines` on the calling thread.
+
+    Args:
+        setup (Callable[[Transport], ThreadedTimeline]): builds the timeline
+            of a rank from its transport.
+        size (int): number of timelines.
+        summary (Callable[[ThreadedTimeline], Any]): returns the result of
+            a timeline (default `default_summary`).
+        session (str): name of the ring buffer files (default unique to
+            this call).
+        capacity (int): data bytes per ring buffer (default
+            `default_capacity(size)`).
+
+    Returns:
+        List[Any]: result of every timeline, by rank.
+    """
+
+    if size < 1:
+        raise ValueError(f"Invalid number of timelines {size}")
+    if session is None:
+        session = new_session("thread-timeline-async")
+    transports = [SharedMemoryTransport(rank, size, session, capacity)
+                  for rank in range(size)]
+    try:
+        timelines = [setup(transport) for transport in transports]
+        for timeline in timelines:
+            timeline.init()
+        asyncio.run(run_timelines(timelines))
+        return [summary(timeline) for timeline in timelines]
+    finally:
+        for transport in transports:
+            transport.close()
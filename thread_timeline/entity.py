@@ -6,6 +6,7 @@ elements (including hardware and photons).
 """
 
 from abc import ABC, abstractmethod
+from random import Random
 from typing import TYPE_CHECKING, Any, Dict
 #from numpy.random import default_rng
 #from numpy.random._generator import Generator
@@ -22,8 +23,7 @@ class Entity(ABC):
     Entity should use the provided pseudo random number generator (PRNG) to
     produce reproducible random numbers. As a result, simulations with the
     same seed can reproduce identical results. Function "get_generator"
-    returns the PRNG. For the purpose of this Interpreters demo, however,
-    this PRNG is not used.
+    returns the PRNG.
 
     Attributes:
         name (str): name of the entity.
@@ -111,21 +111,46 @@ class Entity(ABC):
         """
         self.timeline.remove_entity_by_name(self.name)
 
-    def get_generator(self):
+    def get_generator(self) -> Random:
         """
         Method to get random generator of parent node.
 
-        If entity is not attached to a node, return default generator.
+        If entity is not attached to a node, return the entity's own stream
+        from the timeline, derived from the timeline seed and entity name.
 
-        EDIT: Updated to return only a string. Generator isn't necessary for
-        basic timeline experiment, and NumPy is not supported with
-        interpreters in Python/C API 3.12. Will update once NumPy support is
-        available for subinterpreters.
+        EDIT: Returns a `random.Random` instead of a NumPy generator, as
+        NumPy is not supported with interpreters in Python/C API 3.12.
         """
         if hasattr(self.owner, "get_generator"):
             return self.owner.get_generator()
         else:
-            return "Generator"
+            return self.timeline.get_generator(self.name)
+
+    def save_state(self) -> Any:
+        """
+        Method to capture the state of the entity for a later rollback.
+
+        Optimistic timelines call this method before every event executed by
+        the entity. The default copies the attributes of the entity, so
+        entities with mutable attributes (e.g. random generators or
+        containers) must override this method and `restore_state`.
+
+        Returns:
+            Any: state to pass to `restore_state`.
+        """
+
+        return dict(self.__dict__)
+
+    def restore_state(self, state: Any) -> None:
+        """
+        Method to return the entity to a state captured by `save_state`.
+
+        Args:
+            state (Any): state returned by `save_state`.
+        """
+
+        self.__dict__.clear()
+        self.__dict__.update(state)
 
     def change_timeline(self, timeline: "Timeline"):
         self.remove_from_timeline()
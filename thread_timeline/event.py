@@ -26,8 +26,13 @@ class Event:
         priority (int): the priority of the event, lower value denotes a
             higher priority.
         _is_removed (bool): the flag to denotes if it's a valid event
+        _index (int): position of the event in an IndexedEventList, 0 while
+            held by another event list, or -1 when in no event list.
     """
 
+    # Slotted to shrink the millions of events of large runs
+    __slots__ = ('time', 'priority', 'process', '_is_removed', '_index')
+
     def __init__(self, time: int, process: "Process", priority=inf):
         """
         Constructor for event class.
@@ -43,6 +48,7 @@ class Event:
         self.priority = priority
         self.process = process
         self._is_removed = False
+        self._index = -1
 
     def __eq__(self, another):
         return (self.time == another.time) and (self.priority == 
@@ -3,15 +3,35 @@ Definition of EventList class.
 
 This module defines the EventList class, used by the timeline to order and
 execute events. EventList is implemented as a min heap ordered by simulation
-time.
+time. KeyedEventList is an alternative min heap ordered by precomputed keys,
+and IndexedEventList one that tracks the position of every event. The
+calendar queue alternative is defined in calendar_eventlist.py.
+
+Removed events are left in the heap as tombstones and skipped when popped.
+Lists that do this count their tombstones and rebuild themselves from the
+live events once tombstones exceed `compaction_threshold` of their size.
+They set `Event._index` to 0 while they hold an event and back to -1 once
+it is popped or compacted away, so removing an event they no longer hold
+leaves no tombstone.
 """
 
-from typing import TYPE_CHECKING, List
+from itertools import count
+from sys import getsizeof
+from typing import TYPE_CHECKING, Iterable, List, Optional
 
 if TYPE_CHECKING:
     from .event import Event
 
-from heapq import heappush, heappop
+from heapq import heapify, heappush, heappop
+
+# Names of the event list implementations, used to select one in Timeline
+HEAP_EVENT_LIST = "heap"
+KEYED_EVENT_LIST = "keyed"
+CALENDAR_EVENT_LIST = "calendar"
+INDEXED_EVENT_LIST = "indexed"
+
+# Default fraction of tombstones that triggers a compaction
+COMPACTION_THRESHOLD = 0.5
 
 
 class EventList:
@@ -23,10 +43,20 @@ class EventList:
 
     Attributes:
         data (List[Event]): heap storing events.
+        compaction_threshold (float): fraction of removed events that
+            triggers a compaction, or None to never compact.
+        tombstones (int): number of removed events still in the heap.
+        compactions (int): number of compactions performed.
+        bytes_reclaimed (int): estimated bytes released by compactions.
     """
 
-    def __init__(self):
+    def __init__(self, compaction_threshold: Optional[float] =
+                 COMPACTION_THRESHOLD):
         self.data = []
+        self.compaction_threshold = compaction_threshold
+        self.tombstones = 0
+        self.compactions = 0
+        self.bytes_reclaimed = 0
 
     def __len__(self):
         return len(self.data)
@@ -37,11 +67,38 @@ class EventList:
 
     # Add event to bottom of heap
     def push(self, event: "Event") -> "None":
+        event._index = 0
+        if event._is_removed:
+            self.tombstones += 1
         heappush(self.data, event)
 
+    def push_many(self, events: "Iterable[Event]") -> None:
+        """
+        Method to add a batch of events to the heap.
+
+        Batches at least as large as the heap are appended and heapified
+        once in O(n); smaller batches are pushed one by one.
+        """
+
+        events = list(events)
+        for event in events:
+            event._index = 0
+            if event._is_removed:
+                self.tombstones += 1
+        if len(events) >= len(self.data):
+            self.data.extend(events)
+            heapify(self.data)
+        else:
+            for event in events:
+                heappush(self.data, event)
+
     # Pops and returns event with lowest time and priority
     def pop(self) -> "Event":
-        return heappop(self.data)
+        event = heappop(self.data)
+        event._index = -1
+        if event._is_removed:
+            self.tombstones -= 1
+        return event
 
     # Returns data from event with the lowest time and priority
     def top(self) -> "Event":
@@ -55,10 +112,35 @@ class EventList:
         Method to remove events from heap.
 
         The event is set as the invalid state to save the time of removing
-        event from heap.
+        event from heap. The heap is compacted once too many removed events
+        accumulate.
         """
 
+        if event.is_invalid():
+            return
         event.set_invalid()
+        # Events already popped, or never pushed, leave no tombstone
+        if event._index < 0:
+            return
+        self.tombstones += 1
+        if self.compaction_threshold is not None and \
+                self.tombstones > self.compaction_threshold * len(self.data):
+            self.compact()
+
+    def compact(self) -> None:
+        """Method to rebuild the heap from the events that are still valid."""
+
+        old = self.data
+        live = [event for event in old if not event._is_removed]
+        heapify(live)
+        for event in old:
+            if event._is_removed:
+                event._index = -1
+        self.bytes_reclaimed += getsizeof(old) - getsizeof(live) + sum(
+            getsizeof(event) for event in old if event._is_removed)
+        self.data = live
+        self.tombstones = 0
+        self.compactions += 1
 
     def update_event_time(self, event: "Event", time: int):
         """
@@ -89,3 +171,317 @@ class EventList:
                     self.push(event)
 
                 break
+
+
+class KeyedEventList:
+    """
+    Class of event list keyed by precomputed tuples.
+
+    This class is implemented as a min-heap of `(time, priority, seq, event)`
+    entries, so heap operations compare tuples in C instead of calling
+    `Event.__lt__`. The insertion sequence number breaks ties, so events
+    themselves are never compared.
+
+    Attributes:
+        data (List[Tuple[int, int, int, Event]]): heap storing entries.
+        compaction_threshold (float): fraction of removed events that
+            triggers a compaction, or None to never compact.
+        tombstones (int): number of removed events still in the heap.
+        compactions (int): number of compactions performed.
+        bytes_reclaimed (int): estimated bytes released by compactions.
+    """
+
+    def __init__(self, compaction_threshold: Optional[float] =
+                 COMPACTION_THRESHOLD):
+        self.data = []
+        self._seq = count()
+        self.compaction_threshold = compaction_threshold
+        self.tombstones = 0
+        self.compactions = 0
+        self.bytes_reclaimed = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        for entry in self.data:
+            yield entry[3]
+
+    # Add event to bottom of heap
+    def push(self, event: "Event") -> "None":
+        event._index = 0
+        if event._is_removed:
+            self.tombstones += 1
+        heappush(self.data, (event.time, event.priority, next(self._seq),
+                             event))
+
+    def push_many(self, events: "Iterable[Event]") -> None:
+        """
+        Method to add a batch of events to the heap.
+
+        Batches at least as large as the heap are appended and heapified
+        once in O(n); smaller batches are pushed one by one.
+        """
+
+        seq = self._seq
+        entries = [(event.time, event.priority, next(seq), event)
+                   for event in events]
+        for entry in entries:
+            entry[3]._index = 0
+            if entry[3]._is_removed:
+                self.tombstones += 1
+        if len(entries) >= len(self.data):
+            self.data.extend(entries)
+            heapify(self.data)
+        else:
+            for entry in entries:
+                heappush(self.data, entry)
+
+    # Pops and returns event with lowest time and priority
+    def pop(self) -> "Event":
+        event = heappop(self.data)[3]
+        event._index = -1
+        if event._is_removed:
+            self.tombstones -= 1
+        return event
+
+    # Returns data from event with the lowest time and priority
+    def top(self) -> "Event":
+        return self.data[0][3]
+
+    def isempty(self) -> bool:
+        return len(self.data) == 0
+
+    def remove(self, event: "Event") -> None:
+        """
+        Method to remove events from heap.
+
+        The event is set as the invalid state to save the time of removing
+        event from heap. The heap is compacted once too many removed events
+        accumulate.
+        """
+
+        if event.is_invalid():
+            return
+        event.set_invalid()
+        # Events already popped, or never pushed, leave no tombstone
+        if event._index < 0:
+            return
+        self.tombstones += 1
+        if self.compaction_threshold is not None and \
+                self.tombstones > self.compaction_threshold * len(self.data):
+            self.compact()
+
+    def compact(self) -> None:
+        """Method to rebuild the heap from the events that are still valid."""
+
+        old = self.data
+        live = [entry for entry in old if not entry[3]._is_removed]
+        heapify(live)
+        for entry in old:
+            if entry[3]._is_removed:
+                entry[3]._index = -1
+        self.bytes_reclaimed += getsizeof(old) - getsizeof(live) + sum(
+            getsizeof(entry) + getsizeof(entry[3])
+            for entry in old if entry[3]._is_removed)
+        self.data = live
+        self.tombstones = 0
+        self.compactions += 1
+
+    def update_event_time(self, event: "Event", time: int):
+        """
+        Method to update the timestamp of event and maintain the min-heap
+        structure.
+
+        As in EventList, the entry is sifted up for earlier times, and for
+        later times moved to the top, popped and pushed again. The entry
+        keeps its sequence number, so ties are still broken by insertion.
+        """
+        if time == event.time:
+            return
+
+        data = self.data
+        for i, entry in enumerate(data):
+            if entry[3] is event:
+                break
+        else:
+            return
+
+        entry = (time, event.priority, entry[2], event)
+        earlier = time < event.time
+        event.time = time
+        while i > 0:
+            parent = (i - 1) >> 1
+            if earlier and not entry < data[parent]:
+                break
+            data[i] = data[parent]
+            i = parent
+        data[i] = entry
+        if not earlier:
+            heappush(data, heappop(data))
+
+
+class IndexedEventList:
+    """
+    Class of event list that tracks the heap position of every event.
+
+    This class is implemented as a min-heap of events with a parallel list
+    of `(time, priority, seq)` keys. Every event records its position in
+    `Event._index`, so rescheduling and removing an event are O(log n) sift
+    operations instead of a scan of the heap. Removed events are taken out
+    of the heap immediately.
+
+    Attributes:
+        data (List[Event]): heap storing events.
+        keys (List[Tuple[int, int, int]]): heap keys, parallel to `data`.
+    """
+
+    def __init__(self):
+        self.data = []
+        self.keys = []
+        self._seq = count()
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        for data in self.data:
+            yield data
+
+    def _sift_up(self, i: int) -> None:
+        keys = self.keys
+        data = self.data
+        key = keys[i]
+        event = data[i]
+        while i > 0:
+            parent = (i - 1) >> 1
+            if not key < keys[parent]:
+                break
+            keys[i] = keys[parent]
+            data[i] = data[parent]
+            data[i]._index = i
+            i = parent
+        keys[i] = key
+        data[i] = event
+        event._index = i
+
+    def _sift_down(self, i: int) -> None:
+        keys = self.keys
+        data = self.data
+        n = len(keys)
+        key = keys[i]
+        event = data[i]
+        child = 2 * i + 1
+        while child < n:
+            right = child + 1
+            if right < n and keys[right] < keys[child]:
+                child = right
+            if not keys[child] < key:
+                break
+            keys[i] = keys[child]
+            data[i] = data[child]
+            data[i]._index = i
+            i = child
+            child = 2 * i + 1
+        keys[i] = key
+        data[i] = event
+        event._index = i
+
+    def _position(self, event: "Event") -> int:
+        """Returns the position of event in the heap, or -1 if absent."""
+
+        i = event._index
+        if 0 <= i < len(self.data) and self.data[i] is event:
+            return i
+        return -1
+
+    def _delete(self, i: int) -> "Event":
+        """Method to take the event at position i out of the heap."""
+
+        event = self.data[i]
+        last_key = self.keys.pop()
+        last = self.data.pop()
+        if i < len(self.data):
+            self.keys[i] = last_key
+            self.data[i] = last
+            self._sift_up(i)
+            self._sift_down(last._index)
+        event._index = -1
+        return event
+
+    # Add event to bottom of heap
+    def push(self, event: "Event") -> "None":
+        self.keys.append((event.time, event.priority, next(self._seq)))
+        self.data.append(event)
+        self._sift_up(len(self.data) - 1)
+
+    def push_many(self, events: "Iterable[Event]") -> None:
+        """
+        Method to add a batch of events to the heap.
+
+        Batches at least as large as the heap are appended and the whole
+        heap is rebuilt bottom-up in O(n); smaller batches are pushed one by
+        one.
+        """
+
+        events = list(events)
+        if len(events) < len(self.data):
+            for event in events:
+                self.push(event)
+            return
+
+        seq = self._seq
+        data = self.data
+        self.keys.extend((event.time, event.priority, next(seq))
+                         for event in events)
+        data.extend(events)
+        for i, event in enumerate(data):
+            event._index = i
+        for i in reversed(range(len(data) // 2)):
+            self._sift_down(i)
+
+    # Pops and returns event with lowest time and priority
+    def pop(self) -> "Event":
+        if not self.data:
+            raise IndexError("pop from empty event list")
+        return self._delete(0)
+
+    # Returns data from event with the lowest time and priority
+    def top(self) -> "Event":
+        return self.data[0]
+
+    def isempty(self) -> bool:
+        return len(self.data) == 0
+
+    def remove(self, event: "Event") -> None:
+        """
+        Method to remove events from heap.
+
+        The event is set as the invalid state and taken out of the heap.
+        """
+
+        event.set_invalid()
+        i = self._position(event)
+        if i >= 0:
+            self._delete(i)
+
+    def update_event_time(self, event: "Event", time: int):
+        """
+        Method to update the timestamp of event and maintain the min-heap
+        structure.
+
+        The event is sifted up for earlier times and down for later times.
+        """
+        if time == event.time:
+            return
+
+        i = self._position(event)
+        earlier = time < event.time
+        event.time = time
+        if i < 0:
+            return
+        self.keys[i] = (time, event.priority, self.keys[i][2])
+        if earlier:
+            self._sift_up(i)
+        else:
+            self._sift_down(i)
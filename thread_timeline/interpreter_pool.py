@@ -0,0 +1,340 @@
+"""
+Pool of warm sub-interpreters for threaded timelines.
+
+Creating a sub-interpreter and importing the kernel into it costs far more
+than starting a thread, and a script that re-runs itself in every
+interpreter also re-parses its arguments there. The InterpreterPool creates
+its interpreters and imports the kernel modules into them once, then runs
+any number of jobs on them: picklable functions, such as the builders of the
+partitions of successive simulations, whose results are returned to the
+caller. Only the parts of the interpreters module common to its versions
+are used: code is run as source, and results come back through files.
+"""
+
+from threading import Thread
+from typing import (TYPE_CHECKING, Any, Callable, Dict, Iterable, List,
+                    Optional, Sequence)
+import os
+import pickle
+import sys
+
+from ._compat import interpreters
+from .process_pool import default_summary, POLL_SECONDS
+from .ring_buffer import SharedMemoryTransport, default_directory, \
+    new_session, remove_session
+
+if TYPE_CHECKING:
+    from .t_timeline import ThreadedTimeline
+    from .transport import Transport
+
+# Modules imported into every interpreter when the pool is created
+KERNEL_MODULES = ("thread_timeline",)
+
+# Run in every interpreter of the pool once, in its __main__ module
+_PRELUDE = """\
+import pickle
+import sys
+import traceback
+sys.path[:] = {path!r}
+{imports}
+"""
+
+# Run in an interpreter for every job
+_JOB = """\
+try:
+    _function, _args = pickle.loads({job!r})
+    _payload = pickle.dumps((True, _function(*_args)))
+except BaseException:
+    _payload = pickle.dumps((False, traceback.format_exc()))
+_function = _args = None
+with open({path!r}, 'wb') as _file:
+    _file.write(_payload)
+_payload = None
+"""
+
+
+def _run_partition(setup: Callable[["Transport"], "ThreadedTimeline"],
+                   summary: Callable[["ThreadedTimeline"], Any], rank: int,
+                   size: int, session: str,
+                   capacity: Optional[int]) -> Any:
+    """Function run in an interpreter for every timeline of `run`."""
+
+    transport = SharedMemoryTransport(rank, size, session, capacity)
+    try:
+        timeline = setup(transport)
+        timeline.init()
+        timeline.run()
+        return summary(timeline)
+    finally:
+        transport.close()
+
+
+def _remove(path: str) -> None:
+    """Function to remove a file that may not exist."""
+
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class InterpreterPool:
+    """
+    Class of a pool of sub-interpreters with the kernel imported.
+
+    Jobs are functions and arguments pickled by the caller and unpickled in
+    an interpreter, so functions must be importable there: defined in a
+    module rather than in the `__main__` script of the main interpreter, or
+    `functools.partial` objects of such functions. Every job runs in the
+    `__main__` module of its interpreter, on a thread of the main
+    interpreter, so the jobs of one call run in parallel.
+
+    A job that fails while others of the same call still run cannot be
+    stopped, and peers waiting for it would wait forever, so the pool is
+    then marked broken and refuses further jobs. The result files of the
+    jobs left running are removed when the pool is closed, if they have
+    finished by then.
+
+    Attributes:
+        size (int): number of interpreters.
+        modules (List[str]): modules imported into every interpreter.
+        interpreters (List): the sub-interpreters.
+        jobs (int): number of jobs run so far.
+        broken (bool): whether a job may still be running after a failure.
+    """
+
+    def __init__(self, size: int, modules: Iterable[str] = KERNEL_MODULES):
+        """
+        Constructor for InterpreterPool class.
+
+        Creates the interpreters and imports `modules` into all of them.
+
+        Args:
+            size (int): number of interpreters.
+            modules (Iterable[str]): modules to import into every
+                interpreter (default KERNEL_MODULES).
+        """
+
+        if interpreters is None:
+            raise RuntimeError("sub-interpreters are not available")
+        if size < 1:
+            raise ValueError(f"Invalid number of interpreters {size}")
+        self.size = size
+        self.modules = list(modules)
+        self.jobs = 0
+        self.broken = False
+        # Result files of jobs still running when the pool broke
+        self._orphans = []
+        self._prefix = os.path.join(default_directory(),
+                                    new_session("interpreter-pool"))
+        self.interpreters = []
+        try:
+            for index in range(size):
+                self.interpreters.append(interpreters.create())
+                # Closing an interpreter that first imported threading on
+                # another thread hangs on Python 3.11, so import it here
+                error = self._execute_one(index, "import threading")
+                if error is not None:
+                    raise RuntimeError(f"interpreter {index} failed to "
+                                       f"start: {error!r}")
+            imports = "".join(f"import {module}\n" for module in self.modules)
+            prelude = _PRELUDE.format(path=list(sys.path), imports=imports)
+            errors = self._execute([prelude] * size)
+            if errors:
+                index, error = next(iter(errors.items()))
+                raise RuntimeError(f"interpreter {index} failed to import "
+                                   f"the kernel: {error!r}")
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self) -> "InterpreterPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _execute_one(self, index: int, code: str) \
+            -> Optional[BaseException]:
+        """Method to run code in one interpreter; returns its exception."""
+
+        interpreter = self.interpreters[index]
+        # Interpreter.run was renamed Interpreter.exec in Python 3.13
+        run = getattr(interpreter, "exec", None) or interpreter.run
+        try:
+            run(code)
+        except BaseException as error:
+            return error
+        return None
+
+    def _execute(self, codes: List[str]) -> Dict[int, BaseException]:
+        """
+        Method to run source code in the first interpreters, in parallel.
+
+        Args:
+            codes (List[str]): code to run in each interpreter.
+
+        Returns:
+            Dict[int, BaseException]: exception raised by running the code
+                of every interpreter where it failed.
+        """
+
+        errors = {}
+
+        def execute(index: int, code: str) -> None:
+            error = self._execute_one(index, code)
+            if error is not None:
+                errors[index] = error
+
+        threads = [Thread(target=execute, args=(index, code),
+                          name=f"interpreter-{index}")
+                   for index, code in enumerate(codes)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    def map(self, function: Callable, arguments: Sequence[Sequence]) \
+            -> List[Any]:
+        """
+        Method to run a function once per interpreter, in parallel.
+
+        Args:
+            function (Callable): picklable function to run.
+            arguments (Sequence[Sequence]): positional arguments of every
+                call, at most one call per interpreter.
+
+        Returns:
+            List[Any]: return value of every call, in order.
+
+        Raises:
+            RuntimeError: a call raised an exception, or the pool is broken.
+        """
+
+        if self.broken:
+            raise RuntimeError("a job of the pool never finished")
+        if len(arguments) > self.size:
+            raise ValueError(f"Invalid number of jobs {len(arguments)} for "
+                             f"{self.size} interpreters")
+
+        paths = [f"{self._prefix}-{self.jobs + index}"
+                 for index in range(len(arguments))]
+        self.jobs += len(arguments)
+        codes = [_JOB.format(job=pickle.dumps((function, tuple(args))),
+                             path=path)
+                 for args, path in zip(arguments, paths)]
+
+        # Exception raised by running the code of every finished job
+        outcome = {}
+
+        def execute(index: int) -> None:
+            outcome[index] = self._execute_one(index, codes[index])
+
+        # Daemons, so a job that never finishes does not block exit
+        threads = [Thread(target=execute, args=(index,),
+                          name=f"interpreter-{index}", daemon=True)
+                   for index in range(len(codes))]
+        for thread in threads:
+            thread.start()
+
+        results = [None] * len(codes)
+        pending = set(range(len(codes)))
+        try:
+            while pending:
+                for index in sorted(pending):
+                    threads[index].join(POLL_SECONDS)
+                    if threads[index].is_alive():
+                        continue
+                    pending.discard(index)
+                    results[index] = self._collect(index, paths[index],
+                                                   outcome[index])
+        except BaseException:
+            # Peers of the failed job may wait for it forever
+            self.broken = bool(pending)
+            raise
+        finally:
+            # Including the results of jobs not collected after a failure;
+            # jobs still running write theirs later, so `close` removes them
+            for index, path in enumerate(paths):
+                if index in pending:
+                    self._orphans.append(path)
+                else:
+                    _remove(path)
+        return results
+
+    def _collect(self, index: int, path: str,
+                 error: Optional[BaseException]) -> Any:
+        """Method to read the result file of a job."""
+
+        try:
+            with open(path, 'rb') as file:
+                succeeded, value = pickle.load(file)
+        except FileNotFoundError:
+            raise RuntimeError(f"job {index} failed without a result: "
+                               f"{error!r}")
+        if not succeeded:
+            raise RuntimeError(f"job {index} failed:\n{value}")
+        return value
+
+    def run(self, setup: Callable[["Transport"], "ThreadedTimeline"],
+            size: Optional[int] = None,
+            summary: Callable[["ThreadedTimeline"], Any] = default_summary,
+            session: Optional[str] = None,
+            capacity: Optional[int] = None) -> List[Any]:
+        """
+        Method to run a simulation with one timeline per interpreter.
+
+        As in `run_processes`, every interpreter creates its transport and
+        passes it to `setup`, which returns the timeline of that rank; the
+        timeline is then initialized and run, and `summary(timeline)` is
+        returned. Timelines are connected by a SharedMemoryTransport.
+
+        Args:
+            setup (Callable[[Transport], ThreadedTimeline]): builds the
+                timeline of an interpreter from its transport.
+            size (int): number of timelines (default all interpreters).
+            summary (Callable[[ThreadedTimeline], Any]): returns the
+                picklable result of a timeline (default `default_summary`).
+            session (str): name of the ring buffer files (default unique to
+                this call).
+            capacity (int): data bytes per ring buffer (default
+                `default_capacity(size)`).
+
+        Returns:
+            List[Any]: result of every timeline, by rank.
+
+        Raises:
+            RuntimeError: a timeline raised an exception.
+        """
+
+        size = self.size if size is None else size
+        if session is None:
+            session = new_session("thread-timeline-pool")
+        try:
+            return self.map(_run_partition,
+                            [(setup, summary, rank, size, session, capacity)
+                             for rank in range(size)])
+        except RuntimeError:
+            remove_session(session, size)
+            raise
+
+    def close(self) -> None:
+        """
+        Method to close all interpreters.
+
+        Interpreters still running a job of a broken pool are left open,
+        and the result files those jobs have written so far are removed.
+        """
+
+        for path in self._orphans:
+            _remove(path)
+        self._orphans = []
+        if self.broken:
+            return
+        for interpreter in self.interpreters:
+            try:
+                interpreter.close()
+            except RuntimeError:
+                pass
+        self.interpreters = []
@@ -0,0 +1,434 @@
+"""
+Definition of the OptimisticTimeline class.
+
+This module defines a ThreadedTimeline that executes events optimistically
+(Time Warp) instead of waiting until they are known to be safe. Entities are
+checkpointed before every event they execute, and a timeline that receives
+an event earlier than its current time (a straggler) rolls back to it,
+cancelling the events it sent in the meantime with anti-messages.
+"""
+
+from bisect import bisect_left
+from heapq import heappush, heappop
+from itertools import count
+from math import inf
+from time import time
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Tuple
+import pickle
+
+from .event import Event
+from .process import Process
+from .timeline import Timeline
+from .t_timeline import ThreadedTimeline
+from .eventlist import HEAP_EVENT_LIST
+
+if TYPE_CHECKING:
+    from .entity import Entity
+    from .transport import Transport
+
+# Events executed between two polls for messages
+POLL_EVENTS = 32
+
+
+class _Record:
+    """
+    Log entry of an event executed but not yet committed.
+
+    Attributes:
+        event (Event): the executed event.
+        owner (Entity): entity that executed the event.
+        state (Any): state of `owner` before the event, from `save_state`.
+        children (List[Event]): events the event scheduled locally.
+        sent (List[Tuple[int, int, float]]): peer, message id and time of
+            the events the event sent to other timelines.
+    """
+
+    __slots__ = ('event', 'owner', 'state', 'children', 'sent')
+
+    def __init__(self, event: "Event", owner: "Entity", state: Any):
+        self.event = event
+        self.owner = owner
+        self.state = state
+        self.children = []
+        self.sent = []
+
+
+class OptimisticTimeline(ThreadedTimeline):
+    """
+    Class for a threaded timeline with optimistic (Time Warp) execution.
+
+    Every timeline executes its events without waiting for its peers, up to
+    `optimism` past the global virtual time (GVT), and posts the events for
+    foreign entities every few events. Received events earlier than events
+    already executed are stragglers: the timeline undoes every executed
+    event at or after the straggler, in reverse order, restoring each owner
+    from the checkpoint taken before the event, removing the events it
+    scheduled locally and sending anti-messages for the events it sent. An
+    anti-message annihilates its event, first rolling back the receiver if
+    the event was already executed.
+
+    Every `gvt_interval` executed events, or as soon as it cannot execute
+    anything, a timeline starts a GVT round by posting a marker with the
+    earliest of its events and of the messages it sent since the last
+    round; peers join the round when the marker arrives. Channels are FIFO,
+    so once a timeline holds the markers of all peers every message sent
+    before the previous round has arrived, and the GVT is the earliest of
+    all markers. No rollback can reach before it, so executed events
+    earlier than the GVT are committed and their checkpoints discarded
+    (fossil collection). The simulation ends once the GVT reaches the stop
+    time.
+
+    Entities must implement `save_state` and `restore_state` for everything
+    an event can change. Events exchanged with peers carry a message id
+    and are pickled, unless the transport shares objects, so the codec is
+    not used. The transport must support `post` and `try_recv`.
+
+    Attributes:
+        optimism (float): how far past the GVT events are executed.
+        gvt_interval (int): executed events between GVT rounds.
+        gvt (float): global virtual time of the last round.
+        rollbacks (int): number of rollbacks.
+        rolled_back (int): number of executed events undone by rollbacks.
+        anti_messages (int): number of anti-messages sent.
+        annihilated (int): number of received events cancelled by
+            anti-messages.
+        committed (int): number of executed events committed by fossil
+            collection.
+        executed (int): number of events executed, including the ones
+            later rolled back.
+    """
+
+    def __init__(self, lookahead: int, stop_time=float('inf'),
+                 transport: "Transport" = None, optimism: float = None,
+                 gvt_interval: int = 4096, event_list=HEAP_EVENT_LIST,
+                 accounting: str = None):
+        """
+        Constructor for OptimisticTimeline class.
+
+        Args:
+            lookahead (int): minimum delay of the events sent to other
+                timelines.
+            stop_time (int): stop (simulation) time of simulation
+                (default inf).
+            transport (Transport): transport used to exchange messages with
+                other timelines (default SharedMemoryTransport shared by all
+                interpreters of the current process).
+            optimism (float): how far past the GVT events are executed
+                (default ten times `lookahead`).
+            gvt_interval (int): executed events between GVT rounds
+                (default 4096).
+            event_list (str): event list implementation (default
+                HEAP_EVENT_LIST).
+            accounting (str): cost accounting mode of `cost_profiler`,
+                FULL_ACCOUNTING, SAMPLED_ACCOUNTING or None to disable
+                (default None).
+        """
+
+        super(OptimisticTimeline, self).__init__(
+            lookahead, stop_time, transport, event_list=event_list,
+            accounting=accounting)
+        self.optimism = 10 * lookahead if optimism is None else optimism
+        if self.optimism <= 0:
+            raise ValueError(f"Invalid optimism {self.optimism}")
+        self.gvt_interval = gvt_interval
+        self.gvt = 0
+
+        self.rollbacks = 0
+        self.rolled_back = 0
+        self.anti_messages = 0
+        self.annihilated = 0
+        self.committed = 0
+        self.executed = 0
+
+        # Executed events not yet committed, in execution (and time) order
+        self._processed: List[_Record] = []
+        self._current: _Record = None
+        self._message_ids = count()
+        # Messages and anti-messages not yet posted, per peer, by message id
+        self._outbox: List[Dict[int, tuple]] = [
+            {} for _ in range(self.transport.size)]
+        self._antis: List[Dict[int, float]] = [
+            {} for _ in range(self.transport.size)]
+        # Earliest message posted since the last GVT round
+        self._sent_min = inf
+        # Markers received from each peer, oldest round first
+        self._markers: Dict[int, List[float]] = {
+            peer: [] for peer in self.peers}
+        # Received events that an anti-message can still cancel, and their
+        # keys by time, to forget them once committed
+        self._received: Dict[Tuple[int, int], "Event"] = {}
+        self._expiry: List[Tuple[float, Tuple[int, int]]] = []
+
+    @property
+    def efficiency(self) -> float:
+        """Fraction of the executed events that were not rolled back."""
+
+        if self.executed == 0:
+            return 1.0
+        return 1 - self.rolled_back / self.executed
+
+    def schedule(self, event: "Event"):
+        """
+        Method to schedule an event.
+
+        Events for foreign entities are given a message id and posted at
+        the next poll. Events scheduled while an event executes are logged
+        with it, so a rollback can cancel them.
+
+        Args:
+            event (Event): Event to be scheduled.
+        """
+
+        record = self._current
+        owner = event.process.owner
+        if type(owner) is str and owner in self.foreign_entities:
+            peer = self.foreign_entities[owner]
+            message_id = next(self._message_ids)
+            process = event.process
+            self._outbox[peer][message_id] = (
+                event.time, event.priority, owner, process.activation,
+                process.act_params)
+            if record is not None:
+                record.sent.append((peer, message_id, event.time))
+            self.schedule_counter += 1
+        else:
+            Timeline.schedule(self, event)
+            if record is not None:
+                record.children.append(event)
+
+    def schedule_many(self, events: "Iterable[Event]"):
+        """
+        Method to schedule a batch of events.
+
+        Args:
+            events (Iterable[Event]): Events to be scheduled.
+        """
+
+        for event in events:
+            self.schedule(event)
+
+    def rollback(self, time: float) -> None:
+        """
+        Method to undo every executed event at or after a time.
+
+        Args:
+            time (float): time of the straggler or annihilated event.
+        """
+
+        processed = self._processed
+        if not processed or processed[-1].event.time < time:
+            return
+        self.rollbacks += 1
+        # Owners are restored once, to the earliest state undone
+        states = {}
+        while processed and processed[-1].event.time >= time:
+            record = processed.pop()
+            states[id(record.owner)] = (record.owner, record.state)
+            for child in record.children:
+                self.events.remove(child)
+            for peer, message_id, sent_time in record.sent:
+                # Messages still in the outbox were never seen by the peer
+                if self._outbox[peer].pop(message_id, None) is None:
+                    self._antis[peer][message_id] = sent_time
+                    self.anti_messages += 1
+            self.events.push(record.event)
+            self.rolled_back += 1
+            self.run_counter -= 1
+        for owner, state in states.values():
+            owner.restore_state(state)
+        self.time = processed[-1].event.time if processed else self.gvt
+
+    def send_messages(self, marker: float = None) -> None:
+        """
+        Method to post the pending messages and anti-messages to all peers.
+
+        Args:
+            marker (float): earliest time this timeline can still affect,
+                sent to start or join a GVT round, or None.
+        """
+
+        for peer in self.peers:
+            messages = self._outbox[peer]
+            antis = self._antis[peer]
+            if not messages and not antis and marker is None:
+                continue
+            for message in messages.values():
+                if message[0] < self._sent_min:
+                    self._sent_min = message[0]
+            self._sent_min = min(self._sent_min,
+                                 min(antis.values(), default=inf))
+            payload = (messages, list(antis), marker)
+            if not self.transport.shares_objects:
+                payload = pickle.dumps(payload)
+                self.bytes_sent += len(payload)
+            self.transport.post(peer, payload)
+            self.write_ops += 1
+            self._outbox[peer] = {}
+            antis.clear()
+
+    def receive_messages(self) -> bool:
+        """
+        Method to apply every message that has arrived from the peers.
+
+        Received events are scheduled, rolling back to them if they are
+        stragglers, and anti-messages annihilate their events. Markers are
+        kept for the GVT round.
+
+        Returns:
+            bool: whether anything was received.
+        """
+
+        tick = time()
+        received = False
+        for peer in self.peers:
+            while True:
+                payload = self.transport.try_recv(peer)
+                if payload is None:
+                    break
+                received = True
+                self.read_ops += 1
+                if not self.transport.shares_objects:
+                    self.bytes_received += len(payload)
+                    payload = pickle.loads(payload)
+                messages, antis, marker = payload
+                for message_id, (event_time, priority, owner, activation,
+                                 params) in messages.items():
+                    self.rollback(event_time)
+                    event = Event(event_time,
+                                  Process(owner, activation, params),
+                                  priority)
+                    self._received[peer, message_id] = event
+                    heappush(self._expiry, (event_time, (peer, message_id)))
+                    Timeline.schedule(self, event)
+                self.exchange_counter += len(messages)
+                for message_id in antis:
+                    event = self._received.pop((peer, message_id), None)
+                    if event is None:
+                        continue
+                    self.rollback(event.time)
+                    self.events.remove(event)
+                    self.annihilated += 1
+                if marker is not None:
+                    self._markers[peer].append(marker)
+        self.decode_time += time() - tick
+        return received
+
+    def gvt_round(self) -> float:
+        """
+        Method to run a GVT round with all peers.
+
+        Returns:
+            float: the global virtual time.
+        """
+
+        self.send_messages()
+        marker = min(self.top_time(), self._sent_min)
+        self.send_messages(marker)
+        self._sent_min = inf
+
+        # A peer may already have started the next round, so markers are
+        # taken oldest first
+        markers = self._markers
+        while not all(markers.values()):
+            if not self.receive_messages():
+                self.transport.wait_any([peer for peer in self.peers
+                                         if not markers[peer]])
+        return min([marker] + [markers[peer].pop(0) for peer in self.peers])
+
+    def fossil_collect(self) -> None:
+        """Method to commit every executed event earlier than the GVT."""
+
+        processed = self._processed
+        gvt = self.gvt
+        committed = bisect_left(processed, gvt,
+                                key=lambda record: record.event.time)
+        del processed[:committed]
+        self.committed += committed
+        expiry = self._expiry
+        while expiry and expiry[0][0] < gvt:
+            self._received.pop(heappop(expiry)[1], None)
+
+    def execute(self, end: float, limit: int) -> int:
+        """
+        Method to execute events optimistically, checkpointing their owners.
+
+        Args:
+            end (float): time before which events are executed.
+            limit (int): maximum number of events to execute.
+
+        Returns:
+            int: number of events executed.
+        """
+
+        cost_profiler = self.cost_profiler
+        processed = self._processed
+        events = self.events
+        executed = 0
+        while executed < limit and len(events) > 0 and events.top().time < end:
+            event = events.pop()
+            if event.is_invalid():
+                continue
+            assert self.time <= event.time, "invalid event time for process scheduled on " + str(
+                event.process.owner)
+            self.time = event.time
+            owner = event.process.owner
+            record = self._current = _Record(event, owner, owner.save_state())
+            if cost_profiler is None:
+                event.process.run()
+            else:
+                cost_profiler.run(event.process)
+            self._current = None
+            processed.append(record)
+            executed += 1
+        self.executed += executed
+        self.run_counter += executed
+        return executed
+
+    async def run_async(self):
+        """
+        Coroutine running the simulation (not supported).
+
+        Raises:
+            NotImplementedError: optimistic timelines poll their transport
+                between events rather than exchanging at window boundaries.
+        """
+
+        raise NotImplementedError("optimistic timelines cannot be driven "
+                                  "by an event loop")
+
+    def run(self):
+        """Runs the simulation until the GVT reaches the stop time."""
+
+        while True:
+            tick = time()
+            self.gvt = self.gvt_round()
+            self.communication_time += time() - tick
+            if self.gvt >= self.stop_time:
+                break
+            self.fossil_collect()
+            self.sync_counter += 1
+
+            end = min(self.gvt + self.optimism, self.stop_time)
+            self.window_widths.append(end - self.gvt)
+            executed = 0
+            # Run until the next round is due, a peer starts one, or
+            # nothing can be executed
+            while executed < self.gvt_interval \
+                    and not any(self._markers.values()):
+                tick = time()
+                batch = self.execute(end, POLL_EVENTS)
+                self.computing_time += time() - tick
+                tick = time()
+                self.send_messages()
+                self.receive_messages()
+                self.communication_time += time() - tick
+                if batch == 0:
+                    break
+                executed += batch
+
+        # Nothing before the stop time can be rolled back any more
+        self.committed += len(self._processed)
+        self._processed.clear()
+        self._received.clear()
+        self._expiry.clear()
+        self.transport.flush()
@@ -0,0 +1,375 @@
+"""
+Partitioning of simulation entities across threaded timelines.
+
+This module defines the InteractionGraph of a simulation, in which entities
+are weighted by their load and pairs of entities by the number of events
+they send each other, and the InteractionRecorder timeline that learns the
+graph from a sequential profiling run. The `partition` function assigns the
+entities to timelines so that the loads are balanced and as few events as
+possible cross timelines, and `apply_partition` registers the entities
+assigned elsewhere as foreign entities of a threaded timeline.
+"""
+
+from heapq import heappush, heappop
+from math import inf
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+
+from .timeline import Timeline
+from .eventlist import HEAP_EVENT_LIST
+
+if TYPE_CHECKING:
+    from .event import Event
+    from .t_timeline import ThreadedTimeline
+
+# Moves without a better cut after which a refinement pass gives up
+MAX_FRUITLESS_MOVES = 64
+
+
+class InteractionGraph:
+    """
+    Class of the interaction graph of the entities of a simulation.
+
+    The graph can be declared, by adding the entities and the interactions
+    expected between them, or recorded by an InteractionRecorder.
+
+    Attributes:
+        weights (Dict[str, float]): load of every entity, e.g. the number of
+            events it executes.
+        edges (Dict[str, Dict[str, float]]): weight of the interactions
+            between every pair of entities, in both directions.
+    """
+
+    def __init__(self):
+        """Constructor for InteractionGraph class."""
+
+        self.weights: Dict[str, float] = {}
+        self.edges: Dict[str, Dict[str, float]] = {}
+
+    def add_entity(self, name: str, weight: float = 1) -> None:
+        """
+        Method to add an entity, or add load to an existing one.
+
+        Args:
+            name (str): name of the entity.
+            weight (float): load added to the entity (default 1).
+        """
+
+        self.weights[name] = self.weights.get(name, 0) + weight
+        self.edges.setdefault(name, {})
+
+    def add_interaction(self, source: str, target: str,
+                        weight: float = 1) -> None:
+        """
+        Method to add events sent from one entity to another.
+
+        Both entities are added with a load of 1 if missing. Events an
+        entity sends itself never cross timelines and are ignored.
+
+        Args:
+            source (str): name of the entity sending the events.
+            target (str): name of the entity receiving the events.
+            weight (float): number of events (default 1).
+        """
+
+        for name in (source, target):
+            if name not in self.weights:
+                self.add_entity(name)
+        if source == target:
+            return
+        self.edges[source][target] = self.edges[source].get(target, 0) + weight
+        self.edges[target][source] = self.edges[target].get(source, 0) + weight
+
+    def cut_weight(self, assignment: Dict[str, int]) -> float:
+        """
+        Method to get the weight of the interactions crossing timelines.
+
+        Args:
+            assignment (Dict[str, int]): timeline of every entity.
+
+        Returns:
+            float: total weight of the edges between different timelines.
+        """
+
+        cut = 0
+        for name, neighbors in self.edges.items():
+            for neighbor, weight in neighbors.items():
+                if assignment[name] != assignment[neighbor]:
+                    cut += weight
+        return cut / 2
+
+    def total_weight(self) -> float:
+        """Method to get the total weight of the interactions."""
+
+        return sum(sum(neighbors.values())
+                   for neighbors in self.edges.values()) / 2
+
+    def loads(self, assignment: Dict[str, int], parts: int) -> List[float]:
+        """
+        Method to get the load of every timeline.
+
+        Args:
+            assignment (Dict[str, int]): timeline of every entity.
+            parts (int): number of timelines.
+
+        Returns:
+            List[float]: total entity weight assigned to every timeline.
+        """
+
+        loads = [0] * parts
+        for name, weight in self.weights.items():
+            loads[assignment[name]] += weight
+        return loads
+
+
+class InteractionRecorder(Timeline):
+    """
+    Class for a sequential timeline that records its interaction graph.
+
+    The whole model is built on the recorder and run for a while, as on a
+    plain Timeline. Every executed event adds one to the weight of its
+    entity, and every event scheduled while an entity executes one adds an
+    interaction from that entity to the owner of the scheduled event.
+
+    Attributes:
+        graph (InteractionGraph): the recorded graph.
+    """
+
+    def __init__(self, stop_time=inf, event_list=HEAP_EVENT_LIST):
+        """
+        Constructor for InteractionRecorder class.
+
+        Args:
+            stop_time (int): stop time of the profiling run (default inf).
+            event_list (str): event list implementation (default
+                HEAP_EVENT_LIST).
+        """
+
+        super(InteractionRecorder, self).__init__(stop_time, event_list)
+        self.graph = InteractionGraph()
+        self._source: Optional[str] = None
+
+    def _record(self, event: "Event") -> None:
+        owner = event.process.owner
+        target = owner if type(owner) is str else getattr(owner, "name", None)
+        if self._source is not None and target is not None:
+            self.graph.add_interaction(self._source, target)
+
+    def schedule(self, event: "Event") -> None:
+        """Method to schedule an event, recording the interaction."""
+
+        self._record(event)
+        super(InteractionRecorder, self).schedule(event)
+
+    def schedule_many(self, events: "Iterable[Event]") -> None:
+        """Method to schedule a batch of events, recording interactions."""
+
+        events = list(events)
+        for event in events:
+            self._record(event)
+        super(InteractionRecorder, self).schedule_many(events)
+
+    def run(self) -> None:
+        """Runs the profiling simulation until the stop time."""
+
+        self.is_running = True
+        for name in self.entities:
+            self.graph.add_entity(name, 0)
+
+        while len(self.events) > 0:
+            event = self.events.pop()
+            if event.time >= self.stop_time:
+                self.schedule(event)
+                break
+            if event.is_invalid():
+                continue
+
+            self.time = event.time
+            owner = event.process.owner
+            self._source = getattr(owner, "name", None)
+            if self._source is not None:
+                self.graph.add_entity(self._source)
+            event.process.run()
+            self._source = None
+            self.run_counter += 1
+
+        self.is_running = False
+
+
+def _connections(graph: InteractionGraph, assignment: Dict[str, int],
+                 name: str, parts: int) -> List[float]:
+    """Function to get the interaction weight of an entity per timeline."""
+
+    connections = [0] * parts
+    for neighbor, weight in graph.edges[name].items():
+        part = assignment.get(neighbor)
+        if part is not None:
+            connections[part] += weight
+    return connections
+
+
+def _grow(graph: InteractionGraph, weights: Dict[str, float], parts: int,
+          capacity: float) -> Dict[str, int]:
+    """
+    Function to assign entities greedily by graph growing.
+
+    Entities are taken most connected to the assigned ones first, and each
+    joins the timeline it interacts with most that still has room, or the
+    least loaded timeline if none does.
+    """
+
+    assignment = {}
+    loads = [0] * parts
+    attached = {name: 0 for name in weights}
+    # Unattached entities are taken heaviest first, then by name
+    queue = [(0, -weights[name], name) for name in sorted(weights)]
+    queue.sort()
+    while queue:
+        negative, _, name = heappop(queue)
+        if name in assignment or -negative != attached[name]:
+            continue
+        weight = weights[name]
+        connections = _connections(graph, assignment, name, parts)
+        fitting = [part for part in range(parts)
+                   if loads[part] + weight <= capacity]
+        if fitting:
+            part = max(fitting, key=lambda p: (connections[p], -loads[p], -p))
+        else:
+            part = min(range(parts), key=lambda p: (loads[p], p))
+        assignment[name] = part
+        loads[part] += weight
+        for neighbor, edge in graph.edges[name].items():
+            if neighbor not in assignment:
+                attached[neighbor] += edge
+                heappush(queue, (-attached[neighbor],
+                                 -weights[neighbor], neighbor))
+    return assignment
+
+
+def _refine(graph: InteractionGraph, weights: Dict[str, float],
+            assignment: Dict[str, int], parts: int, capacity: float) -> bool:
+    """
+    Function to run one Fiduccia-Mattheyses pass over the assignment.
+
+    The move of an entity to another timeline with the highest gain in cut
+    weight is applied repeatedly, even if the gain is negative, as long as
+    the target timeline stays within capacity, and the entity is then locked
+    for the pass. The pass ends when no move is left or after
+    MAX_FRUITLESS_MOVES moves without a better cut, and the assignment is
+    rolled back to the best cut seen.
+
+    Returns:
+        bool: whether the pass reduced the cut weight.
+    """
+
+    loads = [0] * parts
+    for name, weight in weights.items():
+        loads[assignment[name]] += weight
+    locked = set()
+    queue = []
+
+    def push_moves(name):
+        part = assignment[name]
+        connections = _connections(graph, assignment, name, parts)
+        for target in range(parts):
+            if target != part and connections[target] > 0:
+                heappush(queue, (connections[part] - connections[target],
+                                 name, target))
+
+    for name in sorted(weights):
+        push_moves(name)
+
+    moves = []
+    gain = best_gain = 0
+    best_moves = 0
+    while queue and len(moves) - best_moves < MAX_FRUITLESS_MOVES:
+        loss, name, target = heappop(queue)
+        if name in locked:
+            continue
+        part = assignment[name]
+        connections = _connections(graph, assignment, name, parts)
+        if connections[part] - connections[target] != loss:
+            continue  # stale, a fresh entry was pushed
+        weight = weights[name]
+        if loads[target] + weight > capacity:
+            continue
+        assignment[name] = target
+        loads[part] -= weight
+        loads[target] += weight
+        locked.add(name)
+        moves.append((name, part))
+        gain -= loss
+        if gain > best_gain:
+            best_gain, best_moves = gain, len(moves)
+        for neighbor in graph.edges[name]:
+            if neighbor not in locked:
+                push_moves(neighbor)
+
+    for name, part in reversed(moves[best_moves:]):
+        assignment[name] = part
+    return best_gain > 0
+
+
+def partition(graph: InteractionGraph, parts: int, imbalance: float = 0.05,
+              passes: int = 8) -> Dict[str, int]:
+    """
+    Function to assign entities to timelines with a balanced minimum cut.
+
+    Entities are first assigned by greedy graph growing, then the cut is
+    reduced by Fiduccia-Mattheyses refinement passes until a pass no longer
+    improves it. The result only depends on the graph, so every interpreter
+    computes the same assignment from the same graph.
+
+    Args:
+        graph (InteractionGraph): interaction graph of the entities.
+        parts (int): number of timelines.
+        imbalance (float): allowed excess of the load of a timeline over
+            the mean load (default 0.05).
+        passes (int): maximum number of refinement passes (default 8).
+
+    Returns:
+        Dict[str, int]: timeline of every entity.
+    """
+
+    if parts < 1:
+        raise ValueError(f"Invalid number of parts {parts}")
+    weights = graph.weights
+    if not any(weights.values()):
+        # Without any known load, balance the number of entities
+        weights = {name: 1 for name in weights}
+    total = sum(weights.values())
+    heaviest = max(weights.values(), default=0)
+    capacity = max((1 + imbalance) * total / parts, heaviest)
+    assignment = _grow(graph, weights, parts, capacity)
+    for _ in range(passes):
+        if not _refine(graph, weights, assignment, parts, capacity):
+            break
+    return assignment
+
+
+def apply_partition(timeline: "ThreadedTimeline",
+                    assignment: Dict[str, int]) -> List[str]:
+    """
+    Function to register the entities of other timelines on a timeline.
+
+    Every entity assigned to another timeline is added with
+    `add_foreign_entity`; the caller creates the entities assigned to
+    `timeline`.
+
+    Args:
+        timeline (ThreadedTimeline): timeline to configure.
+        assignment (Dict[str, int]): timeline of every entity.
+
+    Returns:
+        List[str]: names of the entities assigned to `timeline`.
+    """
+
+    size = timeline.transport.size
+    local = []
+    for name, rank in assignment.items():
+        if not 0 <= rank < size:
+            raise ValueError(f"Invalid timeline {rank} for entity {name}")
+        if rank == timeline.id:
+            local.append(name)
+        else:
+            timeline.add_foreign_entity(name, rank)
+    return local
@@ -3,7 +3,7 @@ Definition of the Process class.
 
 This module defines a process, which is performed when an event is executed.
 """
-from typing import Any, List
+from typing import Any, Dict, List
 
 
 class Process:
@@ -13,19 +13,51 @@ class Process:
     The process claims the object of process, the function of object, and the
     arguments for the function.
 
+    The bound method is looked up once and cached, either when the timeline
+    swaps an owner name for its entity (see `bind`) or on the first run.
+    Only the owner name and method name are pickled, so processes sent to
+    another interpreter are resolved again on arrival.
+
     Attributes:
         owner (Any): the object of process.
         activation_method (str): the function of object.
         act_params (List[Any]): the arguments of object.
         act_kwargs (Dict): keyword arguments of object.
+        _method (Callable): cached bound method, or None if not resolved.
     """
 
+    __slots__ = ('owner', 'activation', 'act_params', 'act_kwargs',
+                 '_method')
+
     def __init__(self, owner: Any, activation_method: str, 
                  act_params: List[Any], act_kwargs={}):
         self.owner = owner
         self.activation = activation_method
         self.act_params = act_params
         self.act_kwargs = act_kwargs
+        self._method = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The cached method would drag the whole owner into the pickle
+        return {'owner': self.owner, 'activation': self.activation,
+                'act_params': self.act_params, 'act_kwargs': self.act_kwargs}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._method = None
+
+    def bind(self, owner: Any) -> None:
+        """
+        Method to set the owner of the process and cache its method.
+
+        Args:
+            owner (Any): the object of process, or None if it was not found
+                (the error is then raised when the process runs).
+        """
+
+        self.owner = owner
+        self._method = getattr(owner, self.activation, None)
 
     def run(self) -> None:
         """
@@ -35,5 +67,9 @@ class Process:
         passed as args.
         """
 
-        return getattr(self.owner, self.activation)(*self.act_params, 
-                                                    **self.act_kwargs)
+        method = self._method
+        if method is None:
+            method = self._method = getattr(self.owner, self.activation)
+        if not self.act_params and not self.act_kwargs:
+            return method()
+        return method(*self.act_params, **self.act_kwargs)
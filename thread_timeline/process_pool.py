@@ -0,0 +1,150 @@
+"""
+Process backend for threaded timelines.
+
+This module runs every timeline of a simulation in its own worker process,
+started with `multiprocessing`, so simulations use several cores on any
+CPython build, without sub-interpreter support. Workers are connected by a
+SharedMemoryTransport, whose ring buffers are files shared by path, and
+each worker builds, initializes and runs one timeline exactly as a
+sub-interpreter would.
+"""
+
+from queue import Empty
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+import multiprocessing
+import traceback
+
+from .ring_buffer import SharedMemoryTransport, new_session, \
+    remove_session
+
+if TYPE_CHECKING:
+    from .t_timeline import ThreadedTimeline
+    from .transport import Transport
+
+# Interval at which the parent checks for workers that died, in seconds
+POLL_SECONDS = 0.1
+
+
+def default_summary(timeline: "ThreadedTimeline") -> Dict[str, Any]:
+    """
+    Function to summarize a timeline after its run.
+
+    Args:
+        timeline (ThreadedTimeline): timeline that finished running.
+
+    Returns:
+        Dict[str, Any]: counters and timings of the timeline.
+    """
+
+    return {"id": timeline.id,
+            "time": timeline.now(),
+            "run_counter": timeline.run_counter,
+            "schedule_counter": timeline.schedule_counter,
+            "sync_counter": timeline.sync_counter,
+            "exchange_counter": timeline.exchange_counter,
+            "pending": len(timeline.events),
+            "computing_time": timeline.computing_time,
+            "communication_time": timeline.communication_time,
+            "wait_time": timeline.transport.wait_time}
+
+
+def _worker(rank: int, size: int, session: str, capacity: Optional[int],
+            setup: Callable[["Transport"], "ThreadedTimeline"],
+            summary: Callable[["ThreadedTimeline"], Any], results) -> None:
+    """Function run by every worker process."""
+
+    transport = SharedMemoryTransport(rank, size, session, capacity)
+    try:
+        timeline = setup(transport)
+        timeline.init()
+        timeline.run()
+        results.put((rank, True, summary(timeline)))
+    except BaseException:
+        results.put((rank, False, traceback.format_exc()))
+    finally:
+        transport.close()
+
+
+def run_processes(setup: Callable[["Transport"], "ThreadedTimeline"],
+                  size: int,
+                  summary: Callable[["ThreadedTimeline"], Any] =
+                  default_summary,
+                  start_method: Optional[str] = None,
+                  session: Optional[str] = None,
+                  capacity: Optional[int] = None) -> List[Any]:
+    """
+    Function to run a simulation with one timeline per worker process.
+
+    Every worker creates its transport and passes it to `setup`, which must
+    create the timeline of that rank with it, add the local entities and
+    the foreign entities (e.g. with `apply_partition`) and return the
+    timeline. The worker then initializes and runs it, and returns
+    `summary(timeline)` to the parent. With the "spawn" and "forkserver"
+    start methods, `setup` and `summary` must be picklable, e.g. module
+    level functions or `functools.partial` objects of them.
+
+    If a worker fails, all others are terminated, since they would wait for
+    it forever, and the ring buffer files are removed.
+
+    Args:
+        setup (Callable[[Transport], ThreadedTimeline]): builds the timeline
+            of a worker from its transport.
+        size (int): number of timelines (worker processes).
+        summary (Callable[[ThreadedTimeline], Any]): returns the picklable
+            result of a worker (default `default_summary`).
+        start_method (str): multiprocessing start method (default the
+            platform default).
+        session (str): name of the ring buffer files (default unique to
+            this call).
+        capacity (int): data bytes per ring buffer (default
+            `default_capacity(size)`).
+
+    Returns:
+        List[Any]: result of every worker, by rank.
+
+    Raises:
+        RuntimeError: a worker raised an exception or died.
+    """
+
+    if size < 1:
+        raise ValueError(f"Invalid number of processes {size}")
+    if session is None:
+        session = new_session()
+    context = multiprocessing.get_context(start_method)
+    results = context.Queue()
+    workers = [context.Process(target=_worker, name=f"timeline-{rank}",
+                               args=(rank, size, session, capacity, setup,
+                                     summary, results))
+               for rank in range(size)]
+    for worker in workers:
+        worker.start()
+
+    collected = {}
+    failure = None
+    try:
+        while len(collected) < size and failure is None:
+            try:
+                rank, succeeded, value = results.get(timeout=POLL_SECONDS)
+            except Empty:
+                for rank, worker in enumerate(workers):
+                    if worker.exitcode not in (None, 0) \
+                            and rank not in collected:
+                        failure = (f"timeline {rank} exited with code "
+                                   f"{worker.exitcode}")
+                continue
+            if succeeded:
+                collected[rank] = value
+            else:
+                failure = f"timeline {rank} failed:\n{value}"
+    finally:
+        if failure is not None or len(collected) < size:
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+        for worker in workers:
+            worker.join()
+        if failure is not None or len(collected) < size:
+            remove_session(session, size)
+    if failure is not None:
+        raise RuntimeError(failure)
+    return [collected[rank] for rank in range(size)]
@@ -0,0 +1,313 @@
+"""
+Definition of the WindowProfiler and CostProfiler classes.
+
+This module defines the opt-in profilers of the timelines. The
+WindowProfiler records one row of measurements per synchronization window
+of a ThreadedTimeline; comparing the exported rows of all timelines shows
+how load is balanced between interpreters over the course of a simulation.
+The CostProfiler accounts the wall time of executed events to the type of
+their owner and their activation method.
+"""
+
+from array import array
+from math import log
+from random import Random
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Dict, List, Sequence, Tuple
+import csv
+import json
+
+if TYPE_CHECKING:
+    from .process import Process
+
+# Number of windows the profiler has room for before it grows
+DEFAULT_CAPACITY = 4096
+
+# Cost accounting modes
+FULL_ACCOUNTING = "full"
+SAMPLED_ACCOUNTING = "sampled"
+
+# Default mean number of events per timed event in sampled accounting
+DEFAULT_SAMPLE_INTERVAL = 64
+
+# Per-window columns and their array typecodes
+COLUMNS = (
+    ('start', 'd'),            # simulation time at the start of the window
+    ('width', 'd'),            # simulation time covered by the window
+    ('executed', 'Q'),         # events executed in the window
+    ('queue_depth', 'Q'),      # events left in the event list afterwards
+    ('encode_time', 'd'),      # seconds spent serializing event buffers
+    ('transport_time', 'd'),   # seconds spent in the transport exchange
+    ('wait_time', 'd'),        # part of transport_time spent waiting
+    ('decode_time', 'd'),      # seconds spent deserializing payloads
+    ('compute_time', 'd'),     # seconds spent executing events
+)
+
+
+class WindowProfiler:
+    """
+    Class to record per-window statistics of a ThreadedTimeline.
+
+    All columns are arrays preallocated for `capacity` windows, which are
+    doubled in size whenever they fill up, so recording a window only writes
+    a few numbers in place. Per-peer event counts are
+    stored row-major in one array of `size` entries per window.
+
+    Attributes:
+        rank (int): id of the timeline being profiled.
+        size (int): total number of timelines.
+        windows (int): number of windows recorded.
+        columns (Dict[str, array]): per-window columns, see COLUMNS.
+        sent (array): events sent to each peer, `size` entries per window.
+        received (array): events received from each peer, `size` entries
+            per window.
+    """
+
+    def __init__(self, rank: int, size: int,
+                 capacity: int = DEFAULT_CAPACITY):
+        """
+        Constructor for WindowProfiler class.
+
+        Args:
+            rank (int): id of the timeline being profiled.
+            size (int): total number of timelines.
+            capacity (int): number of windows to preallocate (default
+                DEFAULT_CAPACITY).
+        """
+
+        self.rank = rank
+        self.size = size
+        self.windows = 0
+        self._capacity = capacity
+        self.columns = {name: array(code, [0]) * capacity
+                        for name, code in COLUMNS}
+        self.sent = array('Q', [0]) * (capacity * size)
+        self.received = array('Q', [0]) * (capacity * size)
+
+    def _grow(self) -> None:
+        """Method to double the capacity of every column."""
+
+        for column in (*self.columns.values(), self.sent, self.received):
+            column.frombytes(bytes(column.itemsize * len(column)))
+        self._capacity *= 2
+
+    def record(self, start: float, width: float, executed: int,
+               queue_depth: int, encode_time: float, transport_time: float,
+               wait_time: float, decode_time: float, compute_time: float,
+               sent: Sequence[int], received: Sequence[int]) -> None:
+        """
+        Method to record the statistics of one window.
+
+        Args:
+            start (float): simulation time at the start of the window.
+            width (float): simulation time covered by the window.
+            executed (int): events executed in the window.
+            queue_depth (int): events left in the event list.
+            encode_time (float): seconds spent serializing event buffers.
+            transport_time (float): seconds spent in the transport exchange.
+            wait_time (float): seconds of transport_time spent waiting.
+            decode_time (float): seconds spent deserializing payloads.
+            compute_time (float): seconds spent executing events.
+            sent (Sequence[int]): events sent to each timeline, by id.
+            received (Sequence[int]): events received from each timeline,
+                by id.
+        """
+
+        i = self.windows
+        if i == self._capacity:
+            self._grow()
+        columns = self.columns
+        columns['start'][i] = start
+        columns['width'][i] = width
+        columns['executed'][i] = executed
+        columns['queue_depth'][i] = queue_depth
+        columns['encode_time'][i] = encode_time
+        columns['transport_time'][i] = transport_time
+        columns['wait_time'][i] = wait_time
+        columns['decode_time'][i] = decode_time
+        columns['compute_time'][i] = compute_time
+        offset = i * self.size
+        for peer in range(self.size):
+            self.sent[offset + peer] = sent[peer]
+            self.received[offset + peer] = received[peer]
+        self.windows = i + 1
+
+    def fieldnames(self) -> List[str]:
+        """Returns the names of the fields of every exported row."""
+
+        return (['rank', 'window'] + [name for name, _ in COLUMNS]
+                + [f'sent_{peer}' for peer in range(self.size)]
+                + [f'received_{peer}' for peer in range(self.size)])
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Returns the recorded windows as a list of dictionaries."""
+
+        size = self.size
+        rows = []
+        for i in range(self.windows):
+            row = {'rank': self.rank, 'window': i}
+            for name, column in self.columns.items():
+                row[name] = column[i]
+            for peer in range(size):
+                row[f'sent_{peer}'] = self.sent[i * size + peer]
+            for peer in range(size):
+                row[f'received_{peer}'] = self.received[i * size + peer]
+            rows.append(row)
+        return rows
+
+    def to_csv(self, path: str) -> None:
+        """
+        Method to write the recorded windows to a CSV file.
+
+        Args:
+            path (str): path of the file to write.
+        """
+
+        with open(path, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=self.fieldnames())
+            writer.writeheader()
+            writer.writerows(self.rows())
+
+    def to_json(self, path: str) -> None:
+        """
+        Method to write the recorded windows to a JSON file.
+
+        Args:
+            path (str): path of the file to write.
+        """
+
+        with open(path, 'w') as file:
+            json.dump({'rank': self.rank, 'size': self.size,
+                       'windows': self.rows()}, file)
+
+
+class CostProfiler:
+    """
+    Class to account execution time to entity types and methods.
+
+    Costs are keyed by `(type(owner).__name__, activation)`, and every call
+    is counted exactly. In FULL_ACCOUNTING mode every event is timed. In
+    SAMPLED_ACCOUNTING mode only one in `interval` events is timed on
+    average, which keeps the overhead low enough for runs of production
+    length, and the seconds of a key are estimated from the mean of its
+    timed calls. The gaps between timed events are drawn from a geometric
+    distribution, so periodic patterns of events do not alias with the
+    sampling, and the first call of every key is timed, so rare methods
+    still get an estimate.
+
+    Attributes:
+        mode (str): FULL_ACCOUNTING or SAMPLED_ACCOUNTING.
+        interval (int): mean number of events per timed event (1 when
+            full).
+        costs (Dict[Tuple[str, str], List]): mapping of key to the number of
+            calls, the number of timed calls and their total seconds.
+    """
+
+    def __init__(self, mode: str = SAMPLED_ACCOUNTING,
+                 interval: int = DEFAULT_SAMPLE_INTERVAL):
+        """
+        Constructor for CostProfiler class.
+
+        Args:
+            mode (str): FULL_ACCOUNTING or SAMPLED_ACCOUNTING (default
+                SAMPLED_ACCOUNTING).
+            interval (int): mean number of events per timed event in
+                sampled mode (default DEFAULT_SAMPLE_INTERVAL).
+        """
+
+        if mode == FULL_ACCOUNTING:
+            interval = 1
+        elif mode == SAMPLED_ACCOUNTING:
+            if interval < 1:
+                raise ValueError(f"Invalid sample interval {interval}")
+        else:
+            raise ValueError(f"Invalid accounting mode {mode}")
+        self.mode = mode
+        self.interval = interval
+        self.costs = {}
+        # Sampling only; the simulation's own random streams are not used
+        self._random = Random()
+        # Logarithm of the probability of not timing an event
+        self._log_skip = log(1 - 1 / interval) if interval > 1 else None
+        self._countdown = self._draw()
+
+    def _draw(self) -> int:
+        """Returns the number of events until the next timed one."""
+
+        if self._log_skip is None:
+            return 1
+        return int(log(1.0 - self._random.random()) / self._log_skip) + 1
+
+    def run(self, process: "Process") -> None:
+        """
+        Method to execute a process, timing it if it is sampled.
+
+        Args:
+            process (Process): process of the event being executed.
+        """
+
+        key = (type(process.owner).__name__, process.activation)
+        cost = self.costs.get(key)
+        if cost is None:
+            cost = self.costs[key] = [0, 0, 0.0]
+        cost[0] += 1
+        self._countdown -= 1
+        if self._countdown and cost[1]:
+            process.run()
+            return
+        if not self._countdown:
+            self._countdown = self._draw()
+
+        tick = perf_counter()
+        process.run()
+        cost[2] += perf_counter() - tick
+        cost[1] += 1
+
+    def summary(self) -> List[Tuple[str, str, int, float]]:
+        """
+        Returns the calls and estimated seconds of every key.
+
+        Returns:
+            List[Tuple[str, str, int, float]]: entity type, method, calls and
+                seconds, sorted by decreasing seconds.
+        """
+
+        rows = [(owner, method, calls,
+                 seconds * calls / timed if timed else 0.0)
+                for (owner, method), (calls, timed, seconds)
+                in self.costs.items()]
+        rows.sort(key=lambda row: row[3], reverse=True)
+        return rows
+
+    def report(self) -> str:
+        """Returns the summary as a text table."""
+
+        rows = self.summary()
+        total = sum(row[3] for row in rows) or 1.0
+        lines = [f"{'entity':<24}{'method':<24}{'calls':>12}{'seconds':>12}"
+                 f"{'us/call':>10}{'%':>7}"]
+        for owner, method, calls, seconds in rows:
+            lines.append(f"{owner:<24}{method:<24}{calls:>12}"
+                         f"{seconds:>12.4f}{seconds / calls * 1e6:>10.2f}"
+                         f"{100 * seconds / total:>7.1f}")
+        if self.mode == SAMPLED_ACCOUNTING:
+            lines.append(f"(seconds estimated from 1 in {self.interval} "
+                         f"events on average)")
+        return "\n".join(lines)
+
+    def to_collapsed(self, path: str, root: str = "run") -> None:
+        """
+        Method to write the costs in collapsed stack format.
+
+        Every line is `root;entity type;method microseconds`, which can be
+        rendered directly by flamegraph.pl or speedscope.
+
+        Args:
+            path (str): path of the file to write.
+            root (str): name of the root frame (default "run").
+        """
+
+        with open(path, 'w') as file:
+            for owner, method, _, seconds in self.summary():
+                file.write(f"{root};{owner};{method} "
+                           f"{round(seconds * 1e6)}\n")
@@ -0,0 +1,912 @@
+"""
+Definition of the RingBuffer and SharedMemoryTransport classes.
+
+This module defines a lock-free single-producer/single-consumer ring buffer
+stored in a memory-mapped file, and a transport that connects timelines with
+one ring buffer per direction. Because the file is mapped by every party,
+sending a payload costs a copy into the mapping and an update of the write
+cursor, with no system calls. A side that has to wait spins for a bounded
+number of attempts and then sleeps on a doorbell (a named pipe) that the
+other side only rings while it is flagged as waiting.
+
+The ring buffer is only safe on processors with total store order, such as
+x86-64. Elsewhere, the transport carries data through named pipes instead,
+with the PipeBuffer class.
+"""
+
+from mmap import mmap, PAGESIZE
+from select import poll, POLLIN, POLLOUT
+from struct import Struct
+from time import perf_counter, sleep
+from typing import Dict, List, Optional
+import asyncio
+import fcntl
+import os
+import platform
+import tempfile
+import termios
+
+from .transport import Transport
+
+# Ring buffer layout. Cursors and waiting flags are on separate cache lines
+# so the producer and consumer never write to the same line.
+_CURSOR = Struct('<Q')
+_FLAG = Struct('<I')
+HEAD_OFFSET = 0
+TAIL_OFFSET = 64
+READER_WAITING_OFFSET = 128
+WRITER_WAITING_OFFSET = 192
+DATA_OFFSET = 256
+
+_FRAME_HEADER = Struct('<Q')
+# Result of the FIONREAD ioctl
+_PENDING = Struct('i')
+
+# Machines whose processors keep stores, and loads, in program order
+TSO_MACHINES = frozenset({'x86_64', 'amd64', 'i386', 'i486', 'i586', 'i686',
+                          'x86'})
+
+# Largest default data bytes per ring buffer
+DEFAULT_CAPACITY = 8 * 1024 * 1024
+# Default data bytes of all ring buffers of a session, shared by its rings
+DEFAULT_BUDGET = 512 * 1024 * 1024
+# Smallest default data bytes per ring buffer, whatever the budget
+MIN_CAPACITY = 64 * 1024
+DEFAULT_SPIN = 200
+# Upper bound on a single sleep, in case a wake-up races with the flag
+MAX_BLOCK_SECONDS = 0.01
+
+
+def default_directory() -> str:
+    """Returns a RAM-backed directory for ring buffer files if available."""
+
+    if os.path.isdir('/dev/shm'):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+
+def default_capacity(size: int, budget: int = DEFAULT_BUDGET) -> int:
+    """
+    Returns the default data bytes per ring buffer of a session.
+
+    The N(N-1) ring buffers of a session of N timelines share `budget`,
+    rounded down to whole pages, but no ring gets more than
+    DEFAULT_CAPACITY or less than MIN_CAPACITY.
+
+    Args:
+        size (int): number of timelines of the session.
+        budget (int): data bytes of all ring buffers (default 512 MiB).
+    """
+
+    rings = max(size * (size - 1), 1)
+    capacity = budget // rings // PAGESIZE * PAGESIZE
+    return max(MIN_CAPACITY, min(DEFAULT_CAPACITY, capacity))
+
+
+def total_store_order() -> bool:
+    """Returns whether this processor is known to have total store order."""
+
+    return platform.machine().lower() in TSO_MACHINES
+
+
+def new_session(prefix: str = "thread-timeline") -> str:
+    """
+    Returns a new session name.
+
+    The name ends with random bytes, so it never matches the ring buffer
+    files left by a run that was killed, even one whose process id was
+    reused, which would otherwise be attached with their stale cursors.
+
+    Args:
+        prefix (str): start of the name (default "thread-timeline").
+    """
+
+    return f"{prefix}-{os.getpid()}-{os.urandom(8).hex()}"
+
+
+def process_session(prefix: str = "thread-timeline") -> str:
+    """
+    Returns a session name shared by all interpreters of this process.
+
+    The name holds the process id and, where /proc is available, the start
+    time of the process, so the files left by a killed process whose id has
+    since been reused are not attached.
+
+    Args:
+        prefix (str): start of the name (default "thread-timeline").
+    """
+
+    try:
+        with open('/proc/self/stat') as file:
+            # Field 22, counted after the parenthesized command name
+            started = file.read().rpartition(')')[2].split()[19]
+    except OSError:
+        return f"{prefix}-{os.getpid()}"
+    return f"{prefix}-{os.getpid()}-{started}"
+
+
+def remove_session(session: str, size: int,
+                   directory: Optional[str] = None) -> None:
+    """
+    Removes the ring buffer files of a session.
+
+    Needed when timelines are terminated before closing their transports.
+
+    Args:
+        session (str): name shared by all timelines of the simulation.
+        size (int): number of timelines of the simulation.
+        directory (str): directory of the ring buffer files (default
+            `default_directory()`).
+    """
+
+    directory = default_directory() if directory is None else directory
+    for src in range(size):
+        for dst in range(size):
+            path = os.path.join(directory, f"{session}-{src}-{dst}")
+            for name in (path, path + '.data', path + '.space'):
+                try:
+                    os.unlink(name)
+                except FileNotFoundError:
+                    pass
+
+
+def _open_doorbell(path: str) -> int:
+    """Creates (if needed) and opens a named pipe, such as a doorbell."""
+
+    try:
+        os.mkfifo(path, 0o600)
+    except FileExistsError:
+        pass
+    # Opening read-write never blocks, even before the other side opens it
+    return os.open(path, os.O_RDWR | os.O_NONBLOCK)
+
+
+def _ring_doorbell(fd: int) -> None:
+    try:
+        os.write(fd, b'\0')
+    except BlockingIOError:
+        pass   # Pipe full: the sleeper will wake up anyway
+
+
+def _drain_doorbell(fd: int) -> None:
+    try:
+        while os.read(fd, 4096):
+            pass
+    except BlockingIOError:
+        pass
+
+
+class RingBuffer:
+    """
+    Class of single-producer/single-consumer ring buffer.
+
+    The buffer is a file mapped into memory, so it can be shared between
+    interpreters or processes by path. The write cursor (head) is only
+    modified by the producer and the read cursor (tail) only by the consumer;
+    both count the total number of bytes written/read, so no lock is needed.
+
+    Each ring has two doorbells next to its file: `<path>.data`, rung by the
+    producer after publishing data while the consumer is waiting, and
+    `<path>.space`, rung by the consumer after freeing space while the
+    producer is waiting.
+
+    The producer copies data into the ring before storing the new head, and
+    the consumer loads the head before copying the data out (and likewise
+    for the tail and the space it frees). No memory fence separates these
+    accesses, so the protocol relies on the processor keeping stores, and
+    loads, in program order: it is only safe under total store order (TSO),
+    as on x86-64. On weakly ordered processors, such as ARM and POWER, a
+    consumer could observe the new head before the data it publishes, so
+    the constructor raises RuntimeError there; use a PipeBuffer instead.
+
+    Attributes:
+        path (str): path of the mapped file.
+        capacity (int): number of data bytes in the ring.
+        data_bell (int): file descriptor of the data doorbell.
+        space_bell (int): file descriptor of the space doorbell.
+    """
+
+    def __init__(self, path: str, capacity: int = DEFAULT_CAPACITY):
+        """
+        Constructor for RingBuffer class.
+
+        Creates the backing file if it does not exist, otherwise attaches to
+        the existing one.
+
+        Args:
+            path (str): path of the backing file.
+            capacity (int): number of data bytes in the ring (default 8 MiB).
+
+        Raises:
+            RuntimeError: the processor does not have total store order.
+        """
+
+        if not total_store_order():
+            raise RuntimeError(f"ring buffers need total store order, which "
+                               f"{platform.machine()} processors do not "
+                               f"guarantee")
+        self.path = path
+        self.capacity = capacity
+        size = DATA_OFFSET + capacity
+
+        try:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o600)
+            os.ftruncate(fd, size)
+        except FileExistsError:
+            fd = os.open(path, os.O_RDWR)
+            # Wait for the creator to finish sizing the file
+            while os.fstat(fd).st_size < size:
+                sleep(0)
+        try:
+            self._map = mmap(fd, size)
+        finally:
+            os.close(fd)
+        self._view = memoryview(self._map)
+
+        self._head = _CURSOR.unpack_from(self._map, HEAD_OFFSET)[0]
+        self._tail = _CURSOR.unpack_from(self._map, TAIL_OFFSET)[0]
+
+        self.data_bell = _open_doorbell(path + '.data')
+        self.space_bell = _open_doorbell(path + '.space')
+
+    def writable(self) -> int:
+        """Returns the number of bytes that can be written without waiting."""
+
+        tail = _CURSOR.unpack_from(self._map, TAIL_OFFSET)[0]
+        return self.capacity - (self._head - tail)
+
+    def readable(self) -> int:
+        """Returns the number of bytes that can be read without waiting."""
+
+        head = _CURSOR.unpack_from(self._map, HEAD_OFFSET)[0]
+        return head - self._tail
+
+    def write_some(self, data: memoryview) -> int:
+        """
+        Method to copy as much of `data` into the ring as currently fits.
+
+        Args:
+            data (memoryview): bytes to be written.
+
+        Returns:
+            int: number of bytes written.
+        """
+
+        n = min(len(data), self.writable())
+        if n == 0:
+            return 0
+        pos = self._head % self.capacity
+        first = min(n, self.capacity - pos)
+        start = DATA_OFFSET + pos
+        self._view[start:start + first] = data[:first]
+        if n > first:
+            self._view[DATA_OFFSET:DATA_OFFSET + n - first] = data[first:n]
+        # Publish the data to the consumer. The head must become visible
+        # after the data, which only total store order guarantees.
+        self._head += n
+        _CURSOR.pack_into(self._map, HEAD_OFFSET, self._head)
+        if _FLAG.unpack_from(self._map, READER_WAITING_OFFSET)[0]:
+            _ring_doorbell(self.data_bell)
+        return n
+
+    def read_some(self, out: memoryview) -> int:
+        """
+        Method to copy as many bytes as are available into `out`.
+
+        Args:
+            out (memoryview): buffer receiving the bytes.
+
+        Returns:
+            int: number of bytes read.
+        """
+
+        n = min(len(out), self.readable())
+        if n == 0:
+            return 0
+        pos = self._tail % self.capacity
+        first = min(n, self.capacity - pos)
+        start = DATA_OFFSET + pos
+        out[:first] = self._view[start:start + first]
+        if n > first:
+            out[first:n] = self._view[DATA_OFFSET:DATA_OFFSET + n - first]
+        # Release the space back to the producer
+        self._tail += n
+        _CURSOR.pack_into(self._map, TAIL_OFFSET, self._tail)
+        if _FLAG.unpack_from(self._map, WRITER_WAITING_OFFSET)[0]:
+            _ring_doorbell(self.space_bell)
+        return n
+
+    def set_reader_waiting(self, waiting: bool) -> None:
+        """Method to flag that the consumer is (not) sleeping on data_bell."""
+
+        _FLAG.pack_into(self._map, READER_WAITING_OFFSET, waiting)
+
+    def set_writer_waiting(self, waiting: bool) -> None:
+        """Method to flag that the producer is (not) sleeping on space_bell."""
+
+        _FLAG.pack_into(self._map, WRITER_WAITING_OFFSET, waiting)
+
+    def close(self, unlink: bool = False) -> None:
+        """
+        Method to unmap the ring buffer.
+
+        Args:
+            unlink (bool): also remove the backing file (default False).
+        """
+
+        self._view.release()
+        self._map.close()
+        os.close(self.data_bell)
+        os.close(self.space_bell)
+        if unlink:
+            for path in (self.path, self.path + '.data',
+                         self.path + '.space'):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+
+
+class PipeBuffer:
+    """
+    Class of single-producer/single-consumer channel through a named pipe.
+
+    It has the interface of RingBuffer and replaces it on processors
+    without total store order. Data is copied through the kernel, which
+    orders it, at the cost of a system call per write and per read. The
+    pipe holds `capacity` bytes where its size can be set, and the system
+    default otherwise, as when `capacity` exceeds the system limit.
+
+    The producer rings the data doorbell after every write and the consumer
+    the space doorbell after every read, so unlike in a RingBuffer no
+    waiting flags are shared, and no wake-up is ever missed.
+
+    Attributes:
+        path (str): path of the named pipe.
+        capacity (int): number of data bytes the pipe holds.
+        data_bell (int): file descriptor of the data doorbell.
+        space_bell (int): file descriptor of the space doorbell.
+    """
+
+    def __init__(self, path: str, capacity: int = DEFAULT_CAPACITY):
+        """
+        Constructor for PipeBuffer class.
+
+        Creates the named pipe if it does not exist, otherwise opens the
+        existing one.
+
+        Args:
+            path (str): path of the named pipe.
+            capacity (int): number of data bytes in the pipe (default
+                8 MiB).
+        """
+
+        self.path = path
+        self._fd = _open_doorbell(path)
+        if hasattr(fcntl, 'F_SETPIPE_SZ'):
+            try:
+                fcntl.fcntl(self._fd, fcntl.F_SETPIPE_SZ, capacity)
+            except OSError:
+                pass   # Above the system limit: keep the default size
+            capacity = fcntl.fcntl(self._fd, fcntl.F_GETPIPE_SZ)
+        self.capacity = capacity
+        self._space = poll()
+        self._space.register(self._fd, POLLOUT)
+
+        self.data_bell = _open_doorbell(path + '.data')
+        self.space_bell = _open_doorbell(path + '.space')
+
+    def writable(self) -> int:
+        """Returns the number of bytes that can be written without waiting."""
+
+        if not self._space.poll(0):
+            return 0
+        return max(self.capacity - self.readable(), 1)
+
+    def readable(self) -> int:
+        """Returns the number of bytes that can be read without waiting."""
+
+        pending = fcntl.ioctl(self._fd, termios.FIONREAD, bytes(_PENDING.size))
+        return _PENDING.unpack(pending)[0]
+
+    def write_some(self, data: memoryview) -> int:
+        """
+        Method to write as much of `data` into the pipe as currently fits.
+
+        Args:
+            data (memoryview): bytes to be written.
+
+        Returns:
+            int: number of bytes written.
+        """
+
+        try:
+            n = os.write(self._fd, data)
+        except BlockingIOError:
+            return 0
+        _ring_doorbell(self.data_bell)
+        return n
+
+    def read_some(self, out: memoryview) -> int:
+        """
+        Method to read as many bytes as are available into `out`.
+
+        Args:
+            out (memoryview): buffer receiving the bytes.
+
+        Returns:
+            int: number of bytes read.
+        """
+
+        try:
+            n = os.readv(self._fd, [out])
+        except BlockingIOError:
+            return 0
+        _ring_doorbell(self.space_bell)
+        return n
+
+    def set_reader_waiting(self, waiting: bool) -> None:
+        """Method kept for RingBuffer compatibility (doorbells always ring)."""
+
+        pass
+
+    def set_writer_waiting(self, waiting: bool) -> None:
+        """Method kept for RingBuffer compatibility (doorbells always ring)."""
+
+        pass
+
+    def close(self, unlink: bool = False) -> None:
+        """
+        Method to close the pipe.
+
+        Args:
+            unlink (bool): also remove the named pipe (default False).
+        """
+
+        for fd in (self._fd, self.data_bell, self.space_bell):
+            os.close(fd)
+        if unlink:
+            for path in (self.path, self.path + '.data',
+                         self.path + '.space'):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+
+
+class _Outgoing:
+    """Length-prefixed frame being written to a ring buffer."""
+
+    def __init__(self, ring, payload: bytes):
+        self.ring = ring
+        self.parts = [memoryview(_FRAME_HEADER.pack(len(payload)))]
+        # An empty body would never count as written, so it is left out
+        if len(payload):
+            self.parts.append(memoryview(payload).cast('B'))
+
+    def pump(self) -> bool:
+        """Writes what fits; returns True if any progress was made."""
+
+        progress = False
+        while self.parts:
+            n = self.ring.write_some(self.parts[0])
+            if n == 0:
+                break
+            progress = True
+            if n == len(self.parts[0]):
+                self.parts.pop(0)
+            else:
+                self.parts[0] = self.parts[0][n:]
+        return progress
+
+    def done(self) -> bool:
+        return not self.parts
+
+    def set_waiting(self, waiting: bool) -> None:
+        self.ring.set_writer_waiting(waiting)
+
+    def ready(self) -> bool:
+        return self.ring.writable() > 0
+
+    def doorbell(self) -> int:
+        return self.ring.space_bell
+
+
+class _Incoming:
+    """Length-prefixed frame being read from a ring buffer."""
+
+    def __init__(self, ring):
+        self.ring = ring
+        self.header = bytearray(_FRAME_HEADER.size)
+        self.body = None
+        self.offset = 0
+
+    def pump(self) -> bool:
+        """Reads what is available; returns True if any progress was made."""
+
+        progress = False
+        while not self.done():
+            if self.body is None:
+                target = memoryview(self.header)
+            else:
+                target = memoryview(self.body)
+            n = self.ring.read_some(target[self.offset:])
+            if n == 0:
+                break
+            progress = True
+            self.offset += n
+            if self.body is None and self.offset == len(self.header):
+                self.body = bytearray(_FRAME_HEADER.unpack(self.header)[0])
+                self.offset = 0
+        return progress
+
+    def done(self) -> bool:
+        return self.body is not None and self.offset == len(self.body)
+
+    def set_waiting(self, waiting: bool) -> None:
+        self.ring.set_reader_waiting(waiting)
+
+    def ready(self) -> bool:
+        return self.ring.readable() > 0
+
+    def doorbell(self) -> int:
+        return self.ring.data_bell
+
+
+class SharedMemoryTransport(Transport):
+    """
+    Transport that exchanges data through shared-memory ring buffers.
+
+    Every ordered pair of timelines is connected by a RingBuffer backed by
+    the file `<directory>/<session>-<src>-<dst>`. All timelines using the same
+    session name are connected, whether they run in sub-interpreters of one
+    process or in separate processes. Files left by an earlier run of the
+    same session are attached as they are, so sessions should be named by
+    `new_session` or removed by `remove_session` before they are reused.
+
+    The ring buffers of a session take N(N-1) times their capacity in
+    `directory`, all of it once they have wrapped around. On /dev/shm this
+    is memory, and a process writing to a ring whose pages cannot be
+    allocated is killed by SIGBUS. The default capacity, given by
+    `default_capacity`, is 8 MiB per ring up to 8 timelines and shrinks
+    beyond to keep the session within DEFAULT_BUDGET (512 MiB), down to
+    MIN_CAPACITY (64 KiB), where sessions of 91 timelines or more exceed
+    the budget. Payloads larger than a ring are streamed through it.
+
+    On processors without total store order, where a RingBuffer is unsafe,
+    every ordered pair is connected by a PipeBuffer named like the ring
+    buffer file instead, which takes no space in `directory`.
+
+    When no channel can make progress, the transport retries up to `spin`
+    times, yielding the processor in between, and then sleeps on the
+    doorbells of all unfinished channels until one of them is rung.
+
+    Attributes:
+        session (str): name shared by all timelines of a simulation.
+        capacity (int): data bytes per ring buffer.
+        directory (str): directory holding the ring buffer files.
+        spin (int): attempts before sleeping on a doorbell.
+        pipes (bool): whether PipeBuffers replace the ring buffers.
+        send_rings (Dict[int, RingBuffer]): outgoing ring buffer per peer.
+        recv_rings (Dict[int, RingBuffer]): incoming ring buffer per peer.
+        blocks (int): number of times the transport slept on a doorbell.
+        outbox (Dict[int, List]): frames posted to each peer and not yet
+            fully written.
+    """
+
+    def __init__(self, rank: int, size: int, session: str,
+                 capacity: Optional[int] = None,
+                 directory: Optional[str] = None, spin: int = DEFAULT_SPIN,
+                 pipes: Optional[bool] = None):
+        """
+        Constructor for SharedMemoryTransport class.
+
+        Args:
+            rank (int): index of the timeline that owns this transport.
+            size (int): total number of timelines connected by the transport.
+            session (str): name shared by all timelines of a simulation.
+            capacity (int): data bytes per ring buffer (default
+                `default_capacity(size)`).
+            directory (str): directory for the ring buffer files (default
+                /dev/shm if available, else the temporary directory).
+            spin (int): attempts before sleeping on a doorbell (default 200).
+                Use 0 to sleep as soon as no progress can be made.
+            pipes (bool): connect timelines with PipeBuffers instead of
+                ring buffers (default only without total store order).
+        """
+
+        super(SharedMemoryTransport, self).__init__(rank, size)
+        self.session = session
+        self.capacity = default_capacity(size) if capacity is None \
+            else capacity
+        self.spin = spin
+        self.pipes = not total_store_order() if pipes is None else pipes
+        channel = PipeBuffer if self.pipes else RingBuffer
+        self.blocks = 0
+        self.directory = default_directory() if directory is None \
+            else directory
+        self.send_rings: Dict[int, RingBuffer] = {}
+        self.recv_rings: Dict[int, RingBuffer] = {}
+        for peer in range(size):
+            if peer == rank:
+                continue
+            self.send_rings[peer] = channel(self._path(rank, peer),
+                                            self.capacity)
+            self.recv_rings[peer] = channel(self._path(peer, rank),
+                                            self.capacity)
+        self.outbox: Dict[int, List[_Outgoing]] = {
+            peer: [] for peer in self.send_rings}
+        # Frames partially read by `try_recv`, completed by later reads
+        self._partial: Dict[int, _Incoming] = {}
+
+    def _incoming(self, peer: int) -> "_Incoming":
+        """Returns the partially read frame from peer, or a new one."""
+
+        incoming = self._partial.pop(peer, None)
+        if incoming is None:
+            incoming = _Incoming(self.recv_rings[peer])
+        return incoming
+
+    def _path(self, src: int, dst: int) -> str:
+        return os.path.join(self.directory, f"{self.session}-{src}-{dst}")
+
+    def _complete(self, channels: List) -> None:
+        """
+        Method to drive channels until all of them are done.
+
+        Args:
+            channels (List): outgoing and incoming channels.
+        """
+
+        pending = [channel for channel in channels if not channel.done()]
+        idle = 0
+        while pending:
+            progress = False
+            for channel in pending:
+                progress |= channel.pump()
+            pending = [channel for channel in pending if not channel.done()]
+
+            if progress:
+                if idle:
+                    self.wait_time += perf_counter() - idle_start
+                    idle = 0
+                continue
+            if not idle:
+                idle_start = perf_counter()
+            idle += 1
+            if idle <= self.spin:
+                sleep(0)
+            else:
+                self._block(pending)
+        if idle:
+            self.wait_time += perf_counter() - idle_start
+
+    def _block(self, pending: List) -> None:
+        """
+        Method to sleep until one of the pending channels is signalled.
+
+        The waiting flags are raised before re-checking the rings, so a peer
+        that makes progress after the check sees the flag and rings the
+        doorbell. The sleep is bounded in case the two races anyway. The
+        doorbells are polled rather than selected, since a process running
+        many timelines opens descriptors beyond the range of `select`.
+
+        Args:
+            pending (List): channels that cannot currently make progress.
+        """
+
+        for channel in pending:
+            channel.set_waiting(True)
+        try:
+            if not any(channel.ready() for channel in pending):
+                self.blocks += 1
+                bells = [channel.doorbell() for channel in pending]
+                poller = poll()
+                for bell in bells:
+                    poller.register(bell, POLLIN)
+                poller.poll(MAX_BLOCK_SECONDS * 1000)
+                for bell in bells:
+                    _drain_doorbell(bell)
+        finally:
+            for channel in pending:
+                channel.set_waiting(False)
+
+    def send(self, peer: int, payload: bytes) -> None:
+        """
+        Method to send a payload to another timeline.
+
+        Args:
+            peer (int): rank of the receiving timeline.
+            payload (bytes): data to be sent.
+        """
+
+        self._complete([_Outgoing(self.send_rings[peer], payload)])
+
+    def recv(self, peer: int) -> Optional[bytes]:
+        """
+        Method to receive a payload from another timeline.
+
+        Args:
+            peer (int): rank of the sending timeline.
+
+        Returns:
+            bytes: data received from `peer`.
+        """
+
+        incoming = self._incoming(peer)
+        self._complete([incoming])
+        return incoming.body
+
+    def exchange(self, payloads: Dict[int, bytes]) -> Dict[int, bytes]:
+        """
+        Method to send one payload to each peer and receive one from each.
+
+        Sends and receives are interleaved, so payloads larger than the ring
+        capacity cannot deadlock two timelines that are sending to each other.
+
+        Args:
+            payloads (Dict[int, bytes]): mapping of peer rank to payload.
+
+        Returns:
+            Dict[int, bytes]: mapping of peer rank to received payload.
+        """
+
+        outgoing = [_Outgoing(self.send_rings[peer], payload)
+                    for peer, payload in payloads.items()]
+        incoming = {peer: self._incoming(peer) for peer in payloads}
+        self._complete(outgoing + list(incoming.values()))
+        return {peer: channel.body for peer, channel in incoming.items()}
+
+    async def exchange_async(self, payloads: Dict[int, bytes]) \
+            -> Dict[int, bytes]:
+        """
+        Coroutine to send one payload to each peer and receive one from each.
+
+        Like `exchange`, but when no channel can make progress, the event
+        loop waits on the doorbells of the unfinished channels instead of
+        the transport spinning or sleeping.
+
+        Args:
+            payloads (Dict[int, bytes]): mapping of peer rank to payload.
+
+        Returns:
+            Dict[int, bytes]: mapping of peer rank to received payload.
+        """
+
+        outgoing = [_Outgoing(self.send_rings[peer], payload)
+                    for peer, payload in payloads.items()]
+        incoming = {peer: self._incoming(peer) for peer in payloads}
+        pending = [channel for channel in outgoing + list(incoming.values())
+                   if not channel.done()]
+        while pending:
+            progress = False
+            for channel in pending:
+                progress |= channel.pump()
+            pending = [channel for channel in pending if not channel.done()]
+            if pending and not progress:
+                await self._block_async(pending)
+        return {peer: channel.body for peer, channel in incoming.items()}
+
+    async def _block_async(self, pending: List) -> None:
+        """
+        Coroutine to wait in the event loop until one of the pending
+        channels is signalled, with the same protocol as `_block`.
+
+        Args:
+            pending (List): channels that cannot currently make progress.
+        """
+
+        for channel in pending:
+            channel.set_waiting(True)
+        try:
+            if any(channel.ready() for channel in pending):
+                return
+            self.blocks += 1
+            loop = asyncio.get_running_loop()
+            rung = loop.create_future()
+
+            def ring():
+                if not rung.done():
+                    rung.set_result(None)
+
+            bells = [channel.doorbell() for channel in pending]
+            for bell in bells:
+                loop.add_reader(bell, ring)
+            tick = perf_counter()
+            try:
+                await asyncio.wait([rung], timeout=MAX_BLOCK_SECONDS)
+            finally:
+                self.wait_time += perf_counter() - tick
+                for bell in bells:
+                    loop.remove_reader(bell)
+                    _drain_doorbell(bell)
+        finally:
+            for channel in pending:
+                channel.set_waiting(False)
+
+    def _pump_outbox(self) -> None:
+        """Method to write as much of the posted frames as fits."""
+
+        for queue in self.outbox.values():
+            while queue:
+                queue[0].pump()
+                if not queue[0].done():
+                    break
+                queue.pop(0)
+
+    def post(self, peer: int, payload: bytes) -> None:
+        """
+        Method to send a payload without waiting for it to be delivered.
+
+        What does not fit in the ring buffer is written by later calls to
+        `post`, `try_recv`, `wait_any` or `flush`.
+
+        Args:
+            peer (int): rank of the receiving timeline.
+            payload (bytes): data to be sent.
+        """
+
+        self.outbox[peer].append(_Outgoing(self.send_rings[peer], payload))
+        self._pump_outbox()
+
+    def flush(self) -> None:
+        """Method to wait until every posted payload has been sent."""
+
+        while True:
+            self._pump_outbox()
+            heads = [queue[0] for queue in self.outbox.values() if queue]
+            if not heads:
+                return
+            self._complete(heads)
+
+    def try_recv(self, peer: int) -> Optional[bytes]:
+        """
+        Method to receive a payload from another timeline if one is ready.
+
+        Args:
+            peer (int): rank of the sending timeline.
+
+        Returns:
+            bytes: data received from `peer`, or None if no complete payload
+                has arrived yet.
+        """
+
+        self._pump_outbox()
+        incoming = self._incoming(peer)
+        incoming.pump()
+        if incoming.done():
+            return incoming.body
+        self._partial[peer] = incoming
+        return None
+
+    def wait_any(self, peers: List[int]) -> None:
+        """
+        Method to sleep until data arrives from any of `peers`, or until
+        room frees up for a posted frame.
+
+        Args:
+            peers (List[int]): ranks of the timelines to wait for.
+        """
+
+        self._pump_outbox()
+        channels = [self._partial.get(peer)
+                    or _Incoming(self.recv_rings[peer]) for peer in peers]
+        channels += [queue[0] for queue in self.outbox.values() if queue]
+        if not channels:
+            return
+        tick = perf_counter()
+        self._block(channels)
+        self.wait_time += perf_counter() - tick
+
+    def close(self) -> None:
+        """
+        Method to unmap all ring buffers.
+
+        Incoming ring buffer files are removed, so every file is removed
+        once by its reader.
+        """
+
+        for ring in self.send_rings.values():
+            ring.close()
+        for ring in self.recv_rings.values():
+            ring.close(unlink=True)
@@ -0,0 +1,655 @@
+"""
+Definition of the SocketTransport class.
+
+This module defines a transport that connects timelines in separate
+processes, on one host or on several, with one persistent stream socket per
+pair of timelines, over TCP or Unix domain sockets. Payloads are sent as
+length-prefixed frames, and the frames queued for a peer are written
+together in as few system calls as possible. Timelines find each other
+through a rendezvous with timeline 0, which listens on an address known to
+all of them.
+
+Trust model: payloads are pickled, and unpickling data from a peer can run
+arbitrary code, so every peer is trusted as much as the process itself.
+Before anything is unpickled, both ends of every connection prove that they
+hold a shared secret (the authkey) with an HMAC challenge-response, so only
+processes given the secret can join. TCP transports require an authkey;
+Unix domain sockets are only accessible to their owner and may go without.
+Addresses without a host listen on the loopback interface. The handshake
+authenticates peers but does not encrypt traffic: on untrusted networks,
+tunnel the connections, e.g. over SSH.
+"""
+
+from collections import deque
+from selectors import DefaultSelector, EVENT_READ, EVENT_WRITE
+from struct import Struct
+from time import monotonic, perf_counter, sleep
+from typing import Deque, Dict, List, Optional, Tuple
+import asyncio
+import hmac
+import os
+import pickle
+import secrets
+import socket
+
+from .transport import Transport
+
+_FRAME_HEADER = Struct('<Q')
+
+# Prefix of Unix domain socket addresses; others are "host:port"
+UNIX_PREFIX = "unix:"
+# Bytes read from a socket in one call
+RECV_BYTES = 1 << 20
+# Buffers written in one call, below the IOV_MAX of common platforms
+MAX_BUFFERS = 512
+# Seconds to wait for the other timelines when connecting and closing
+DEFAULT_TIMEOUT = 60.0
+# Upper bound of a single wait, so callers can check for other work
+MAX_WAIT_SECONDS = 0.1
+# Delay between attempts to reach timeline 0 before it listens, in seconds
+RETRY_SECONDS = 0.05
+# Host of TCP addresses that give none
+LOOPBACK_HOST = "127.0.0.1"
+# Environment variable holding the authkey when none is given
+AUTHKEY_VARIABLE = "THREAD_TIMELINE_AUTHKEY"
+# Bytes of the random challenge of the authentication handshake
+CHALLENGE_BYTES = 32
+# Hash of the HMAC answering a challenge
+DIGEST = 'sha256'
+_WELCOME = b'\x01'
+_FAILURE = b'\x00'
+
+
+def parse_address(address: str) -> Tuple[int, object]:
+    """
+    Function to parse a socket address.
+
+    Args:
+        address (str): "unix:<path>" for a Unix domain socket, or
+            "<host>:<port>" for TCP, with IPv6 hosts in brackets; ":<port>"
+            is a port of the loopback interface.
+
+    Returns:
+        Tuple[int, object]: address family and socket address.
+    """
+
+    if address.startswith(UNIX_PREFIX):
+        return socket.AF_UNIX, address[len(UNIX_PREFIX):]
+    host, separator, port = address.rpartition(':')
+    if not separator or not port.isdigit():
+        raise ValueError(f"Invalid socket address {address}")
+    host = host.strip('[]') or LOOPBACK_HOST
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    return family, (host, int(port))
+
+
+def _format_address(family: int, sockaddr) -> str:
+    if family == socket.AF_UNIX:
+        return UNIX_PREFIX + sockaddr
+    host, port = sockaddr[:2]
+    return f"[{host}]:{port}" if ':' in host else f"{host}:{port}"
+
+
+def _send_message(sock: socket.socket, message) -> None:
+    """Function to send a pickled frame on a blocking socket."""
+
+    payload = pickle.dumps(message)
+    sock.sendall(_FRAME_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("peer closed the connection during setup")
+        data += chunk
+    return bytes(data)
+
+
+def _recv_message(sock: socket.socket):
+    """Function to receive a pickled frame from a blocking socket."""
+
+    size, = _FRAME_HEADER.unpack(_recv_exactly(sock, _FRAME_HEADER.size))
+    return pickle.loads(_recv_exactly(sock, size))
+
+
+def _challenge(sock: socket.socket, authkey: bytes, role: bytes) -> None:
+    """Function to check that the peer answers a challenge as `role`."""
+
+    challenge = secrets.token_bytes(CHALLENGE_BYTES)
+    sock.sendall(challenge)
+    expected = hmac.new(authkey, role + challenge, DIGEST).digest()
+    answer = _recv_exactly(sock, len(expected))
+    if not hmac.compare_digest(answer, expected):
+        sock.sendall(_FAILURE)
+        raise ConnectionError("peer failed to authenticate")
+    sock.sendall(_WELCOME)
+
+
+def _answer(sock: socket.socket, authkey: bytes, role: bytes) -> None:
+    """Function to answer a challenge of the peer as `role`."""
+
+    challenge = _recv_exactly(sock, CHALLENGE_BYTES)
+    sock.sendall(hmac.new(authkey, role + challenge, DIGEST).digest())
+    if _recv_exactly(sock, len(_WELCOME)) != _WELCOME:
+        raise ConnectionError("peer rejected the authkey")
+
+
+def _authenticate(sock: socket.socket, authkey: bytes,
+                  accepting: bool) -> None:
+    """
+    Function to authenticate both ends of a new connection.
+
+    Each end challenges the other with random bytes and checks the HMAC of
+    the answer. Answers are keyed by the role of the answering end, so an
+    answer obtained from one end cannot be replayed to the other.
+
+    Args:
+        sock (socket): blocking socket of the connection.
+        authkey (bytes): secret shared by all timelines.
+        accepting (bool): whether this end accepted the connection.
+    """
+
+    if accepting:
+        _challenge(sock, authkey, b'connect')
+        _answer(sock, authkey, b'accept')
+    else:
+        _answer(sock, authkey, b'connect')
+        _challenge(sock, authkey, b'accept')
+
+
+class _Connection:
+    """Persistent connection to one peer, with its unsent and unread data."""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.outgoing: List[memoryview] = []
+        self.incoming = bytearray()
+        self.frames: Deque[bytes] = deque()
+        self.closed = False
+
+    def queue(self, payload: bytes) -> None:
+        self.outgoing.append(memoryview(_FRAME_HEADER.pack(len(payload))))
+        self.outgoing.append(memoryview(payload).cast('B'))
+
+    def write(self) -> bool:
+        """Writes what the socket accepts; returns True on progress."""
+
+        progress = False
+        while self.outgoing:
+            try:
+                n = self.sock.sendmsg(self.outgoing[:MAX_BUFFERS])
+            except BlockingIOError:
+                break
+            except (BrokenPipeError, ConnectionResetError):
+                # The peer is gone; reading will find the end of stream
+                self.outgoing.clear()
+                return True
+            progress = True
+            while n:
+                head = self.outgoing[0]
+                if n < len(head):
+                    self.outgoing[0] = head[n:]
+                    break
+                n -= len(head)
+                self.outgoing.pop(0)
+        return progress
+
+    def read(self) -> bool:
+        """Reads what has arrived; returns True on progress."""
+
+        progress = False
+        while not self.closed:
+            try:
+                data = self.sock.recv(RECV_BYTES)
+            except BlockingIOError:
+                break
+            except ConnectionResetError:
+                data = b''
+            progress = True
+            if not data:
+                self.closed = True
+                break
+            self.incoming += data
+        # Split complete frames off the received bytes
+        buffer = self.incoming
+        offset = 0
+        while len(buffer) - offset >= _FRAME_HEADER.size:
+            size, = _FRAME_HEADER.unpack_from(buffer, offset)
+            end = offset + _FRAME_HEADER.size + size
+            if len(buffer) < end:
+                break
+            self.frames.append(bytes(buffer[offset + _FRAME_HEADER.size:end]))
+            offset = end
+        del buffer[:offset]
+        return progress
+
+
+class SocketTransport(Transport):
+    """
+    Transport that exchanges data over stream sockets.
+
+    Every pair of timelines is connected by one persistent socket, over TCP
+    (with TCP_NODELAY) or Unix domain sockets, through which payloads are
+    sent as length-prefixed frames. Timelines may run in separate processes
+    or on separate hosts.
+
+    On creation, the transports of all timelines rendezvous: timeline 0
+    listens on `address` and every other timeline connects to it with the
+    address of its own listening socket. Once all have arrived, timeline 0
+    sends every timeline the address table, and each timeline connects to
+    the timelines of lower rank and accepts connections from those of
+    higher rank. For Unix domain sockets, timeline r listens on the path of
+    `address` with suffix ".r"; for TCP, on an ephemeral port of the local
+    address it used to reach timeline 0.
+
+    Every connection is authenticated with `authkey` before its first frame
+    is unpickled. Connections to a listening socket that fail to
+    authenticate are closed and ignored, while a failure to authenticate to
+    a listening socket raises ConnectionError.
+
+    All sockets are non-blocking and driven by one selector, so sends and
+    receives to all peers progress together and large payloads cannot
+    deadlock two timelines that send to each other. A payload of None is
+    returned by `recv` once the peer has closed its connection.
+
+    Attributes:
+        address (str): rendezvous address of timeline 0.
+        timeout (float): seconds to wait for other timelines when
+            connecting and closing.
+        authkey (bytes): secret shared by all timelines.
+        connections (Dict[int, _Connection]): connection to every peer.
+        selector (DefaultSelector): selector of all connections.
+    """
+
+    def __init__(self, rank: int, size: int, address: str,
+                 timeout: float = DEFAULT_TIMEOUT,
+                 authkey: Optional[bytes] = None) -> None:
+        """
+        Constructor for SocketTransport class.
+
+        Blocks until the transports of all timelines are connected.
+
+        Args:
+            rank (int): index of the timeline that owns this transport.
+            size (int): total number of timelines connected by the transport.
+            address (str): rendezvous address, "unix:<path>" or
+                "<host>:<port>"; timeline 0 listens on it.
+            timeout (float): seconds to wait for other timelines when
+                connecting and closing (default 60).
+            authkey (bytes): secret shared by all timelines (default the
+                THREAD_TIMELINE_AUTHKEY environment variable); required for
+                TCP.
+        """
+
+        super(SocketTransport, self).__init__(rank, size)
+        family, _ = parse_address(address)
+        if authkey is None and os.environ.get(AUTHKEY_VARIABLE):
+            authkey = os.environ[AUTHKEY_VARIABLE].encode()
+        if authkey is None:
+            if family != socket.AF_UNIX:
+                raise ValueError(f"TCP address {address} needs an authkey; "
+                                 f"pass one or set {AUTHKEY_VARIABLE}")
+            authkey = b''
+        self.address = address
+        self.timeout = timeout
+        self.authkey = authkey
+        self.connections: Dict[int, _Connection] = {}
+        self.selector = DefaultSelector()
+
+        if rank == 0:
+            sockets = self._rendezvous_root()
+        else:
+            sockets = self._rendezvous()
+        for peer, sock in sockets.items():
+            if family != socket.AF_UNIX:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setblocking(False)
+            self.connections[peer] = _Connection(sock)
+            self.selector.register(sock, EVENT_READ, peer)
+        self._writing = set()
+
+    def _listen(self, family: int, sockaddr) -> socket.socket:
+        listener = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_UNIX:
+            try:
+                os.unlink(sockaddr)   # Left over by an earlier run
+            except FileNotFoundError:
+                pass
+        else:
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind(sockaddr)
+        if family == socket.AF_UNIX:
+            # Before listening, so no other user can ever connect
+            os.chmod(sockaddr, 0o600)
+        listener.listen(self.size)
+        listener.settimeout(self.timeout)
+        return listener
+
+    def _accept(self, listener: socket.socket,
+                count: int) -> Dict[int, Tuple[socket.socket, object]]:
+        """
+        Method to accept `count` timelines, keyed by their hello.
+
+        Connections that fail to authenticate are closed and not counted.
+        """
+
+        accepted = {}
+        try:
+            while len(accepted) < count:
+                sock, _ = listener.accept()
+                sock.settimeout(self.timeout)
+                try:
+                    _authenticate(sock, self.authkey, accepting=True)
+                except OSError:
+                    sock.close()
+                    continue
+                rank, *hello = _recv_message(sock)
+                accepted[rank] = (sock, hello)
+        finally:
+            if listener.family == socket.AF_UNIX:
+                os.unlink(listener.getsockname())
+            listener.close()
+        return accepted
+
+    def _connect(self, family: int, sockaddr) -> socket.socket:
+        """Method to connect, retrying until the listener is up."""
+
+        deadline = monotonic() + self.timeout
+        while True:
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(sockaddr)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                sock.close()
+                if monotonic() > deadline:
+                    raise
+                sleep(RETRY_SECONDS)
+        try:
+            _authenticate(sock, self.authkey, accepting=False)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _rendezvous_root(self) -> Dict[int, socket.socket]:
+        """Method to gather all timelines as timeline 0."""
+
+        listener = self._listen(*parse_address(self.address))
+        accepted = self._accept(listener, self.size - 1)
+        table = {rank: hello[0] for rank, (_, hello) in accepted.items()}
+        for sock, _ in accepted.values():
+            _send_message(sock, table)
+        return {rank: sock for rank, (sock, _) in accepted.items()}
+
+    def _rendezvous(self) -> Dict[int, socket.socket]:
+        """Method to join timeline 0 and connect to the other timelines."""
+
+        family, sockaddr = parse_address(self.address)
+        root = self._connect(family, sockaddr)
+        if family == socket.AF_UNIX:
+            own = f"{sockaddr}.{self.rank}"
+        else:
+            # Reachable by the others if it reaches timeline 0
+            own = (root.getsockname()[0], 0)
+        listener = self._listen(family, own)
+        _send_message(root, (self.rank,
+                             _format_address(family, listener.getsockname())))
+        table = _recv_message(root)
+
+        sockets = {0: root}
+        for peer in range(1, self.rank):
+            sock = self._connect(*parse_address(table[peer]))
+            _send_message(sock, (self.rank,))
+            sockets[peer] = sock
+        accepted = self._accept(listener, self.size - 1 - self.rank)
+        sockets.update({peer: sock for peer, (sock, _) in accepted.items()})
+        return sockets
+
+    def _watch_writes(self, peer: int, writing: bool) -> None:
+        if writing == (peer in self._writing):
+            return
+        sock = self.connections[peer].sock
+        if writing:
+            self._writing.add(peer)
+            self.selector.modify(sock, EVENT_READ | EVENT_WRITE, peer)
+        else:
+            self._writing.discard(peer)
+            self.selector.modify(sock, EVENT_READ, peer)
+
+    def _pump(self, timeout: float) -> bool:
+        """
+        Method to move data on every connection that is ready.
+
+        Args:
+            timeout (float): seconds to wait for a connection to become
+                ready if none is (0 to only poll).
+
+        Returns:
+            bool: whether any data was moved.
+        """
+
+        progress = False
+        for peer in list(self._writing):
+            connection = self.connections[peer]
+            progress |= connection.write()
+            self._watch_writes(peer, bool(connection.outgoing))
+        if progress:
+            timeout = 0
+        tick = perf_counter()
+        events = self.selector.select(timeout)
+        if timeout:
+            self.wait_time += perf_counter() - tick
+        for key, mask in events:
+            peer = key.data
+            connection = self.connections[peer]
+            if mask & EVENT_READ:
+                progress |= connection.read()
+                if connection.closed:
+                    self.selector.unregister(connection.sock)
+                    self._writing.discard(peer)
+                    connection.outgoing.clear()
+                    continue
+            if mask & EVENT_WRITE:
+                progress |= connection.write()
+                self._watch_writes(peer, bool(connection.outgoing))
+        return progress
+
+    def _queue(self, peer: int, payload: bytes) -> None:
+        connection = self.connections[peer]
+        if connection.closed:
+            return   # Nobody left to read it
+        connection.queue(payload)
+        connection.write()
+        self._watch_writes(peer, bool(connection.outgoing))
+
+    def _sent(self) -> bool:
+        return not self._writing
+
+    def _arrived(self, peer: int) -> bool:
+        connection = self.connections[peer]
+        return bool(connection.frames) or connection.closed
+
+    def _take(self, peer: int) -> Optional[bytes]:
+        frames = self.connections[peer].frames
+        return frames.popleft() if frames else None
+
+    def send(self, peer: int, payload: bytes) -> None:
+        """
+        Method to send a payload to another timeline.
+
+        Args:
+            peer (int): rank of the receiving timeline.
+            payload (bytes): data to be sent.
+        """
+
+        self._queue(peer, payload)
+        while peer in self._writing:
+            self._pump(MAX_WAIT_SECONDS)
+
+    def recv(self, peer: int) -> Optional[bytes]:
+        """
+        Method to receive a payload from another timeline.
+
+        Args:
+            peer (int): rank of the sending timeline.
+
+        Returns:
+            bytes: data received from `peer`, or None if `peer` has closed
+                its connection.
+        """
+
+        while not self._arrived(peer):
+            self._pump(MAX_WAIT_SECONDS)
+        return self._take(peer)
+
+    def exchange(self, payloads: Dict[int, bytes]) -> Dict[int, bytes]:
+        """
+        Method to send one payload to each peer and receive one from each.
+
+        All payloads are queued first, and sends and receives then progress
+        together on all connections.
+
+        Args:
+            payloads (Dict[int, bytes]): mapping of peer rank to payload.
+
+        Returns:
+            Dict[int, bytes]: mapping of peer rank to received payload.
+        """
+
+        for peer, payload in payloads.items():
+            self._queue(peer, payload)
+        while not (self._sent()
+                   and all(self._arrived(peer) for peer in payloads)):
+            self._pump(MAX_WAIT_SECONDS)
+        return {peer: self._take(peer) for peer in payloads}
+
+    async def exchange_async(self, payloads: Dict[int, bytes]) \
+            -> Dict[int, bytes]:
+        """
+        Coroutine to send one payload to each peer and receive one from each.
+
+        Like `exchange`, but when no connection is ready, the event loop
+        waits until one is instead of the transport's selector.
+
+        Args:
+            payloads (Dict[int, bytes]): mapping of peer rank to payload.
+
+        Returns:
+            Dict[int, bytes]: mapping of peer rank to received payload.
+        """
+
+        for peer, payload in payloads.items():
+            self._queue(peer, payload)
+        while not (self._sent()
+                   and all(self._arrived(peer) for peer in payloads)):
+            if not self._pump(0):
+                await self._wait_async()
+        return {peer: self._take(peer) for peer in payloads}
+
+    async def _wait_async(self) -> None:
+        """Coroutine to wait in the event loop until a connection is ready."""
+
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+
+        def wake():
+            if not ready.done():
+                ready.set_result(None)
+
+        readers = [connection.sock for connection in self.connections.values()
+                   if not connection.closed]
+        writers = [self.connections[peer].sock for peer in self._writing]
+        for sock in readers:
+            loop.add_reader(sock, wake)
+        for sock in writers:
+            loop.add_writer(sock, wake)
+        tick = perf_counter()
+        try:
+            await ready
+        finally:
+            self.wait_time += perf_counter() - tick
+            for sock in readers:
+                loop.remove_reader(sock)
+            for sock in writers:
+                loop.remove_writer(sock)
+
+    def post(self, peer: int, payload: bytes) -> None:
+        """
+        Method to send a payload without waiting for it to be delivered.
+
+        What the socket does not accept at once is written, together with
+        later posts to the same peer, by later calls to any method.
+
+        Args:
+            peer (int): rank of the receiving timeline.
+            payload (bytes): data to be sent.
+        """
+
+        self._queue(peer, payload)
+
+    def flush(self) -> None:
+        """Method to wait until every posted payload has been sent."""
+
+        while not self._sent():
+            self._pump(MAX_WAIT_SECONDS)
+
+    def try_recv(self, peer: int) -> Optional[bytes]:
+        """
+        Method to receive a payload from another timeline if one is ready.
+
+        Args:
+            peer (int): rank of the sending timeline.
+
+        Returns:
+            bytes: data received from `peer`, or None if no complete payload
+                has arrived yet.
+        """
+
+        if not self.connections[peer].frames:
+            self._pump(0)
+        return self._take(peer)
+
+    def wait_any(self, peers: List[int]) -> None:
+        """
+        Method to wait until data arrives from any of `peers`, or until a
+        posted payload can be written.
+
+        Args:
+            peers (List[int]): ranks of the timelines to wait for.
+        """
+
+        if any(self.connections[peer].frames for peer in peers):
+            return
+        self._pump(MAX_WAIT_SECONDS)
+
+    def close(self) -> None:
+        """
+        Method to close all connections.
+
+        Posted payloads are sent first. Every connection is then shut down
+        for writing and read until the peer closes it too, so that no peer
+        loses data by a reset of a connection with unread data.
+        """
+
+        deadline = monotonic() + self.timeout
+        try:
+            while not self._sent() and monotonic() < deadline:
+                self._pump(MAX_WAIT_SECONDS)
+            for connection in self.connections.values():
+                if not connection.closed:
+                    try:
+                        connection.sock.shutdown(socket.SHUT_WR)
+                    except OSError:
+                        pass
+            while monotonic() < deadline and not all(
+                    connection.closed
+                    for connection in self.connections.values()):
+                self._pump(MAX_WAIT_SECONDS)
+        finally:
+            for connection in self.connections.values():
+                connection.sock.close()
+            self.selector.close()
@@ -1,15 +1,30 @@
+from array import array
+from math import inf
 from time import time
+from typing import (TYPE_CHECKING, Dict, Generator, Iterable, List,
+                    Optional, Tuple)
 import pickle
 
 # SeQUeNCe imports
 from .timeline import Timeline
 from .event import Event
+from .process import Process
+from .ring_buffer import SharedMemoryTransport, process_session
+from .codec import (BatchCodec, ReferenceCodec, pack_scalars, scalars_size,
+                    unpack_scalars)
+from .profiler import WindowProfiler
+from .eventlist import HEAP_EVENT_LIST
+# Only needed to pick a default transport
+from ._compat import interpreters
 #from sequence.kernel.quantum_manager import KET_STATE_FORMALISM
 #from .quantum_manager_client import QuantumManagerClient
 
-# Interpreter imports
-from test.support import interpreters
-import os
+if TYPE_CHECKING:
+    from .transport import Transport
+
+# Synchronization protocols
+BARRIER_SYNC = "barrier"
+NULL_MESSAGE_SYNC = "null_message"
 
 
 class ThreadedTimeline(Timeline):
@@ -19,31 +34,57 @@ class ThreadedTimeline(Timeline):
     The Threaded Timeline class acts and behaves almost identically to the
     Parallel Timeline class except that it uses the developmental Interpreters
     module from version 3.12 of the Python/C API. There is one Threaded
-    Timeline per thread (2 max per process). For events executed on nodes
-    belonging to other timelines, an event buffer is maintained. These buffers
-    are exchanged between timelines at regular synchronization intervals. All
-    Threaded Timelines in a simulation communicate with a Quantum Manager
-    Server for shared quantum states.
+    Timeline per thread, and any number of threads per process. For events
+    executed on nodes belonging to other timelines, an event buffer is
+    maintained per peer. These buffers are exchanged between all timelines
+    at regular synchronization intervals, each timeline sending one payload
+    to and receiving one payload from every other timeline. All Threaded
+    Timelines in a simulation communicate with a Quantum Manager Server for
+    shared quantum states.
 
     Attributes:
         id (int): ID for the interpreter running the Threaded Timeline
             instance.
         foreign_entities (Dict[str, int]): mapping of object names on other
             threads to interpreter id.
+        peers (List[int]): ids of all other timelines in the simulation.
         event_buffer(List[List[Event]]): stores events for execution on
             foreign entities; swapped during synchronization.
         lookahead (int): defines width of time window for execution
             (simulation time between synchronization).
-        recv_file (str): Name of the file in which data is received from
-            another interpreter.
-        send_file (str): Name of the file through which data is sent to
-            another interpreter.
-        mutex (Lock): Mutex used to prevent race condition for send/recv
-            "queue" files.
+        transport (Transport): transport used to exchange event buffers
+            with other timelines.
+        codec (BatchCodec): codec used to serialize event buffers.
+        bytes_sent (int): total payload bytes sent to other timelines.
+        bytes_received (int): total payload bytes received from other
+            timelines.
+        decode_time (float): seconds spent deserializing received payloads
+            (time spent waiting for them is `transport.wait_time`).
+        profiler (WindowProfiler): per-window profiler, or None if
+            profiling is disabled.
+        adaptive (bool): whether windows are sized from the safe horizon of
+            the timeline instead of the fixed lookahead.
+        link_delays (Dict[int, int]): guaranteed minimum delay of events
+            sent to each peer (at least `lookahead`).
+        window_widths (array): simulation time covered by every window.
+        synchronization (str): BARRIER_SYNC or NULL_MESSAGE_SYNC.
+        null_messages (int): messages sent without events (null message
+            synchronization only).
+        rebalance_interval (int): windows between load balancing rounds, or
+            0 if entities never migrate.
+        rebalance_threshold (float): excess of the busiest timeline's
+            computing time over the mean that triggers a migration.
+        migrations (int): number of entities this timeline sent to peers.
     """
 
-    def __init__(self, recv_file, send_file, mutex, lookahead: int,
-                 stop_time=float('inf')):
+    def __init__(self, lookahead: int, stop_time=float('inf'),
+                 transport: "Transport" = None, codec=None,
+                 event_list=HEAP_EVENT_LIST, profile: bool = False,
+                 accounting: str = None, adaptive: bool = False,
+                 link_delays: Optional[Dict[int, int]] = None,
+                 synchronization: str = BARRIER_SYNC,
+                 rebalance_interval: int = 0,
+                 rebalance_threshold: float = 0.1):
         """
         Constructor for ThreadedTimeline class.
         
@@ -52,27 +93,69 @@ class ThreadedTimeline(Timeline):
         timeline class.
         
         Args:
-            recv_file (str): name of receiver "queue" file in memory.
-            send_file (str): name of sender "queue" file in memory.
-            mutex (Lock): mutex lock for send/recv "queue" files
             lookahead (int): sets the timeline lookahead time.
             stop_time (int): stop (simulation) time of simulation
                 (default inf).
+            transport (Transport): transport used to exchange event buffers
+                with other timelines (default SharedMemoryTransport shared
+                by all interpreters of the current process).
+            codec (BatchCodec): codec used to serialize event buffers; must
+                be of the same type on all timelines (default ReferenceCodec
+                if the transport shares objects, else BatchCodec).
+            event_list (str): event list implementation (default
+                HEAP_EVENT_LIST).
+            profile (bool): record statistics of every synchronization
+                window in `profiler` (default False).
+            accounting (str): cost accounting mode of `cost_profiler`,
+                FULL_ACCOUNTING, SAMPLED_ACCOUNTING or None to disable
+                (default None).
+            adaptive (bool): size every window from the safe horizon of the
+                timeline rather than `lookahead`; must be the same on all
+                timelines (default False).
+            link_delays (Dict[int, int]): guaranteed minimum delay of the
+                events this timeline sends to each peer; peers not listed,
+                and delays below `lookahead`, use `lookahead` (default
+                None).
+            synchronization (str): BARRIER_SYNC to exchange buffers with
+                all peers at every window, or NULL_MESSAGE_SYNC to advance
+                independently with Chandy-Misra-Bryant null messages; must
+                be the same on all timelines (default BARRIER_SYNC).
+            rebalance_interval (int): windows between load balancing
+                rounds, in which entities migrate from the busiest to the
+                least busy timeline; 0 disables migration. Must be the same
+                on all timelines (default 0).
+            rebalance_threshold (float): excess of the busiest timeline's
+                computing time over the mean that triggers a migration
+                (default 0.1).
         """
 
-        super(ThreadedTimeline, self).__init__(stop_time)
+        super(ThreadedTimeline, self).__init__(stop_time, event_list,
+                                               accounting)
+
+        # Sub-interpreters of one process share the same ring buffer files
+        if transport is None:
+            if interpreters is None:
+                raise RuntimeError("a transport must be given when the "
+                                   "interpreters module is unavailable")
+            transport = SharedMemoryTransport(
+                interpreters.get_current().id, len(interpreters.list_all()),
+                process_session())
 
         # Threaded timeline class constructor vars:
-        self.id = interpreters.get_current().id
+        self.id = transport.rank
         self.foreign_entities = {}
-        self.event_buffer = [[] for _ in range(len(interpreters.list_all()))]
+        self.peers = [i for i in range(transport.size) if i != self.id]
+        self.event_buffer = [[] for _ in range(transport.size)]
         self.lookahead = lookahead
         #if qm_ip is not None and qm_port is not None:
         #    self.quantum_manager = QuantumManagerClient(formalism, qm_ip, qm_port)
 
-        self.recv_file = recv_file
-        self.send_file = send_file
-        self.mutex = mutex
+        self.transport = transport
+        if codec is None:
+            codec = ReferenceCodec() if transport.shares_objects \
+                else BatchCodec()
+        self.codec = codec
+        self._negotiated = False
 
         #self.show_progress = False
 
@@ -85,7 +168,43 @@ class ThreadedTimeline(Timeline):
 
         self.read_ops = 0
         self.write_ops = 0
-
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.decode_time = 0
+
+        self.profiler = WindowProfiler(self.id, transport.size) \
+            if profile else None
+
+        if synchronization not in (BARRIER_SYNC, NULL_MESSAGE_SYNC):
+            raise ValueError(f"Invalid synchronization {synchronization}")
+        if synchronization == NULL_MESSAGE_SYNC and stop_time == inf:
+            # Null messages alone cannot detect that all timelines are idle
+            raise ValueError("null message synchronization requires a "
+                             "finite stop time")
+        self.synchronization = synchronization
+        self.null_messages = 0
+
+        if rebalance_interval and (synchronization != BARRIER_SYNC
+                                   or adaptive):
+            # Pending events only move safely when all windows end together
+            raise ValueError("rebalancing requires barrier synchronization "
+                             "with fixed windows")
+        self.rebalance_interval = rebalance_interval
+        self.rebalance_threshold = rebalance_threshold
+        self.migrations = 0
+        self._balanced_time = 0
+
+        self.adaptive = adaptive
+        self.link_delays = {peer: max(lookahead, (link_delays or {}).get(
+            peer, lookahead)) for peer in self.peers}
+        self.window_widths = array('d')
+        # Adaptive windows: link delays of all timelines, and the earliest
+        # local event and per-destination buffer minimum each one sent
+        self._trailer_size = scalars_size(transport.size + 1)
+        self._delays: List[Dict[int, int]] = []
+        self._tops = [inf] * transport.size
+        self._buffer_mins = [[inf] * transport.size
+                             for _ in range(transport.size)]
 
     def schedule(self, event: 'Event'):
         """
@@ -110,6 +229,36 @@ class ThreadedTimeline(Timeline):
             # Otherwise, schedule on current timeline
             super(ThreadedTimeline, self).schedule(event)
 
+    def schedule_many(self, events: "Iterable[Event]"):
+        """
+        Method to schedule a batch of events.
+
+        Events for foreign entities are appended to their event buffers and
+        the rest are scheduled on the current timeline in one call, in a
+        single pass over the batch.
+
+        Args:
+            events (Iterable[Event]): Events to be scheduled.
+        """
+
+        foreign_entities = self.foreign_entities
+        event_buffer = self.event_buffer
+        buffer_min_ts = self.buffer_min_ts
+        local = []
+        foreign = 0
+        for event in events:
+            owner = event.process.owner
+            if type(owner) is str and owner in foreign_entities:
+                if event.time < buffer_min_ts:
+                    buffer_min_ts = event.time
+                event_buffer[foreign_entities[owner]].append(event)
+                foreign += 1
+            else:
+                local.append(event)
+        self.buffer_min_ts = buffer_min_ts
+        self.schedule_counter += foreign
+        super(ThreadedTimeline, self).schedule_many(local)
+
 
     def top_time(self) -> float:
         """
@@ -129,105 +278,201 @@ class ThreadedTimeline(Timeline):
             return float('inf')
         
 
-    def send_event_buffer_to_file(self, index):
+    def encode_buffers(self, min_time: float) -> "Dict[int, bytes]":
         """
-        Method to write event buffer to other interpreter's receive "queue"
-        file.
-
-        Used to transfer data from the current interpreter's event buffer to
-        the event buffer of the other interpreter using a pkl file as a 
-        storage medium. Interpreter Channels currently do not support
-        communication between interpreters, and FIFOs (named pipes) cause
-        issues, so inter-interpreter communication is handled by writing data
-        to and from a byte file.
+        Method to serialize the event buffer of every peer.
 
         Args:
-            index (int): Index of the event buffer containing foreign entity
-                events.
+            min_time (float): minimum timestamp of the current timeline.
+
+        Returns:
+            Dict[int, bytes]: mapping of peer id to payload.
         """
-        with self.mutex:   # Acquire mutex lock
-            #print(f"{self.id} Writing event buffer of size {len(self.event_buffer[0])} or {len(self.event_buffer[1])}\n")
-            with open(self.send_file, 'wb') as file:
-                # Write data as tuple to entire event buffer can be written at once
-                pickle.dump((self.event_buffer[index],), file)
-                self.write_ops += 1
 
+        if self.adaptive:
+            # Trailer: earliest local event and the earliest event bound
+            # for every timeline, from which peers compute their horizon
+            top = self.top_time()
+            buffer_mins = [min((event.time for event in buff), default=inf)
+                           for buff in self.event_buffer]
+            self._tops[self.id] = top
+            self._buffer_mins[self.id] = buffer_mins
+            trailer = (top, *buffer_mins)
+            by_reference = isinstance(self.codec, ReferenceCodec)
+            if not by_reference:
+                trailer = pack_scalars(trailer)
+
+        payloads = {}
+        for peer in self.peers:
+            payload = self.codec.encode(self.event_buffer[peer], min_time)
+            if self.adaptive:
+                if by_reference:
+                    # Batches passed by reference carry the trailer as is
+                    payload.trailer = trailer
+                else:
+                    payload += trailer
+            payloads[peer] = payload
+            self.bytes_sent += len(payload)
+        self.write_ops += len(payloads)
+        return payloads
+
+
+    def decode_payloads(self, payloads: "Dict[int, bytes]") \
+            -> "Dict[int, Tuple[List[Event], float]]":
+        """
+        Method to deserialize the payloads received from every peer.
+
+        A peer that has shut down contributes no events and an infinite
+        minimum timestamp.
+
+        Args:
+            payloads (Dict[int, bytes]): mapping of peer id to payload.
 
-    def receive_event_buffer_from_file(self):
+        Returns:
+            Dict[int, Tuple[List[Event], float]]: mapping of peer id to the
+                events and minimum timestamp it sent.
         """
-        Method to read data from other interpreter's send "queue" file.
-
-        Used to transfer data from the other interpreter's event buffer to the
-        current interpreter's event buffer using a pkl file as a storage
-        medium. Interpreter Channels currently do not support communication
-        between interpreters, and FIFOs (named pipes) cause issues, so
-        inter-interpreter communication is handled by writing data to and from
-        a byte file.
-
-        Raises:
-            IOError: Raised and ignored when "resource temporarily
-                unavailable" error occurs.
+
+        tick = time()
+        inbox = {}
+        for peer, payload in payloads.items():
+            if payload is None:
+                inbox[peer] = ([], float('inf'))
+                self._tops[peer] = inf
+                self._buffer_mins[peer] = [inf] * self.transport.size
+                continue
+            if self.adaptive:
+                if isinstance(self.codec, ReferenceCodec):
+                    trailer = payload.trailer
+                else:
+                    payload = memoryview(payload)
+                    split = len(payload) - self._trailer_size
+                    trailer, _ = unpack_scalars(payload, split,
+                                                self.transport.size + 1)
+                    payload = payload[:split]
+                self._tops[peer] = trailer[0]
+                self._buffer_mins[peer] = trailer[1:]
+            inbox[peer] = self.codec.decode(payload)
+            self.bytes_received += len(payload)
+            self.read_ops += 1
+        self.decode_time += time() - tick
+        return inbox
+
+
+    def exchange_link_delays(self) -> None:
+        """Method to share the link delays of all timelines."""
+
+        self.transport.run_exchanges(self.link_delay_exchanges())
+
+    def link_delay_exchanges(self) -> Generator:
+        """Generator of the exchanges of `exchange_link_delays`."""
+
+        payloads = yield {peer: pickle.dumps(self.link_delays)
+                          for peer in self.peers}
+        self._delays = [{} for _ in range(self.transport.size)]
+        self._delays[self.id] = self.link_delays
+        for peer, payload in payloads.items():
+            if payload is not None:
+                self._delays[peer] = pickle.loads(payload)
+
+    def horizon(self) -> float:
         """
+        Method to compute the end of the widest window safe to execute.
 
-        # Repeat until the read file populates.
-        # Depending on how SeQUeNCe timelines handle read/write ops between
-        # synchronization windows, I may be able to remove the while loop.
-        # TODO: Verify this later...
-        while True:
-            # Added this because the subinterpreter kept getting hung up on
-            # the last read operation and I have zero clue why.
-            if os.path.exists("signal.txt"):
-                return [float('inf')]
-            try:
-                with self.mutex:   # Acquire mutex lock
-                    with open(self.recv_file, 'rb') as file:
-                        #file_size = os.path.getsize(file)
-                        file_size = os.fstat(file.fileno()).st_size
-
-                        if file_size == 0:
-                            continue
-
-                        # Load data as tuple, take event buffer list from
-                        # start index
-                        data = pickle.load(file)[0]
-                    # Clear file when done reading
-                    with open(self.recv_file, 'wb') as file:
-                        pass
-                    self.read_ops += 1
-                    return data
-            except IOError as e:
-                if e.errno != 11:  # Ignore "Resource temporarily unavailable"
-                    raise
-                pass
-        
+        After an exchange every timeline `i` has no event earlier than the
+        earliest of its local events and of the events just sent to it, and
+        any event it sends during the window is at least its link delay
+        later. The horizon is the earliest such time over all peers; it is
+        never earlier than the global minimum timestamp plus `lookahead`.
+
+        Returns:
+            float: time before which all local events can be executed.
+        """
+
+        size = self.transport.size
+        buffer_mins = self._buffer_mins
+        horizon = inf
+        for peer in self.peers:
+            pending = min(self._tops[peer],
+                          min(buffer_mins[i][peer] for i in range(size)))
+            horizon = min(horizon, pending + self._delays[peer].get(
+                self.id, self.lookahead))
+        return horizon
 
     def run(self):
         """Runs the simulation until stop time is reached."""
-        
+
+        if self.synchronization == NULL_MESSAGE_SYNC:
+            # Agree on codec tables once all entities have been added
+            if not self._negotiated:
+                self.codec.negotiate(self)
+                self._negotiated = True
+            self.run_null_messages()
+            return
+
+        self.transport.run_exchanges(self.window_exchanges())
+
+    async def run_async(self):
+        """
+        Coroutine running the simulation until stop time is reached.
+
+        Every exchange with the peers is awaited, so the event loop runs
+        other coroutines, such as other timelines, while this one waits.
+        Only barrier synchronization is supported, on transports that
+        implement `exchange_async`.
+        """
+
+        if self.synchronization != BARRIER_SYNC:
+            raise ValueError("only barrier synchronization can be driven "
+                             "by an event loop")
+        await self.transport.run_exchanges_async(self.window_exchanges())
+
+    def window_exchanges(self) -> Generator:
+        """
+        Generator of the simulation with barrier synchronization.
+
+        Runs the simulation until stop time is reached, yielding the
+        payloads of every exchange with the peers and receiving the
+        payloads they sent in return, so that `run` can carry out the
+        exchanges with blocking calls and `run_async` can await them.
+        """
+
+        # Agree on codec tables once all entities have been added
+        if not self._negotiated:
+            yield from self.codec.negotiation(self)
+            if self.adaptive:
+                yield from self.link_delay_exchanges()
+            self._negotiated = True
+
+        profiler = self.profiler
+        cost_profiler = self.cost_profiler
         while self.time < self.stop_time:
             # Get current time
             tick = time()
             # Get timestamp of the soonest event in the LOCAL queue
             min_time = min(self.buffer_min_ts, self.top_time())
 
-            for buf in self.event_buffer:
-                buf.append(min_time)
-
             # UPDATE #
-            # Use file writes/reads for comms instead of MPI (Remove once
+            # Use the transport for comms instead of MPI (Remove once
             # cpython fixes inter-interpreter Channel support)
             # The following lines until "END UPDATE" are all meant to replace
             # the following line from the parallel timeline:
             #inbox = MPI.COMM_WORLD.alltoall(self.event_buffer)
 
-            # Get index of event buffer that contains all other foreign events
-            buf_index = 1 - int(self.id)
-            self.send_event_buffer_to_file(buf_index)
-
-            # Load data from other timelines via receiver "queue" file
-            recv_buf = self.receive_event_buffer_from_file()
-            inbox = []
-            inbox.append(recv_buf)
+            # Send every peer its event buffer and receive one from each
+            payloads = self.encode_buffers(min_time)
+            if profiler is not None:
+                started = tick
+                encoded = time()
+                wait_time = self.transport.wait_time
+                sent = [len(buff) for buff in self.event_buffer]
+            payloads = yield payloads
+            if profiler is not None:
+                exchanged = time()
+                wait_time = self.transport.wait_time - wait_time
+            inbox = self.decode_payloads(payloads)
+            if profiler is not None:
+                decoded = time()
 
             # END UPDATE #
 
@@ -240,22 +485,17 @@ class ThreadedTimeline(Timeline):
             self.buffer_min_ts = float('inf')
 
             # Go through all events that were gathered from other timelines
-            for events in inbox:
-                min_time = min(min_time, events.pop())
-                # Iterate over all events in the events list, incrememnting
-                # the exchange counter and scheduling the event
-                for event in events:
-                    # TODO: Included this check because an earlier version of
-                    # this file was loading the min times as events, causing
-                    # an error. Check if can remove later.
-                    if not isinstance(event, Event):
-                        continue
-                    self.exchange_counter += 1
-                    self.schedule(event)
+            for events, peer_min_time in inbox.values():
+                min_time = min(min_time, peer_min_time)
+                # Schedule all events in the events list at once,
+                # incrementing the exchange counter
+                self.exchange_counter += len(events)
+                self.schedule_many(events)
 
             # Throw AssertionError if min_time is less than the timeline's
-            # current time
-            assert min_time >= self.time
+            # current time. Adaptive windows let timelines run ahead of the
+            # global minimum; their events are still checked one by one.
+            assert self.adaptive or min_time >= self.time
 
             # Exit current simulation loop if the sim stop time is reached
             if min_time >= self.stop_time:
@@ -265,10 +505,19 @@ class ThreadedTimeline(Timeline):
             self.sync_counter += 1
 
             # Time up until next synchronization window
-            sync_time = min(min_time + self.lookahead, self.stop_time)
-            self.time = min_time
+            if self.adaptive:
+                sync_time = min(self.horizon(), self.stop_time)
+            else:
+                sync_time = min(min_time + self.lookahead, self.stop_time)
+            self.window_widths.append(sync_time - min_time)
+            self.time = max(self.time, min_time)
 
             tick = time()
+            if profiler is not None:
+                run_counter = self.run_counter
+                received = [0] * self.transport.size
+                for peer, (events, _) in inbox.items():
+                    received[peer] = len(events)
             # Iterate over all events as long as the event with the lowest
             # time is scheduled to occur before the end of the synch window
             while len(self.events) > 0 and self.events.top().time < sync_time:
@@ -281,13 +530,279 @@ class ThreadedTimeline(Timeline):
                 # Set timeline's time to time of current event and run the
                 # process associated with the event
                 self.time = event.time
-                event.process.run()
+                if cost_profiler is None:
+                    event.process.run()
+                else:
+                    cost_profiler.run(event.process)
                 self.run_counter += 1
             # EDIT: Removed quantum manager reference for interpreters demo
             #if isinstance(self.quantum_manager, QuantumManagerClient):
             #    self.quantum_manager.flush_before_sync()
             self.computing_time += time() - tick
 
+            if profiler is not None:
+                profiler.record(min_time, sync_time - min_time,
+                                self.run_counter - run_counter,
+                                len(self.events), encoded - started,
+                                exchanged - encoded, wait_time,
+                                decoded - exchanged, time() - tick,
+                                sent, received)
+
+            if self.rebalance_interval \
+                    and self.sync_counter % self.rebalance_interval == 0:
+                tick = time()
+                yield from self.rebalance_exchanges()
+                self.communication_time += time() - tick
+
+
+    def rebalance(self) -> None:
+        """
+        Method to run a load balancing round with all peers.
+
+        Every timeline shares its computing time since the last round and
+        the number of pending events of each of its entities, so all of them
+        compute the same migration plan. Must be called by all timelines at
+        the same window boundary.
+        """
+
+        self.transport.run_exchanges(self.rebalance_exchanges())
+
+    def rebalance_exchanges(self) -> Generator:
+        """Generator of the exchanges of `rebalance`."""
+
+        busy = self.computing_time - self._balanced_time
+        self._balanced_time = self.computing_time
+        loads = {name: 0 for name in self.entities}
+        for event in self.events:
+            name = getattr(event.process.owner, "name", None)
+            if name in loads and not event.is_invalid():
+                loads[name] += 1
+
+        payloads = yield {peer: pickle.dumps((busy, loads))
+                          for peer in self.peers}
+        times = [0.0] * self.transport.size
+        all_loads = [{} for _ in range(self.transport.size)]
+        times[self.id], all_loads[self.id] = busy, loads
+        for peer, payload in payloads.items():
+            if payload is None:
+                # A peer has shut down, so the simulation is over
+                return
+            times[peer], all_loads[peer] = pickle.loads(payload)
+
+        plan = self.plan_migrations(times, all_loads)
+        if plan:
+            yield from self.migration_exchanges(plan)
+
+    def plan_migrations(self, times: List[float],
+                        loads: List[Dict[str, int]]) -> Dict[str, int]:
+        """
+        Method to choose the entities to move off the busiest timeline.
+
+        Entities of the busiest timeline are moved to the least busy one,
+        those with the most pending events first, as long as their share of
+        the busy timeline's computing time fits in half the difference
+        between the two timelines.
+
+        Args:
+            times (List[float]): computing time of every timeline since the
+                last round.
+            loads (List[Dict[str, int]]): pending events of every entity of
+                every timeline.
+
+        Returns:
+            Dict[str, int]: new timeline of every migrating entity.
+        """
+
+        size = len(times)
+        mean = sum(times) / size
+        busiest = max(range(size), key=lambda rank: (times[rank], -rank))
+        idlest = min(range(size), key=lambda rank: (times[rank], rank))
+        pending = sum(loads[busiest].values())
+        if busiest == idlest or pending == 0 \
+                or times[busiest] <= mean * (1 + self.rebalance_threshold):
+            return {}
+
+        # Computing time is assumed proportional to the pending events
+        cost = times[busiest] / pending
+        excess = (times[busiest] - times[idlest]) / 2
+        plan = {}
+        for name in sorted(loads[busiest],
+                           key=lambda name: (-loads[busiest][name], name)):
+            share = loads[busiest][name] * cost
+            if 0 < share <= excess:
+                plan[name] = idlest
+                excess -= share
+        return plan
+
+    def migrate(self, plan: Dict[str, int]) -> None:
+        """
+        Method to move entities and their pending events between timelines.
+
+        Every timeline sends the entities it gives up, with their pending
+        events, to their new timelines, updates its foreign entity map and
+        moves the buffered events of migrated entities to the buffer of
+        their new timeline, or to its own event list. Must be called by all
+        timelines with the same plan, between two windows.
+
+        Args:
+            plan (Dict[str, int]): new timeline of every migrating entity.
+        """
+
+        self.transport.run_exchanges(self.migration_exchanges(plan))
+
+    def migration_exchanges(self, plan: Dict[str, int]) -> Generator:
+        """Generator of the exchanges of `migrate`."""
+
+        leaving = {name: [] for name in plan if name in self.entities}
+        for event in self.events:
+            name = getattr(event.process.owner, "name", None)
+            if name in leaving and not event.is_invalid():
+                leaving[name].append(event)
+
+        outgoing = {peer: [] for peer in self.peers}
+        for name, events in leaving.items():
+            for event in events:
+                self.events.remove(event)
+            entity = self.entities[name]
+            # Detached, so the entity pickles without this timeline
+            self.remove_entity_by_name(name)
+            outgoing[plan[name]].append(
+                (entity, [(event.time, event.priority,
+                           event.process.activation, event.process.act_params,
+                           event.process.act_kwargs) for event in events]))
+            self.migrations += 1
+
+        payloads = yield {peer: pickle.dumps(outgoing[peer])
+                          for peer in self.peers}
+
+        for name, rank in plan.items():
+            if rank == self.id:
+                self.foreign_entities.pop(name, None)
+            else:
+                self.foreign_entities[name] = rank
+
+        arrived = []
+        for payload in payloads.values():
+            if payload is None:
+                continue
+            for entity, events in pickle.loads(payload):
+                self.add_entity(entity)
+                arrived += [Event(event_time,
+                                  Process(entity.name, activation, params,
+                                          kwargs),
+                                  priority)
+                            for event_time, priority, activation, params,
+                            kwargs in events]
+
+        # Buffered events follow their entity to its new timeline
+        buffers = [[] for _ in range(self.transport.size)]
+        for buff in self.event_buffer:
+            for event in buff:
+                rank = self.foreign_entities.get(event.process.owner)
+                if rank is None:
+                    arrived.append(event)
+                else:
+                    buffers[rank].append(event)
+        self.event_buffer = buffers
+        super(ThreadedTimeline, self).schedule_many(arrived)
+
+    def run_null_messages(self):
+        """
+        Runs the simulation with Chandy-Misra-Bryant synchronization.
+
+        Every message to a peer carries the events for it and a promise that
+        no later message will hold an earlier event. The timeline executes
+        every event earlier than the smallest promise received (its safe
+        time), then sends each peer its buffered events, or a null message
+        if it has none but its promise advanced. A timeline only waits when
+        it can neither receive, execute nor send, and then only until any
+        peer sends something, so timelines that rarely interact do not
+        stall each other.
+
+        Once no event before the stop time can reach it, a timeline sends a
+        final promise of infinity to its peers and returns.
+        """
+
+        transport = self.transport
+        cost_profiler = self.cost_profiler
+        # Promise received from and sent to each peer. Nothing is known of
+        # a peer until its first message arrives.
+        clocks = {peer: -inf for peer in self.peers}
+        promised = {peer: -inf for peer in self.peers}
+        while True:
+            # Receive everything that has arrived
+            tick = time()
+            received = False
+            for peer in self.peers:
+                while clocks[peer] < inf:
+                    payload = transport.try_recv(peer)
+                    if payload is None:
+                        break
+                    received = True
+                    (events, clocks[peer]), = self.decode_payloads(
+                        {peer: payload}).values()
+                    self.exchange_counter += len(events)
+                    self.schedule_many(events)
+            self.communication_time += time() - tick
+
+            # Execute every event before the safe time
+            tick = time()
+            safe_time = min(clocks.values(), default=inf)
+            end = min(safe_time, self.stop_time)
+            run_counter = self.run_counter
+            while len(self.events) > 0 and self.events.top().time < end:
+                event = self.events.pop()
+                if event.is_invalid():
+                    continue
+                assert self.time <= event.time, "invalid event time for process scheduled on " + str(
+                    event.process.owner)
+                self.time = event.time
+                if cost_profiler is None:
+                    event.process.run()
+                else:
+                    cost_profiler.run(event.process)
+                self.run_counter += 1
+            executed = self.run_counter > run_counter
+            if executed:
+                self.sync_counter += 1
+            self.computing_time += time() - tick
+
+            # Send buffered events, or null messages for advanced promises
+            tick = time()
+            top = self.top_time()
+            finished = safe_time >= self.stop_time and top >= self.stop_time
+            # Later events can only follow from executing events at or after
+            # both the current time and the earliest event still possible
+            earliest = max(self.time, min(top, safe_time))
+            sent = False
+            for peer in self.peers:
+                buff = self.event_buffer[peer]
+                if clocks[peer] == inf:
+                    # Peer has finished, so only receives events after stop
+                    buff.clear()
+                    continue
+                promise = inf if finished \
+                    else earliest + self.link_delays[peer]
+                if buff or promise > promised[peer]:
+                    payload = self.codec.encode(buff, promise)
+                    transport.post(peer, payload)
+                    self.bytes_sent += len(payload)
+                    self.write_ops += 1
+                    if not buff:
+                        self.null_messages += 1
+                    buff.clear()
+                    promised[peer] = promise
+                    sent = True
+            self.buffer_min_ts = inf
+
+            if finished:
+                transport.flush()
+                self.communication_time += time() - tick
+                break
+            if not (received or executed or sent):
+                transport.wait_any([peer for peer in self.peers
+                                    if clocks[peer] < inf])
+            self.communication_time += time() - tick
 
     def add_foreign_entity(self, entity_name: str, foreign_id: int):
         """
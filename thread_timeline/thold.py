@@ -1,16 +1,60 @@
 #from numpy.random import choice, exponential
-from typing import List, TYPE_CHECKING
-# EDIT: Added for interpreters demo (replaced numpy choice and exponential imports):
-from random import choice, expovariate
+from array import array
+from math import log
+from random import Random
+from typing import List, Tuple, TYPE_CHECKING
 
+# NumPy is optional and cannot be imported in isolated sub-interpreters
+# (yet), so it is only used when NUMPY_BACKEND is requested.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .entity import Entity
 from .process import Process
 from .event import Event
 
 if TYPE_CHECKING:
     from .t_timeline import ThreadedTimeline
 
+# Backends for drawing neighbors and delays
+NUMPY_BACKEND = "numpy"
+PYTHON_BACKEND = "python"
+
+# Number of neighbors and delays drawn at once
+DEFAULT_BLOCK_SIZE = 1024
+
+
+def _draw_python(generator: Random, neighbors: int, lookahead: int,
+                 count: int) -> Tuple[array, array]:
+    """
+    Function to draw a block of neighbor indices and delays with `random`.
+
+    Delays are `lookahead` plus an exponential sample of mean `lookahead`,
+    truncated to an integer, computed by inversion as in
+    `random.expovariate`.
+    """
+
+    uniform = generator.random
+    indices = array('L', [int(uniform() * neighbors) for _ in range(count)])
+    delays = array('q', [lookahead + int(-log(1.0 - uniform()) * lookahead)
+                         for _ in range(count)])
+    return indices, delays
 
-class TholdNode:
+
+def _draw_numpy(generator, neighbors: int, lookahead: int,
+                count: int) -> Tuple[List[int], List[int]]:
+    """Function to draw a block of neighbor indices and delays with NumPy."""
+
+    indices = generator.integers(0, neighbors, count)
+    delays = lookahead + generator.exponential(lookahead, count) \
+        .astype(numpy.int64)
+    # Python ints index and add much faster than NumPy scalars
+    return indices.tolist(), delays.tolist()
+
+
+class TholdNode(Entity):
     """
     Class for a THOLD Node for use in a Threaded hold simulation model.
 
@@ -36,10 +80,16 @@ class TholdNode:
         lookahead (int): Timeline lookahead time.
         neighbors (List[str]): List of other Nodes on current Threaded
             Timeline.
+        generator (Random): random stream of the node, taken from
+            `get_generator` when the node is initialized.
+        backend (str): NUMPY_BACKEND or PYTHON_BACKEND.
+        block_size (int): number of neighbors and delays drawn at once.
     """
 
     def __init__(self, name: 'str', timeline: 'ThreadedTimeline',
-                 init_work: int, lookahead: int, neighbors: List[str]):
+                 init_work: int, lookahead: int, neighbors: List[str],
+                 backend: str = PYTHON_BACKEND,
+                 block_size: int = DEFAULT_BLOCK_SIZE):
         """
         Constructor for TholdNode class.
         
@@ -51,14 +101,43 @@ class TholdNode:
             lookahead (int): Timeline lookahead time.
             neighbors (List[str]): List of other Nodes on current Threaded
                 Timeline.
+            backend (str): backend drawing neighbors and delays (default
+                PYTHON_BACKEND).
+            block_size (int): number of neighbors and delays drawn at once
+                (default DEFAULT_BLOCK_SIZE).
         """
 
-        self.name = name
-        self.timeline = timeline
-        timeline.entities[name] = self
+        super(TholdNode, self).__init__(name, timeline)
         self.init_work = init_work
         self.lookahead = lookahead
         self.neightbors = neighbors
+        self.generator = None
+        if backend == NUMPY_BACKEND:
+            if numpy is None:
+                raise ValueError("NumPy backend requested but NumPy is not "
+                                 "available")
+            self._draw = _draw_numpy
+        elif backend == PYTHON_BACKEND:
+            self._draw = _draw_python
+        else:
+            raise ValueError(f"Invalid backend {backend}")
+        self.backend = backend
+        self.block_size = block_size
+        self._block_generator = None
+        self._indices = []
+        self._delays = []
+        self._drawn = 0
+        # Generator state after drawing the current block, for rollbacks
+        self._saved_block = None
+        self._generator_state = None
+
+    def _refill(self, count: int) -> None:
+        """Method to draw the next block of neighbor indices and delays."""
+
+        self._indices, self._delays = self._draw(
+            self._block_generator, len(self.neightbors), self.lookahead,
+            count)
+        self._drawn = 0
 
     def generate_event(self) -> Event:
         """
@@ -69,12 +148,21 @@ class TholdNode:
         Interpreters does not yet support numpy, the random.expovariate()
         method is used, which takes as an argument the inverse of whatever
         value is passed to numpy.random.exponential() to achieve similar
-        results.
+        results. Both are drawn from the node's own random stream.
+
+        Neighbors and delays are drawn in blocks, with NumPy when
+        NUMPY_BACKEND is requested, and the next block is drawn once one is
+        used up.
 
         Returns:
             Event: Generated Event
         """
-        next_str = str(choice(self.neightbors))
+        drawn = self._drawn
+        if drawn == len(self._delays):
+            self._refill(self.block_size)
+            drawn = 0
+        self._drawn = drawn + 1
+        next_str = str(self.neightbors[self._indices[drawn]])
         entity = self.timeline.get_entity_by_name(next_str)
         if entity is None:
             process = Process(next_str, 'get', [])
@@ -82,8 +170,7 @@ class TholdNode:
             process = Process(entity, 'get', [])
         #event = Event(self.timeline.now() + self.lookahead + int(
         #    exponential(self.lookahead)), process)
-        event = Event(self.timeline.now() + self.lookahead + 
-                      int(expovariate(1/self.lookahead)), process)
+        event = Event(self.timeline.now() + self._delays[drawn], process)
         return event
 
     def init(self):
@@ -91,11 +178,56 @@ class TholdNode:
         Initialization function for the TholdNode.
 
         For the prescribed amount of work, node will generate events and
-        schedule them on the associated ThreadedTimeline.
+        schedule them on the associated ThreadedTimeline in one batch.
         """
-        for _ in range(self.init_work):
-            event = self.generate_event()
-            self.timeline.schedule(event)
+        self.generator = self.get_generator()
+        if self.backend == NUMPY_BACKEND:
+            self._block_generator = numpy.random.default_rng(
+                self.generator.getrandbits(64))
+        else:
+            self._block_generator = self.generator
+        # Draw the whole initial work as one block
+        self._refill(max(self.init_work, self.block_size))
+        self.timeline.schedule_many(
+            [self.generate_event() for _ in range(self.init_work)])
+
+    def save_state(self) -> Tuple:
+        """
+        Method to capture the random stream of the node for a rollback.
+
+        The drawn blocks are replaced rather than modified, so they are
+        kept by reference along with the position in them. The generator is
+        only used to draw blocks, so its state is captured once per block.
+
+        Returns:
+            Tuple: state of the block generator, blocks and position.
+        """
+
+        if self._saved_block is not self._indices:
+            self._saved_block = self._indices
+            if self.backend == NUMPY_BACKEND:
+                self._generator_state = \
+                    self._block_generator.bit_generator.state
+            else:
+                self._generator_state = self._block_generator.getstate()
+        return (self._generator_state, self._indices, self._delays,
+                self._drawn)
+
+    def restore_state(self, state: Tuple) -> None:
+        """
+        Method to return the random stream of the node to a saved state.
+
+        Args:
+            state (Tuple): state returned by `save_state`.
+        """
+
+        generator_state, self._indices, self._delays, self._drawn = state
+        self._saved_block = self._indices
+        self._generator_state = generator_state
+        if self.backend == NUMPY_BACKEND:
+            self._block_generator.bit_generator.state = generator_state
+        else:
+            self._block_generator.setstate(generator_state)
 
     def get(self):
         """Method to produceand schedule a single Event."""
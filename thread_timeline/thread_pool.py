@@ -0,0 +1,127 @@
+"""
+Thread backend for threaded timelines.
+
+This module runs every timeline of a simulation in its own thread of the
+current process. Threads share one address space, so timelines are
+connected by a QueueTransport and exchange events by reference with the
+ReferenceCodec, without serialization. On a free-threaded (GIL-disabled)
+build of CPython, the threads also run in parallel; with the GIL, they take
+turns, and `run_parallel` uses worker processes instead.
+"""
+
+from typing import TYPE_CHECKING, Any, Callable, List
+from threading import Thread
+import sys
+import traceback
+
+from .process_pool import run_processes, default_summary
+from .transport import QueueHub, QueueTransport
+
+if TYPE_CHECKING:
+    from .t_timeline import ThreadedTimeline
+    from .transport import Transport
+
+
+def gil_disabled() -> bool:
+    """
+    Function to check whether threads of this interpreter run in parallel.
+
+    Returns:
+        bool: True on a free-threaded build of CPython running without the
+            GIL, which an extension module may have enabled again.
+    """
+
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def run_threads(setup: Callable[["Transport"], "ThreadedTimeline"],
+                size: int,
+                summary: Callable[["ThreadedTimeline"], Any] =
+                default_summary) -> List[Any]:
+    """
+    Function to run a simulation with one timeline per thread.
+
+    Every thread creates its QueueTransport and passes it to `setup`, which
+    must create the timeline of that rank with it, add the local entities
+    and the foreign entities (e.g. with `apply_partition`) and return the
+    timeline. Timelines created without a codec pass events by reference.
+    The thread then initializes and runs it, and its result is
+    `summary(timeline)`. Entities of different timelines must not share
+    mutable state, as they would with sub-interpreters or processes.
+
+    If a timeline fails, the others are aborted, since they would wait for
+    it forever.
+
+    Args:
+        setup (Callable[[Transport], ThreadedTimeline]): builds the timeline
+            of a thread from its transport.
+        size (int): number of timelines (threads).
+        summary (Callable[[ThreadedTimeline], Any]): returns the result of
+            a thread (default `default_summary`).
+
+    Returns:
+        List[Any]: result of every thread, by rank.
+
+    Raises:
+        RuntimeError: a timeline raised an exception.
+    """
+
+    if size < 1:
+        raise ValueError(f"Invalid number of threads {size}")
+    hub = QueueHub(size)
+    results = [None] * size
+    # Failures in the order they happened; the first is the cause
+    failures = []
+
+    def work(rank: int) -> None:
+        transport = QueueTransport(rank, hub)
+        try:
+            timeline = setup(transport)
+            timeline.init()
+            timeline.run()
+            results[rank] = summary(timeline)
+        except BaseException:
+            failures.append((rank, traceback.format_exc()))
+            hub.abort()
+        finally:
+            transport.close()
+
+    threads = [Thread(target=work, name=f"timeline-{rank}", args=(rank,))
+               for rank in range(1, size)]
+    for thread in threads:
+        thread.start()
+    work(0)
+    for thread in threads:
+        thread.join()
+    if failures:
+        rank, error = failures[0]
+        raise RuntimeError(f"timeline {rank} failed:\n{error}")
+    return results
+
+
+def run_parallel(setup: Callable[["Transport"], "ThreadedTimeline"],
+                 size: int,
+                 summary: Callable[["ThreadedTimeline"], Any] =
+                 default_summary) -> List[Any]:
+    """
+    Function to run a simulation on the fastest backend of this interpreter.
+
+    Timelines run as threads with `run_threads` if the GIL is disabled, and
+    as worker processes with `run_processes` otherwise, so `setup` and
+    `summary` should be picklable.
+
+    Args:
+        setup (Callable[[Transport], ThreadedTimeline]): builds the timeline
+            of a rank from its transport.
+        size (int): number of timelines.
+        summary (Callable[[ThreadedTimeline], Any]): returns the result of
+            a timeline (default `default_summary`).
+
+    Returns:
+        List[Any]: result of every timeline, by rank.
+    """
+
+    if gil_disabled():
+        return run_threads(setup, size, summary)
+    return run_processes(setup, size, summary)
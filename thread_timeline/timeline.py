@@ -9,10 +9,12 @@ All entities are required to have an attached timeline for simulation.
 
 #from _thread import start_new_thread
 from datetime import timedelta
+from hashlib import sha256
 from math import inf
+from random import Random
 from sys import stdout
 from time import time_ns, sleep
-from typing import TYPE_CHECKING, Optional, Dict, Union
+from typing import TYPE_CHECKING, Optional, Dict, Iterable, Union
 
 #from numpy import random
 
@@ -20,7 +22,15 @@ if TYPE_CHECKING:
     from .event import Event
     from .entity import Entity
 
-from .eventlist import EventList
+from .eventlist import (EventList,
+                        KeyedEventList,
+                        IndexedEventList,
+                        HEAP_EVENT_LIST,
+                        KEYED_EVENT_LIST,
+                        CALENDAR_EVENT_LIST,
+                        INDEXED_EVENT_LIST)
+from .calendar_eventlist import CalendarEventList
+from .profiler import CostProfiler
 #from ..utils import log
 #from .quantum_manager import (QuantumManagerKet,
 #                              QuantumManagerDensity,
@@ -37,6 +47,27 @@ PICOSECONDS_PER_NANOSECOND = NANOSECONDS_PER_MICROSECOND = MILLISECONDS_PER_SECO
 SECONDS_PER_MINUTE = MINUTES_PER_HOUR = 60
 
 
+def derive_seed(seed: Optional[int], name: str) -> Optional[int]:
+    """
+    Function to derive the seed of a named random stream from a root seed.
+
+    The derivation only depends on its arguments, so every interpreter and
+    process derives the same stream for the same entity.
+
+    Args:
+        seed (int): root seed of the simulation, or None.
+        name (str): name of the stream (usually an entity name).
+
+    Returns:
+        int: seed of the stream, or None if `seed` is None.
+    """
+
+    if seed is None:
+        return None
+    digest = sha256(f"{seed}:{name}".encode()).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
 class Timeline:
     """
     Class for a simulation timeline.
@@ -70,25 +101,50 @@ class Timeline:
             events.
         show_progress (bool): show/hide the progress bar of simulation.
         quantum_manager (QuantumManager): quantum state manager.
+        cost_profiler (CostProfiler): accounts execution time per entity
+            type and method, or None if accounting is disabled.
+        root_seed (int): seed all random streams are derived from, or None
+            if the timeline has not been seeded.
     """
 
-    def __init__(self, stop_time=inf):
+    def __init__(self, stop_time=inf, event_list=HEAP_EVENT_LIST,
+                 accounting: Optional[str] = None):
         """
         Constructor for timeline.
 
         Args:
             stop_time (int): stop time (in ps) of simulation (default inf).
+            event_list (str): event list implementation, HEAP_EVENT_LIST
+                (ordered by `Event.__lt__`), KEYED_EVENT_LIST (ordered by
+                precomputed keys), CALENDAR_EVENT_LIST (calendar queue) or
+                INDEXED_EVENT_LIST (O(log n) rescheduling) (default
+                HEAP_EVENT_LIST).
+            accounting (str): cost accounting mode, FULL_ACCOUNTING,
+                SAMPLED_ACCOUNTING or None to disable (default None).
             formalism (str): formalism of quantum state representation.
             truncation (int): truncation of Hilbert space (currently only for
                 Fock representation).
         """
-        self.events: EventList = EventList()
+        if event_list == HEAP_EVENT_LIST:
+            self.events: EventList = EventList()
+        elif event_list == KEYED_EVENT_LIST:
+            self.events = KeyedEventList()
+        elif event_list == CALENDAR_EVENT_LIST:
+            self.events = CalendarEventList()
+        elif event_list == INDEXED_EVENT_LIST:
+            self.events = IndexedEventList()
+        else:
+            raise ValueError(f"Invalid event list {event_list}")
         self.entities: Dict[str, "Entity"] = {}
         self.time: Union[int, float] = 0
         self.stop_time: Union[int, float] = stop_time
         self.schedule_counter: int = 0
         self.run_counter: int = 0
         self.is_running: bool = False
+        self.cost_profiler: Optional[CostProfiler] = \
+            None if accounting is None else CostProfiler(accounting)
+        self.root_seed: Optional[int] = None
+        self._generators: Dict[str, Random] = {}
         #self.show_progress: bool = False
 
         # EDIT: Removed quantum manager temporarily for standalone demo
@@ -110,11 +166,33 @@ class Timeline:
 
     def schedule(self, event: "Event") -> None:
         """Method to schedule an event."""
-        if type(event.process.owner) is str:
-            event.process.owner = self.get_entity_by_name(event.process.owner)
+        process = event.process
+        if type(process.owner) is str:
+            process.bind(self.get_entity_by_name(process.owner))
         self.schedule_counter += 1
         self.events.push(event)
 
+    def schedule_many(self, events: "Iterable[Event]") -> None:
+        """
+        Method to schedule a batch of events.
+
+        Equivalent to calling `schedule` on every event, but the events are
+        added to the event list in one call, which can build the heap once
+        instead of pushing each event.
+
+        Args:
+            events (Iterable[Event]): events to schedule.
+        """
+
+        events = list(events)
+        get_entity = self.entities.get
+        for event in events:
+            process = event.process
+            if type(process.owner) is str:
+                process.bind(get_entity(process.owner, None))
+        self.schedule_counter += len(events)
+        self.events.push_many(events)
+
     def init(self) -> None:
         """Method to initialize all simulated entities."""
         #log.logger.info("Timeline initial network")
@@ -137,6 +215,7 @@ class Timeline:
         #if self.show_progress:
         #    self.progress_bar()
 
+        cost_profiler = self.cost_profiler
         while len(self.events) > 0:
             event = self.events.pop()
 
@@ -148,7 +227,10 @@ class Timeline:
                 continue
 
             self.time = event.time
-            event.process.run()
+            if cost_profiler is None:
+                event.process.run()
+            else:
+                cost_profiler.run(event.process)
             self.run_counter += 1
 
         self.is_running = False
@@ -187,12 +269,40 @@ class Timeline:
         return self.entities.get(name, None)
 
     def seed(self, seed: int) -> None:
-        """Sets random seed for simulation."""
+        """
+        Sets random seed for simulation.
 
-        # EDIT: Updated to do nothing until Interpreters module allows NumPy
-        # support
-        pass
-        #random.seed(seed)
+        Random streams are created from the seed on demand by
+        `get_generator`. Streams handed out before seeding are discarded.
+
+        EDIT: Uses `random.Random` instead of NumPy generators, which are
+        not supported in sub-interpreters.
+        """
+
+        self.root_seed = seed
+        self._generators.clear()
+
+    def get_generator(self, name: str = "") -> Random:
+        """
+        Method to get the random stream of an entity.
+
+        Every name has its own stream, derived from the root seed and the
+        name, so the numbers an entity draws do not depend on which timeline
+        runs it or on what other entities draw. The empty name is the stream
+        of the timeline itself.
+
+        Args:
+            name (str): name of the stream (default "").
+
+        Returns:
+            Random: the random stream.
+        """
+
+        generator = self._generators.get(name)
+        if generator is None:
+            generator = Random(derive_seed(self.root_seed, name))
+            self._generators[name] = generator
+        return generator
 
     def progress_bar(self):
         """Method to draw progress bar.
@@ -0,0 +1,484 @@
+"""
+Definition of the abstract Transport class.
+
+This module defines the Transport interface used by the ThreadedTimeline to
+exchange event buffers with other timelines at every synchronization window,
+along with the original file-based transport and the QueueTransport between
+threads of one process.
+"""
+
+from abc import ABC, abstractmethod
+from queue import Empty, SimpleQueue
+from threading import Event
+from time import perf_counter, sleep
+from typing import Any, Dict, Generator, List, Optional
+import os
+
+# Polling interval bounds for the file transport, in seconds
+MIN_POLL_SECONDS = 1e-5
+MAX_POLL_SECONDS = 1e-3
+
+# Interval at which a blocked queue transport checks for an aborted
+# simulation, in seconds
+ABORT_POLL_SECONDS = 0.1
+
+
+class Transport(ABC):
+    """
+    Abstract Transport class.
+
+    A transport moves opaque byte payloads between the timelines of a
+    simulation. Each timeline owns one transport, identified by its `rank`
+    among the `size` timelines taking part in the simulation. A payload of
+    None is returned by `recv` when the peer has shut down.
+
+    Transports that support asynchronous synchronization also implement
+    `try_recv`; `post`, `flush` and `wait_any` then let a timeline send and
+    receive without ever waiting on a particular peer. Transports that can
+    wait in an asyncio event loop also implement `exchange_async`, so
+    timelines can be driven by coroutines.
+
+    Attributes:
+        rank (int): index of the timeline that owns this transport.
+        size (int): total number of timelines connected by the transport.
+        wait_time (float): seconds spent waiting for peers.
+        shares_objects (bool): whether payloads reach peers as the same
+            objects, so they need not be bytes (class attribute).
+    """
+
+    shares_objects = False
+
+    def __init__(self, rank: int, size: int) -> None:
+        """
+        Constructor for transport class.
+
+        Args:
+            rank (int): index of the timeline that owns this transport.
+            size (int): total number of timelines connected by the transport.
+        """
+
+        self.rank = rank
+        self.size = size
+        self.wait_time = 0.0
+
+    @abstractmethod
+    def send(self, peer: int, payload: bytes) -> None:
+        """
+        Method to send a payload to another timeline (abstract).
+
+        Args:
+            peer (int): rank of the receiving timeline.
+            payload (bytes): data to be sent.
+        """
+
+        pass
+
+    @abstractmethod
+    def recv(self, peer: int) -> Optional[bytes]:
+        """
+        Method to receive a payload from another timeline (abstract).
+
+        Args:
+            peer (int): rank of the sending timeline.
+
+        Returns:
+            bytes: data received from `peer`, or None if `peer` has shut down.
+        """
+
+        pass
+
+    def exchange(self, payloads: Dict[int, bytes]) -> Dict[int, bytes]:
+        """
+        Method to send one payload to each peer and receive one from each.
+
+        The default implementation sends everything before receiving, which
+        is only safe for transports whose sends never block on the receiver.
+        Transports with bounded buffers should override this method.
+
+        Args:
+            payloads (Dict[int, bytes]): mapping of peer rank to payload.
+
+        Returns:
+            Dict[int, bytes]: mapping of peer rank to received payload.
+        """
+
+        for peer, payload in payloads.items():
+            self.send(peer, payload)
+        return {peer: self.recv(peer) for peer in payloads}
+
+    async def exchange_async(self, payloads: Dict[int, bytes]) \
+            -> Dict[int, bytes]:
+        """
+        Coroutine to send one payload to each peer and receive one from each.
+
+        Waits in the running event loop instead of blocking it, so other
+        coroutines (e.g. other timelines) run in the meantime.
+
+        Args:
+            payloads (Dict[int, bytes]): mapping of peer rank to payload.
+
+        Returns:
+            Dict[int, bytes]: mapping of peer rank to received payload.
+
+        Raises:
+            NotImplementedError: if the transport only supports blocking
+                exchanges.
+        """
+
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support asynchronous exchanges")
+
+    def run_exchanges(self, exchanges: Generator) -> Any:
+        """
+        Method to carry out a sequence of exchanges with `exchange`.
+
+        Args:
+            exchanges (Generator): yields the payloads of every exchange
+                and is sent the payloads received in return.
+
+        Returns:
+            Any: the value returned by `exchanges`.
+        """
+
+        try:
+            payloads = next(exchanges)
+            while True:
+                payloads = exchanges.send(self.exchange(payloads))
+        except StopIteration as stop:
+            return stop.value
+
+    async def run_exchanges_async(self, exchanges: Generator) -> Any:
+        """
+        Coroutine to carry out a sequence of exchanges with
+        `exchange_async`.
+
+        Args:
+            exchanges (Generator): yields the payloads of every exchange
+                and is sent the payloads received in return.
+
+        Returns:
+            Any: the value returned by `exchanges`.
+        """
+
+        try:
+            payloads = next(exchanges)
+            while True:
+                payloads = exchanges.send(await self.exchange_async(payloads))
+        except StopIteration as stop:
+            return stop.value
+
+    def post(self, peer: int, payload: bytes) -> None:
+        """
+        Method to send a payload without waiting for it to be delivered.
+
+        The default implementation is a blocking `send`. Payloads posted to
+        one peer are received in the order they were posted.
+
+        Args:
+            peer (int): rank of the receiving timeline.
+            payload (bytes): data to be sent.
+        """
+
+        self.send(peer, payload)
+
+    def flush(self) -> None:
+        """Method to wait until every posted payload has been sent."""
+
+        pass
+
+    def try_recv(self, peer: int) -> Optional[bytes]:
+        """
+        Method to receive a payload from another timeline if one is ready.
+
+        Args:
+            peer (int): rank of the sending timeline.
+
+        Returns:
+            bytes: data received from `peer`, or None if no complete payload
+                has arrived yet.
+
+        Raises:
+            NotImplementedError: if the transport only supports blocking
+                receives.
+        """
+
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support non-blocking receives")
+
+    def wait_any(self, peers: List[int]) -> None:
+        """
+        Method to wait until a payload may have arrived from any of `peers`.
+
+        Returns after at most a short timeout, so callers must check with
+        `try_recv` and call again if nothing arrived.
+
+        Args:
+            peers (List[int]): ranks of the timelines to wait for.
+        """
+
+        tick = perf_counter()
+        sleep(MAX_POLL_SECONDS)
+        self.wait_time += perf_counter() - tick
+
+    def close(self) -> None:
+        """Method to release any resources held by the transport."""
+
+        pass
+
+
+class FileTransport(Transport):
+    """
+    Transport that exchanges data through "queue" files on disk.
+
+    This is the original inter-interpreter transport. Interpreter Channels
+    currently do not support communication between interpreters, and FIFOs
+    (named pipes) cause issues, so data is written to and read from a byte
+    file. Only two timelines are supported.
+
+    Files cannot signal their reader, so `recv` polls the file size without
+    holding the mutex, backing off exponentially between polls.
+
+    Attributes:
+        recv_file (str): Name of the file in which data is received from
+            another interpreter.
+        send_file (str): Name of the file through which data is sent to
+            another interpreter.
+        mutex (Lock): Mutex used to prevent race condition for send/recv
+            "queue" files.
+        signal_file (str): Name of the file whose existence signals that the
+            other interpreter has finished.
+    """
+
+    def __init__(self, rank: int, recv_file: str, send_file: str, mutex,
+                 signal_file: str = "signal.txt") -> None:
+        """
+        Constructor for FileTransport class.
+
+        Args:
+            rank (int): index of the timeline that owns this transport.
+            recv_file (str): name of receiver "queue" file in memory.
+            send_file (str): name of sender "queue" file in memory.
+            mutex (Lock): mutex lock for send/recv "queue" files.
+            signal_file (str): name of the shutdown signal file (default
+                "signal.txt").
+        """
+
+        super(FileTransport, self).__init__(rank, 2)
+        self.recv_file = recv_file
+        self.send_file = send_file
+        self.mutex = mutex
+        self.signal_file = signal_file
+
+    def send(self, peer: int, payload: bytes) -> None:
+        """
+        Method to write a payload to the other interpreter's "queue" file.
+
+        Args:
+            peer (int): rank of the receiving timeline.
+            payload (bytes): data to be sent.
+        """
+
+        with self.mutex:   # Acquire mutex lock
+            with open(self.send_file, 'wb') as file:
+                file.write(payload)
+
+    def recv(self, peer: int) -> Optional[bytes]:
+        """
+        Method to read a payload from the other interpreter's "queue" file.
+
+        Args:
+            peer (int): rank of the sending timeline.
+
+        Returns:
+            bytes: data received from `peer`, or None if the signal file
+                exists.
+
+        Raises:
+            IOError: Raised and ignored when "resource temporarily
+                unavailable" error occurs.
+        """
+
+        # Repeat until the read file populates.
+        tick = perf_counter()
+        delay = MIN_POLL_SECONDS
+        while True:
+            # Added this because the subinterpreter kept getting hung up on
+            # the last read operation and I have zero clue why.
+            if os.path.exists(self.signal_file):
+                self.wait_time += perf_counter() - tick
+                return None
+            # Only take the lock (which the sender needs) once data is there
+            try:
+                ready = os.stat(self.recv_file).st_size > 0
+            except FileNotFoundError:
+                ready = False
+            if not ready:
+                sleep(delay)
+                delay = min(delay * 2, MAX_POLL_SECONDS)
+                continue
+            try:
+                with self.mutex:   # Acquire mutex lock
+                    with open(self.recv_file, 'rb') as file:
+                        data = file.read()
+                    # Clear file when done reading
+                    with open(self.recv_file, 'wb') as file:
+                        pass
+                self.wait_time += perf_counter() - tick
+                return data
+            except IOError as e:
+                if e.errno != 11:  # Ignore "Resource temporarily unavailable"
+                    raise
+                pass
+
+
+class QueueHub:
+    """
+    Class of the queues connecting the QueueTransports of one simulation.
+
+    Attributes:
+        size (int): number of timelines.
+        queues (List[List[SimpleQueue]]): queue of the payloads sent by
+            every timeline to every other, indexed by sender then receiver.
+        doorbells (List[threading.Event]): event of every timeline, set
+            whenever a payload is queued for it.
+        aborted (bool): whether a timeline failed, so others must stop
+            waiting for it.
+    """
+
+    def __init__(self, size: int) -> None:
+        """
+        Constructor for QueueHub class.
+
+        Args:
+            size (int): number of timelines.
+        """
+
+        self.size = size
+        self.queues = [[SimpleQueue() for _ in range(size)]
+                       for _ in range(size)]
+        self.doorbells = [Event() for _ in range(size)]
+        self.aborted = False
+
+    def abort(self) -> None:
+        """Method to wake every waiting timeline and make it fail."""
+
+        self.aborted = True
+        for doorbell in self.doorbells:
+            doorbell.set()
+
+
+class QueueTransport(Transport):
+    """
+    Transport between timelines run by threads of one process.
+
+    Payloads are put in an unbounded queue per pair of timelines and reach
+    the receiver as the same objects, without copying or serialization, so
+    it can be paired with the ReferenceCodec. Since sends never block, the
+    default `exchange` is used, and `post` is a plain `send`.
+
+    Attributes:
+        hub (QueueHub): queues shared by all timelines of the simulation.
+    """
+
+    shares_objects = True
+
+    def __init__(self, rank: int, hub: QueueHub) -> None:
+        """
+        Constructor for QueueTransport class.
+
+        Args:
+            rank (int): index of the timeline that owns this transport.
+            hub (QueueHub): queues shared by all timelines of the
+                simulation.
+        """
+
+        super(QueueTransport, self).__init__(rank, hub.size)
+        self.hub = hub
+
+    def _check_aborted(self) -> None:
+        if self.hub.aborted:
+            raise RuntimeError(f"timeline {self.rank} stopped: another "
+                               f"timeline failed")
+
+    def send(self, peer: int, payload: Any) -> None:
+        """
+        Method to queue a payload for another timeline.
+
+        Args:
+            peer (int): rank of the receiving timeline.
+            payload (Any): data to be sent; the receiver gets this object.
+        """
+
+        self.hub.queues[self.rank][peer].put(payload)
+        self.hub.doorbells[peer].set()
+
+    def recv(self, peer: int) -> Any:
+        """
+        Method to take the next payload from another timeline.
+
+        Args:
+            peer (int): rank of the sending timeline.
+
+        Returns:
+            Any: data sent by `peer`.
+
+        Raises:
+            RuntimeError: the simulation was aborted.
+        """
+
+        queue = self.hub.queues[peer][self.rank]
+        try:
+            return queue.get_nowait()
+        except Empty:
+            pass
+        tick = perf_counter()
+        try:
+            while True:
+                self._check_aborted()
+                try:
+                    return queue.get(timeout=ABORT_POLL_SECONDS)
+                except Empty:
+                    pass
+        finally:
+            self.wait_time += perf_counter() - tick
+
+    def try_recv(self, peer: int) -> Any:
+        """
+        Method to take the next payload from another timeline if one is
+        queued.
+
+        Args:
+            peer (int): rank of the sending timeline.
+
+        Returns:
+            Any: data sent by `peer`, or None if nothing is queued.
+        """
+
+        try:
+            return self.hub.queues[peer][self.rank].get_nowait()
+        except Empty:
+            return None
+
+    def wait_any(self, peers: List[int]) -> None:
+        """
+        Method to wait until a payload is queued by any of `peers`.
+
+        Args:
+            peers (List[int]): ranks of the timelines to wait for.
+
+        Raises:
+            RuntimeError: the simulation was aborted.
+        """
+
+        doorbell = self.hub.doorbells[self.rank]
+        # Cleared before checking, so a payload queued after the check
+        # sets it again and the wait returns at once
+        doorbell.clear()
+        queues = self.hub.queues
+        if any(not queues[peer][self.rank].empty() for peer in peers):
+            return
+        self._check_aborted()
+        tick = perf_counter()
+        doorbell.wait(ABORT_POLL_SECONDS)
+        self.wait_time += perf_counter() - tick
+        self._check_aborted()